@@ -0,0 +1,89 @@
+"""
+启动耗时基准测试
+
+在全新的解释器中多次导入 `src.main`，统计导入耗时中位数，检查导入阶段是否加载了重量级依赖，
+并单独测量 lifespan 初始化（创建客户端、编译工作流）的耗时，用于发现启动性能回退。
+导入耗时超过预算或导入阶段加载了重量级依赖时以非零状态码退出，可以直接用于 CI。
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.import_time [--runs 5] [--budget-ms 800]`
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# 导入应用时不应加载的模块
+HEAVY_MODULES = ("langchain_core", "langchain_openai", "langgraph", "openai", "tavily", "numpy")
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+started_at = time.perf_counter()
+import src.main
+elapsed = time.perf_counter() - started_at
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+INITIALIZE_SCRIPT = """
+import json, time
+import src.main
+from src.startup import initialize
+started_at = time.perf_counter()
+initialize()
+print(json.dumps({"seconds": time.perf_counter() - started_at}))
+"""
+
+
+def run_python(code: str, *args: str) -> subprocess.CompletedProcess:
+    """在全新的解释器中运行代码，客户端只需要占位的环境变量"""
+    env = {
+        "QWEN_API_KEY": "benchmark",
+        "QWEN_API_BASE_URL": "http://127.0.0.1:9",
+        "TAVILY_API_KEY": "benchmark",
+        "KNOWLEDGE_STORE": "false",
+        **os.environ,
+        "PRELOAD_MODULES": "false",
+    }
+    return subprocess.run(
+        [sys.executable, *args, "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+
+
+def slowest_imports(limit: int = 10) -> list[tuple[float, str]]:
+    """使用 -X importtime 找出累计耗时最长的模块"""
+    stderr = run_python("import src.main", "-X", "importtime").stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800)
+    args = parser.parse_args()
+
+    results = [json.loads(run_python(IMPORT_SCRIPT).stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+    import_ms = statistics.median(result["seconds"] for result in results) * 1000
+    heavy = sorted({module for result in results for module in result["heavy"]})
+    initialize_ms = json.loads(run_python(INITIALIZE_SCRIPT).stdout.strip().splitlines()[-1])["seconds"] * 1000
+
+    print(f"import src.main: median {import_ms:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"lifespan initialize: {initialize_ms:.0f} ms")
+    print(f"heavy modules imported at import time: {', '.join(heavy) or 'none'}")
+    print("slowest imports (cumulative ms):")
+    for cumulative_ms, name in slowest_imports():
+        print(f"  {cumulative_ms:8.1f}  {name}")
+
+    if heavy or import_ms > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+消息历史基准测试
+
+按一次深度搜索中各节点对消息历史的使用方式（路由估算历史 token、澄清节点把历史转为提示文本、
+回答节点追加回答并发送完整历史），比较原先的普通列表与 MessageLog 在不同历史长度下每次运行的 CPU 时间。
+原先每个节点都重新复制列表、调用 str(messages) 和 estimate_messages_tokens；
+MessageLog 在一次运行内每条消息只编码一次。历史每次由请求传入，不跨请求复用缓存。
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.message_log`
+"""
+
+import time
+
+from src.routers.search_agent.message_log import MessageLog, append_messages
+from src.utils.tokens import estimate_messages_tokens
+
+HISTORY_LENGTHS = (10, 100, 500)
+RUNS = 50
+MESSAGE_WORDS = 80
+
+
+def message(index: int) -> dict:
+    role = "user" if index % 2 == 0 else "assistant"
+    return {"role": role, "content": f"message {index} " + "lorem ipsum dolor sit amet " * (MESSAGE_WORDS // 5)}
+
+
+def list_run(history: list[dict], query: str) -> list[dict]:
+    """原先的实现"""
+    messages = list(history)
+    estimate_messages_tokens(messages)
+    messages.append({"role": "user", "content": query})
+    str(messages)
+    messages = [*messages, {"role": "assistant", "content": "verification"}]
+    messages = [*messages, {"role": "assistant", "content": "answer"}]
+    estimate_messages_tokens(messages)
+    return messages
+
+
+def log_run(history: list[dict], query: str) -> MessageLog:
+    # 与工作流输入相同，请求中的历史经过归约函数进入状态
+    messages = append_messages([], history)
+    messages.tokens()
+    messages = append_messages(messages, [{"role": "user", "content": query}])
+    messages.text()
+    messages = append_messages(messages, [{"role": "assistant", "content": "verification"}])
+    messages = append_messages(messages, [{"role": "assistant", "content": "answer"}])
+    messages.tokens()
+    return messages
+
+
+def measure(run, history: list[dict]) -> float:
+    started_at = time.process_time()
+    for turn in range(RUNS):
+        run(history, f"question {turn}")
+    return (time.process_time() - started_at) / RUNS
+
+
+def main():
+    print(f"CPU per run, average of {RUNS} runs:")
+    for length in HISTORY_LENGTHS:
+        messages = [message(index) for index in range(length)]
+        before = measure(list_run, list(messages))
+        after = measure(log_run, messages)
+        print(f"  {length:>4} messages: list {before * 1000:7.3f} ms, MessageLog {after * 1000:7.3f} ms ({before / after:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+段落检索基准测试
+
+模拟 effort=high 的一次运行（10 个搜索查询，每个查询 5 条结果），
+测量段落索引的构建和检索耗时，以及提示中证据部分的 token 数变化。
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.passage_retrieval`
+"""
+
+import random
+import time
+
+from src.routers.search_agent.passages import PassageIndex
+from src.utils.tokens import estimate_tokens
+
+TOPICS = ["asyncio", "uvloop", "latency", "throughput", "gil", "threads", "memory", "profiling", "benchmark", "kernel"]
+FILLER = (
+    "the quick brown fox jumps over the lazy dog while engineers measure system behaviour under load "
+    "and compare results across versions to find regressions in production services"
+).split()
+
+
+def make_sources(queries: list[str], results_per_query: int = 5, sentences: int = 25) -> list[dict]:
+    """生成与查询相关的模拟搜索结果"""
+    rng = random.Random(42)
+    sources = []
+    for query in queries:
+        for i in range(results_per_query):
+            text = []
+            for _ in range(sentences):
+                words = rng.sample(FILLER, 12) + rng.sample(query.split(), 1) + rng.sample(TOPICS, 2)
+                rng.shuffle(words)
+                text.append(" ".join(words).capitalize() + ".")
+            sources.append({"title": f"{query} result {i}", "url": f"https://example.com/{len(sources)}", "content": " ".join(text)})
+    return sources
+
+
+def main():
+    queries = [f"{topic} performance tuning" for topic in TOPICS]
+    sources = make_sources(queries)
+
+    started_at = time.perf_counter()
+    index = PassageIndex()
+    index.sync(sources)
+    build_ms = (time.perf_counter() - started_at) * 1000
+
+    started_at = time.perf_counter()
+    rounds = 100
+    for _ in range(rounds):
+        passages = index.retrieve(["python service performance", *queries])
+    retrieve_ms = (time.perf_counter() - started_at) * 1000 / rounds
+
+    full_tokens = estimate_tokens(str(sources))
+    retrieved_tokens = estimate_tokens(str(passages))
+    print(f"sources: {len(sources)}, passages: {len(index.passages)}")
+    print(f"index build: {build_ms:.1f} ms, retrieve ({len(queries) + 1} queries): {retrieve_ms:.2f} ms")
+    print(f"evidence tokens: full {full_tokens}, retrieved {retrieved_tokens} ({retrieved_tokens / full_tokens:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+非流式结果投影基准测试
+
+构造一次高强度搜索的最终状态（10 轮 × 3 个查询 × 8 条结果，来源内容经过截断和字节预算归约），
+比较各投影的响应大小，以及 FastAPI 默认序列化（jsonable_encoder + 标准库 json）与 FastJSONResponse 的耗时。
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.query_projection`
+"""
+
+import random
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.routers.search_agent.constants import EFFORT_MAX_SEARCH_LOOP
+from src.routers.search_agent.models import ProjectionEnum
+from src.routers.search_agent.projection import project_state
+from src.routers.search_agent.sources import make_source, merge_sources
+from src.utils.responses import FastJSONResponse
+
+QUERIES_PER_LOOP = 3
+RESULTS_PER_QUERY = 8
+RAW_CONTENT_CHARS = 12_000
+REPEATS = 20
+
+
+def final_state() -> dict:
+    rng = random.Random(0)
+    loops = EFFORT_MAX_SEARCH_LOOP["high"]
+    results: list[dict] = []
+    queries = []
+    for loop in range(loops):
+        for query in range(QUERIES_PER_LOOP):
+            queries.append(f"query {loop}-{query}")
+            sources = [
+                make_source(
+                    f"Result {rank} for query {loop}-{query}",
+                    f"https://example.com/{loop}/{query}/{rank}",
+                    f"paragraph {rng.random()} " * (RAW_CONTENT_CHARS // 28),
+                    rng.random(),
+                )
+                for rank in range(RESULTS_PER_QUERY)
+            ]
+            results = merge_sources(results, sources)
+    response = "Answer paragraph. " * 150 + "".join(f"[[{i}]](https://example.com/{i}) " for i in range(1, 13))
+    return {
+        "run_id": "00000000-0000-0000-0000-000000000000",
+        "query": "benchmark query",
+        "messages": [{"role": "user", "content": "benchmark query"}, {"role": "assistant", "content": response}],
+        "web_search_query_wait_list": [],
+        "web_search_depth": "advanced",
+        "web_search_results_list": results,
+        "web_search_queries_list": queries,
+        "web_search_notes": [],
+        "max_search_loop": loops,
+        "search_loop": loops,
+        "response": response,
+        "isNeedWebSearch": True,
+        "reason": "needs fresh sources",
+        "confidence": 0.9,
+        "is_sufficient": True,
+        "followup_search_query": [],
+        "knowledge_gap": "",
+    }
+
+
+def median_ms(fn) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        started_at = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started_at)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    state = final_state()
+    print(f"{len(state['web_search_results_list'])} sources, {REPEATS} repeats, median times")
+    for projection in ProjectionEnum:
+        content = project_state(state, projection)
+        size = len(FastJSONResponse(content).body)
+        default = median_ms(lambda: JSONResponse(jsonable_encoder(content)))
+        fast = median_ms(lambda: FastJSONResponse(content))
+        print(
+            f"{projection.value:>9}: {size / 1024:8.1f} KiB, default {default:7.3f} ms, "
+            f"orjson {fast:6.3f} ms ({default / fast:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
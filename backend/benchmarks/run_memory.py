@@ -0,0 +1,96 @@
+"""
+单次运行内存基准测试
+
+按各搜索强度的最大搜索次数模拟一次运行的来源累积：每轮 3 个高级搜索查询，每个查询 8 条带完整网页内容的结果，
+约 20% 的结果与之前的 URL 重复。用 tracemalloc 比较两种处理方式的峰值内存：
+- 原方式：完整内容直接追加到状态，事件中携带完整来源
+- 现方式：来源内容截断，按字节预算归约，事件只携带内容预览
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.run_memory`
+"""
+
+import json
+import random
+import tracemalloc
+from operator import add
+
+from src.routers.search_agent.constants import EFFORT_MAX_SEARCH_LOOP
+from src.routers.search_agent.sources import make_source, merge_sources, source_previews
+
+QUERIES_PER_LOOP = 3
+RESULTS_PER_QUERY = 8
+RAW_CONTENT_CHARS = 40_000
+DUPLICATE_RATE = 0.2
+
+
+def search_results(rng: random.Random, loop: int, query: int, seen_urls: list[str]) -> list[dict]:
+    """生成一个查询的搜索结果，内容在循环中生成，保证每次运行都重新分配"""
+    results = []
+    for rank in range(RESULTS_PER_QUERY):
+        if seen_urls and rng.random() < DUPLICATE_RATE:
+            url = rng.choice(seen_urls)
+        else:
+            url = f"https://example.com/{loop}/{query}/{rank}"
+            seen_urls.append(url)
+        results.append({
+            "title": f"Result {rank} for query {query}",
+            "url": url,
+            "content": f"snippet {loop}-{query}-{rank} " * 20,
+            "raw_content": f"{url} paragraph {rng.random()} " * (RAW_CONTENT_CHARS // 60),
+            "score": rng.random(),
+        })
+    return results
+
+
+def run_old(loops: int) -> None:
+    rng = random.Random(0)
+    seen_urls: list[str] = []
+    state: list[dict] = []
+    events: list[str] = []
+    for loop in range(loops):
+        for query in range(QUERIES_PER_LOOP):
+            sources = [
+                {"title": item["title"], "url": item["url"], "content": item.get("raw_content") or item["content"]}
+                for item in search_results(rng, loop, query, seen_urls)
+            ]
+            state = add(state, sources)
+            events.append(json.dumps({"web_search_results": sources}))
+
+
+def run_new(loops: int) -> None:
+    rng = random.Random(0)
+    seen_urls: list[str] = []
+    state: list[dict] = []
+    events: list[str] = []
+    for loop in range(loops):
+        for query in range(QUERIES_PER_LOOP):
+            sources = [
+                make_source(item["title"], item["url"], item.get("raw_content") or item["content"], item.get("score"))
+                for item in search_results(rng, loop, query, seen_urls)
+            ]
+            state = merge_sources(state, sources)
+            events.append(json.dumps({"web_search_results": source_previews(sources)}))
+
+
+def peak_bytes(fn, loops: int) -> int:
+    tracemalloc.start()
+    try:
+        fn(loops)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    print(f"{QUERIES_PER_LOOP} queries x {RESULTS_PER_QUERY} results per loop, raw content ~{RAW_CONTENT_CHARS // 1000}k chars")
+    for effort, loops in EFFORT_MAX_SEARCH_LOOP.items():
+        old = peak_bytes(run_old, loops)
+        new = peak_bytes(run_new, loops)
+        print(
+            f"{effort:>6} ({loops:2d} loops): old peak {old / 1024 / 1024:7.1f} MiB, "
+            f"new peak {new / 1024 / 1024:6.1f} MiB ({old / new:4.1f}x smaller)"
+        )
+
+
+if __name__ == "__main__":
+    main()
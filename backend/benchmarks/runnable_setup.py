@@ -0,0 +1,114 @@
+"""
+模型调用构建开销基准测试
+
+- 每次调用的构建开销：按一次低强度搜索中各节点的结构化调用（路由、澄清、生成查询、判断是否搜索、两轮反思），
+  比较每次调用都重新构建 with_structured_output(...).with_retry(...)、PydanticOutputParser 和格式说明，
+  与从 RunnableRegistry 获取预构建调用、使用已填入格式说明的提示模板。模型客户端只构建，不发起请求
+- 工作流预热：用预热模型运行两个工作流，比较进程内第一次运行（冷启动）和之后运行的耗时
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.runnable_setup`
+"""
+
+import asyncio
+import time
+
+from langchain.output_parsers import PydanticOutputParser
+from langchain_openai import ChatOpenAI
+
+from src.routers.search_agent.models import (
+    AnalyzeRouter,
+    ClarifyUser,
+    EvaluateWebSearchResult,
+    SearchQueryList,
+    WebSearchJudgement,
+)
+from src.routers.search_agent.prompts import (
+    analyze_need_web_search_instructions,
+    query_writer_instructions,
+    reflection_instructions,
+    router_system_instructions,
+)
+from src.routers.search_agent.runnables import RunnableRegistry, output_parser, prompt_template
+
+REPEATS = 20
+WARM_UP_RUNS = 5
+
+# 一次低强度搜索中的结构化调用：（输出模型、提示模板、模板参数）
+CALLS = [
+    (AnalyzeRouter, router_system_instructions, {}),
+    (ClarifyUser, None, {}),
+    (WebSearchJudgement, analyze_need_web_search_instructions, {"query": "q"}),
+    (SearchQueryList, query_writer_instructions, {"query": "q", "number_queries": 3}),
+    (EvaluateWebSearchResult, reflection_instructions, {"research_topic": "q", "summaries": "s"}),
+    (EvaluateWebSearchResult, reflection_instructions, {"research_topic": "q", "summaries": "s"}),
+]
+
+
+def rebuild_run(llm):
+    """原先的实现：每次调用都重新构建"""
+    for schema, template, kwargs in CALLS:
+        if schema is WebSearchJudgement:
+            parser = PydanticOutputParser(pydantic_object=schema)
+            template.format(format_instructions=parser.get_format_instructions(), **kwargs)
+            continue
+        llm.with_structured_output(schema).with_retry(stop_after_attempt=3)
+        if template is not None:
+            format_instructions = PydanticOutputParser(pydantic_object=schema).get_format_instructions()
+            template.format(format_instructions=format_instructions, **kwargs)
+
+
+def registry_run(llm, registry: RunnableRegistry):
+    for schema, template, kwargs in CALLS:
+        if schema is WebSearchJudgement:
+            output_parser(schema)
+            prompt_template(template, schema).format(**kwargs)
+            continue
+        registry.get(llm, schema)
+        if template is not None:
+            prompt_template(template, schema).format(**kwargs)
+
+
+def setup_overhead():
+    llm = ChatOpenAI(model="benchmark", api_key="benchmark", base_url="http://127.0.0.1:1")
+    started_at = time.perf_counter()
+    for _ in range(REPEATS):
+        rebuild_run(llm)
+    before = (time.perf_counter() - started_at) / REPEATS
+    registry = RunnableRegistry()
+    registry.prebuild([llm])
+    started_at = time.perf_counter()
+    for _ in range(REPEATS):
+        registry_run(llm, registry)
+    after = (time.perf_counter() - started_at) / REPEATS
+    print(f"setup overhead per run, {len(CALLS)} structured calls:")
+    print(f"  rebuilt per call: {before * 1000:7.2f} ms")
+    print(f"  prebuilt:         {after * 1000:7.2f} ms ({before / after:.0f}x less)")
+
+
+def graph_warm_up():
+    from src.routers.chat_agent.workflow import get_chat_graph
+    from src.routers.search_agent.config import get_config
+    from src.routers.search_agent.workflow import get_search_graph
+    from src.startup import warm_up
+    from src.utils.metrics import get_metrics
+
+    # 与启动时相同，预热前已经编译好工作流
+    get_config().init_clients()
+    get_search_graph()
+    get_chat_graph()
+    seconds = []
+    for _ in range(WARM_UP_RUNS):
+        asyncio.run(warm_up())
+        seconds.append(get_metrics().snapshot()["gauges"]["startup.warm_up_seconds"])
+    print("synthetic pass through both graphs:")
+    print(f"  first (cold): {seconds[0] * 1000:7.2f} ms")
+    print(f"  later (warm): {min(seconds[1:]) * 1000:7.2f} ms")
+
+
+def main():
+    setup_overhead()
+    graph_warm_up()
+
+
+if __name__ == "__main__":
+    main()
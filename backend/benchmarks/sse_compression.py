@@ -0,0 +1,103 @@
+"""
+SSE 流式压缩基准测试
+
+用 StreamCompressionMiddleware 包装一个按低强度搜索的事件构成（49 个 custom 事件、300 个 messages 事件）
+逐个发送 SSE 事件的 ASGI 应用，对每种可用编码比较：
+- 每次流的传输字节数，以及与整体压缩（不逐事件刷新）相比逐事件刷新的额外开销
+- 每次流的压缩 CPU 时间
+同时校验每个压缩数据块都能立即解压出完整的事件，并确认只有一个小数据块的响应不压缩。
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.sse_compression`
+"""
+
+import asyncio
+import json
+import time
+import zlib
+
+from benchmarks.ws_transport import run_events
+from src.utils.compression import StreamCompressionMiddleware, brotli, supported_encodings
+
+REPEATS = 20
+
+
+def sse_events() -> list[bytes]:
+    return [f"event: {event}\ndata: {json.dumps(data)}\n\n".encode() for event, data in run_events()]
+
+
+def event_app(events: list[bytes], streaming: bool = True):
+    """逐个发送事件的 ASGI 应用，streaming 为 False 时整个响应只有一个数据块"""
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"), (b"content-encoding", b"none")],
+        })
+        if not streaming:
+            await send({"type": "http.response.body", "body": b"".join(events), "more_body": False})
+            return
+        for event in events:
+            await send({"type": "http.response.body", "body": event, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    return app
+
+
+async def stream(events: list[bytes], encoding: str, streaming: bool = True) -> tuple[dict, list[bytes]]:
+    """通过中间件发送一次流，返回响应头和各个数据块"""
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", encoding.encode())]}
+    await StreamCompressionMiddleware(event_app(events, streaming))(scope, None, send)
+    headers = {key.decode(): value.decode() for key, value in messages[0]["headers"]}
+    return headers, [message["body"] for message in messages[1:]]
+
+
+def decompressor(encoding: str):
+    if encoding == "br":
+        return brotli.Decompressor().process
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+
+
+def whole_stream_size(data: bytes, encoding: str) -> int:
+    if encoding == "br":
+        return len(brotli.compress(data))
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return len(compressor.compress(data) + compressor.flush())
+
+
+def main():
+    events = sse_events()
+    identity = sum(len(event) for event in events)
+    print(f"{len(events)} events per stream, identity {identity / 1024:.1f} KiB")
+    for encoding in supported_encodings():
+        headers, chunks = asyncio.run(stream(events, encoding))
+        assert headers["content-encoding"] == encoding
+        decode = decompressor(encoding)
+        # 每个数据块解压后恰好是对应的事件，客户端无需等待后续数据
+        assert all(decode(chunk) == event for chunk, event in zip(chunks, events))
+        wire = sum(len(chunk) for chunk in chunks)
+        started_at = time.process_time()
+        for _ in range(REPEATS):
+            asyncio.run(stream(events, encoding))
+        cpu = (time.process_time() - started_at) / REPEATS
+        baseline = time.process_time()
+        for _ in range(REPEATS):
+            asyncio.run(stream(events, "identity"))
+        cpu -= (time.process_time() - baseline) / REPEATS
+        whole = whole_stream_size(b"".join(events), encoding)
+        print(
+            f"{encoding:>5}: {wire / 1024:6.1f} KiB on the wire ({1 - wire / identity:5.1%} saved), "
+            f"whole-stream {whole / 1024:5.1f} KiB, compression CPU {cpu * 1000:5.2f} ms per stream"
+        )
+    if brotli is None:
+        print("   br: skipped, install the brotli package to enable it")
+
+    headers, _ = asyncio.run(stream([b'event: error\ndata: {"error": "x"}\n\n'], "gzip", streaming=False))
+    print(f"single small chunk: content-encoding {headers.get('content-encoding')}")
+
+
+if __name__ == "__main__":
+    main()
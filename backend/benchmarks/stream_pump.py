@@ -0,0 +1,98 @@
+"""
+流式响应泵基准测试
+
+- 心跳间隔：事件源在两个事件之间静默 SILENT_SECONDS 秒（相当于一次较长的评估模型调用），
+  比较原先在事件循环内发送心跳与定时器驱动心跳时，客户端收到的最大间隔
+- 慢客户端：客户端每读取一个事件等待 CLIENT_DELAY 秒，按低强度搜索的事件构成（49 个 custom 事件、300 个 messages 事件）
+  比较各慢客户端策略下事件源的完成时间、客户端收到的事件数和合并、丢弃次数
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.stream_pump`
+"""
+
+import asyncio
+import time
+
+from benchmarks.ws_transport import run_events
+from src.utils.stream_pump import (
+    SLOW_CONSUMER_POLICIES,
+    SSE_HEARTBEAT,
+    SlowConsumerError,
+    format_sse,
+    sse_pump,
+)
+
+HEARTBEAT_INTERVAL = 0.2
+SILENT_SECONDS = 1.0
+CLIENT_DELAY = 0.002
+QUEUE_SIZE = 32
+SLOW_CONSUMER_TIMEOUT = 5.0
+
+
+async def silent_events():
+    yield format_sse("custom", {"node": "web_search"})
+    await asyncio.sleep(SILENT_SECONDS)
+    yield format_sse("custom", {"node": "evaluate_search_results"})
+
+
+async def inline_heartbeat() -> float:
+    """原先的实现：只有事件到达时才检查是否需要发送心跳"""
+    gaps, last_sent = [], time.monotonic()
+    async for event in silent_events():
+        if time.monotonic() - last_sent > HEARTBEAT_INTERVAL:
+            gaps.append(time.monotonic() - last_sent)
+            last_sent = time.monotonic()
+        gaps.append(time.monotonic() - last_sent)
+        last_sent = time.monotonic()
+    return max(gaps)
+
+
+async def pumped_heartbeat() -> float:
+    gaps, last_sent = [], time.monotonic()
+    async for _ in sse_pump(silent_events(), "benchmark.heartbeat", HEARTBEAT_INTERVAL).stream():
+        gaps.append(time.monotonic() - last_sent)
+        last_sent = time.monotonic()
+    return max(gaps)
+
+
+async def slow_client(policy: str) -> tuple[float, int, int, str]:
+    """返回事件源完成时间、客户端收到的事件数、丢弃次数和结束方式"""
+    finished_at = None
+    started_at = time.perf_counter()
+
+    async def events():
+        nonlocal finished_at
+        for event, data in run_events():
+            yield format_sse(event, data)
+        finished_at = time.perf_counter() - started_at
+
+    pump = sse_pump(events(), "benchmark.pump", 30)
+    pump.maxsize, pump.policy, pump.timeout = QUEUE_SIZE, policy, SLOW_CONSUMER_TIMEOUT
+    received, outcome = 0, "completed"
+    try:
+        async for event in pump.stream():
+            if event != SSE_HEARTBEAT:
+                received += 1
+            await asyncio.sleep(CLIENT_DELAY)
+    except SlowConsumerError:
+        outcome = "disconnected"
+    return finished_at or time.perf_counter() - started_at, received, pump.dropped, outcome
+
+
+def main():
+    print(f"largest gap with a {SILENT_SECONDS:.1f}s silent node, heartbeat every {HEARTBEAT_INTERVAL:.1f}s:")
+    print(f"  inline heartbeat: {asyncio.run(inline_heartbeat()):.2f} s")
+    print(f"   timer heartbeat: {asyncio.run(pumped_heartbeat()):.2f} s")
+
+    events = len(run_events())
+    print(f"slow client ({CLIENT_DELAY * 1000:.0f} ms per event), {events} events, queue of {QUEUE_SIZE}:")
+    print(f"  {'inline':>10}: producer done in {events * CLIENT_DELAY:.2f} s (paced by the client)")
+    for policy in SLOW_CONSUMER_POLICIES:
+        seconds, received, dropped, outcome = asyncio.run(slow_client(policy))
+        print(
+            f"  {policy:>10}: producer done in {seconds:.2f} s, "
+            f"{received} events delivered, {dropped} dropped, {outcome}"
+        )
+
+
+if __name__ == "__main__":
+    main()
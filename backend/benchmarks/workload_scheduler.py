@@ -0,0 +1,95 @@
+"""
+工作负载调度基准测试
+
+模拟一个最多同时处理 16 个请求的语言模型上游：高强度搜索在 3 秒内持续以 32 个线程发起 400ms 的调用，
+同时对话每 20ms 到达一次，每次调用 100ms。比较先到先得（只有总并发上限）与按优先级调度时
+对话调用的延迟分位数，以及高强度搜索的吞吐。
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.workload_scheduler`
+"""
+
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+
+from src.utils.scheduler import WORKLOAD_CHAT, WORKLOAD_SEARCH_HIGH, WorkloadScheduler
+
+UPSTREAM_LIMIT = 16
+SEARCH_THREADS = 32
+SEARCH_CALL_SECONDS = 0.4
+CHAT_INTERVAL_SECONDS = 0.02
+CHAT_CALL_SECONDS = 0.1
+DURATION_SECONDS = 3.0
+
+
+class FifoLimiter:
+    """只有总并发上限的先到先得调度"""
+
+    def __init__(self, limit: int):
+        self._semaphore = threading.Semaphore(limit)
+
+    @contextmanager
+    def slot(self, workload: str):
+        with self._semaphore:
+            yield
+
+
+def run(limiter) -> tuple[list[float], int]:
+    """运行一轮负载，返回对话调用延迟和完成的搜索调用数"""
+    stop = threading.Event()
+    chat_latencies: list[float] = []
+    search_calls = [0]
+    lock = threading.Lock()
+
+    def search_worker():
+        while not stop.is_set():
+            with limiter.slot(WORKLOAD_SEARCH_HIGH):
+                time.sleep(SEARCH_CALL_SECONDS)
+            with lock:
+                search_calls[0] += 1
+
+    def chat_call():
+        started_at = time.perf_counter()
+        with limiter.slot(WORKLOAD_CHAT):
+            time.sleep(CHAT_CALL_SECONDS)
+        with lock:
+            chat_latencies.append(time.perf_counter() - started_at)
+
+    workers = [threading.Thread(target=search_worker) for _ in range(SEARCH_THREADS)]
+    for worker in workers:
+        worker.start()
+    # 等搜索负载占满上游后再开始发起对话
+    time.sleep(SEARCH_CALL_SECONDS)
+    chats = []
+    deadline = time.time() + DURATION_SECONDS
+    while time.time() < deadline:
+        chat = threading.Thread(target=chat_call)
+        chat.start()
+        chats.append(chat)
+        time.sleep(CHAT_INTERVAL_SECONDS)
+    # 搜索负载在对话到达结束时停止，之后仍在排队的对话等待搜索调用退出
+    stop.set()
+    for thread in chats + workers:
+        thread.join()
+    return chat_latencies, search_calls[0]
+
+
+def report(name: str, latencies: list[float], search_calls: int):
+    latencies = sorted(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(
+        f"{name:>9}: chat p50 {statistics.median(latencies) * 1000:6.0f} ms, p95 {p95 * 1000:6.0f} ms "
+        f"({len(latencies)} calls), search calls {search_calls}"
+    )
+
+
+def main():
+    print(f"upstream limit {UPSTREAM_LIMIT}, {SEARCH_THREADS} search threads, chat every {CHAT_INTERVAL_SECONDS * 1000:.0f} ms")
+    print(f"chat baseline without load: {CHAT_CALL_SECONDS * 1000:.0f} ms")
+    report("fifo", *run(FifoLimiter(UPSTREAM_LIMIT)))
+    report("priority", *run(WorkloadScheduler("benchmark", UPSTREAM_LIMIT)))
+
+
+if __name__ == "__main__":
+    main()
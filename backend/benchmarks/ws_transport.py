@@ -0,0 +1,166 @@
+"""
+SSE 与 WebSocket（msgpack）传输基准测试
+
+- 每个事件的编码 CPU 和每次运行的字节数：按一次低强度搜索的事件构成（49 个 custom 事件、300 个 messages 事件）
+  比较 SSE（JSON 文本加分块传输编码开销）与 WebSocket（msgpack 帧加帧头）
+- 每轮的连接开销：在本机启动 uvicorn，进行 50 轮每轮 3 个事件的短运行，比较每轮新建连接的 SSE、
+  复用 keep-alive 连接的 SSE 和同一个 WebSocket 连接上的多次运行
+
+运行方式（在 backend 目录下）：`uv run python -m benchmarks.ws_transport`
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import httpx
+import ormsgpack
+import uvicorn
+from fastapi import FastAPI, WebSocket
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import AIMessageChunk, message_to_dict
+from websockets.sync.client import connect
+
+from src.utils.websocket import RunMultiplexer, pack
+
+CUSTOM_EVENTS = 49
+MESSAGE_EVENTS = 300
+ENCODE_REPEATS = 20
+TURNS = 50
+EVENTS_PER_TURN = 3
+
+
+def run_events() -> list[tuple[str, dict]]:
+    """一次运行的事件：节点状态和来源预览，以及逐个 token 的模型输出"""
+    events = []
+    for index in range(CUSTOM_EVENTS):
+        data = {
+            "node": "web_search",
+            "type": "node_execute",
+            "data": {
+                "message": "web_search done",
+                "status": "done",
+                "data": {
+                    "id": f"{index:032x}",
+                    "web_search_results": [
+                        {"title": f"Result {i}", "url": f"https://example.com/{index}/{i}", "content": "preview " * 37}
+                        for i in range(2)
+                    ] if index % 5 == 0 else [],
+                },
+            },
+        }
+        events.append(("custom", {"mode": "custom", "node": "web_search", "data": data}))
+    for index in range(MESSAGE_EVENTS):
+        token = message_to_dict(AIMessageChunk(content=f"token{index % 7} ", id="run-0"))
+        events.append(("messages", {"mode": "messages", "node": "assistant_node", "data": token}))
+    return events
+
+
+def sse_bytes(event: str, data: dict) -> bytes:
+    body = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+    # 分块传输编码：十六进制长度、两个 CRLF
+    return f"{len(body):x}\r\n".encode() + body + b"\r\n"
+
+
+def ws_bytes(run_id: str, event: str, data: dict) -> bytes:
+    body = pack({"id": run_id, "event": event, "data": data})
+    # 服务端发送的帧不加掩码，帧头 2、4 或 10 字节
+    header = 2 if len(body) < 126 else 4 if len(body) < 65536 else 10
+    return bytes(header) + body
+
+
+def encoding():
+    events = run_events()
+    results = {}
+    for name, encode in (("sse", sse_bytes), ("ws", lambda e, d: ws_bytes("run-0", e, d))):
+        size = sum(len(encode(event, data)) for event, data in events)
+        started_at = time.process_time()
+        for _ in range(ENCODE_REPEATS):
+            for event, data in events:
+                encode(event, data)
+        cpu = (time.process_time() - started_at) / (ENCODE_REPEATS * len(events))
+        results[name] = (cpu, size)
+    print(f"encoding, {len(events)} events per run:")
+    for name, (cpu, size) in results.items():
+        print(f"  {name:>3}: {cpu * 1e6:6.2f} us CPU per event, {size / 1024:6.1f} KiB per run")
+
+
+def turn_events(_: dict):
+    async def events():
+        for index in range(EVENTS_PER_TURN):
+            yield "messages", {"mode": "messages", "node": "assistant_node", "data": {"content": f"token{index}"}}
+    return events()
+
+
+def benchmark_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/stream")
+    async def stream():
+        async def body():
+            async for event, data in turn_events({}):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            yield "event: end\ndata: {}\n\n"
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket):
+        await RunMultiplexer(websocket, turn_events, "benchmark").serve()
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def reconnects():
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(benchmark_app(), port=port, log_level="warning"))
+    thread = threading.Thread(target=lambda: asyncio.run(server.serve()), daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    base = f"http://127.0.0.1:{port}"
+    client = httpx.Client()
+
+    def sse_turns(headers: dict) -> float:
+        started_at = time.perf_counter()
+        for _ in range(TURNS):
+            with client.stream("POST", f"{base}/stream", headers=headers) as response:
+                for _ in response.iter_bytes():
+                    pass
+        return (time.perf_counter() - started_at) / TURNS
+
+    results = {
+        # 服务端在响应后关闭连接，下一轮重新建立 TCP 连接
+        "sse, new connection": sse_turns({"Connection": "close"}),
+        "sse, keep-alive": sse_turns({}),
+    }
+    started_at = time.perf_counter()
+    with connect(f"ws://127.0.0.1:{port}/ws") as websocket:
+        for turn in range(TURNS):
+            websocket.send(pack({"type": "start", "id": str(turn), "input": {}}))
+            while True:
+                if ormsgpack.unpackb(websocket.recv()).get("event") == "end":
+                    break
+    results["websocket, one connection"] = (time.perf_counter() - started_at) / TURNS
+    client.close()
+    server.should_exit = True
+    thread.join()
+    print(f"per-turn latency, {TURNS} turns of {EVENTS_PER_TURN} events:")
+    for name, seconds in results.items():
+        print(f"  {name:>25}: {seconds * 1000:6.2f} ms")
+
+
+def main():
+    encoding()
+    reconnects()
+
+
+if __name__ == "__main__":
+    main()
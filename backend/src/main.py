@@ -4,14 +4,48 @@
 该模块是应用程序的入口点，负责创建 FastAPI 应用实例并注册路由。
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .routers import search
+from .startup import (
+    initialize,
+    preload_modules,
+    should_preload,
+    should_warm_up,
+    start_workers,
+    stop_workers,
+    warm_up,
+)
 from .utils import logger
+from .utils.admin import require_admin
+from .utils.compression import StreamCompressionMiddleware, stream_compression_enabled
+from .utils.metrics import get_metrics
+from .utils.runtime import get_loop_monitor, loop_monitor_enabled
 import logging
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：每个工作进程启动时初始化客户端、编译并预热工作流，启动后台任务工作协程和事件循环监控"""
+    initialize()
+    if should_warm_up():
+        await warm_up()
+    await start_workers()
+    if loop_monitor_enabled():
+        await get_loop_monitor().start()
+    yield
+    await get_loop_monitor().stop()
+    await stop_workers()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# 多进程部署时由主进程在 fork 前预加载重量级模块
+if should_preload():
+    preload_modules()
 
 origins = ["*"]
 
@@ -24,6 +58,10 @@ app.add_middleware(
     allow_headers=["*"],    # 允许携带的 Headers
  )
 
+# 可选：按客户端协商压缩 SSE 和 JSONL 流式响应，每个事件单独刷新
+if stream_compression_enabled():
+    app.add_middleware(StreamCompressionMiddleware)
+
 app.include_router(search.search_router,prefix="/llm/deep/search")
 app.include_router(search.chat_router,prefix="/llm/chat")
 
@@ -38,3 +76,24 @@ def read_root():
     logging.info("Root endpoint accessed")
     return {"Hello": "Deep Searcher"}
 
+
+@app.get("/metrics")
+def read_metrics():
+    """
+    运行指标接口，返回进程内记录的计数器、瞬时值和耗时统计
+    
+    Returns:
+        dict: 指标快照
+    """
+    return get_metrics().snapshot()
+
+
+@app.get("/runtime", dependencies=[Depends(require_admin)])
+def read_runtime():
+    """
+    运行时状态接口，需要管理员令牌
+    
+    Returns:
+        dict: 事件循环延迟分位数、线程池状态和最近阻塞事件循环的调用栈
+    """
+    return get_loop_monitor().report()
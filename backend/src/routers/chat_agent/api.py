@@ -1,21 +1,103 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, WebSocket
 from fastapi.responses import StreamingResponse
-from langchain_core.messages import message_to_dict
 import logging
-from typing import AsyncGenerator
+from contextlib import aclosing
+from typing import AsyncGenerator, Optional
 import json
-import time
-from .workflow import app
+from ...utils.stream_pump import format_sse, sse_pump
+from ...utils.websocket import RunMultiplexer
+from .workflow import get_chat_graph, get_chat_llm
+from .session import get_session_manager
 from pydantic import BaseModel
 import asyncio
-from langchain_core.runnables import RunnableConfig
 
 class InputData(BaseModel):
     messages: list[dict]
+    # 携带 session_id 时，messages 只需包含新一轮消息，历史由服务端维护
+    session_id: Optional[str] = None
 
 # 创建路由器
 router = APIRouter()
 
+# 心跳间隔（秒）
+HEARTBEAT_INTERVAL = 30
+
+def turn_messages(messages: list[dict], session_id: Optional[str]) -> list[dict]:
+    """获取本轮发送给模型的消息，携带 session_id 时以服务端保存的会话为历史"""
+    if session_id:
+        return get_session_manager().build_turn(session_id, messages)
+    return messages
+
+
+async def chat_run_events(messages: list[dict], session_id: Optional[str] = None) -> AsyncGenerator[tuple[str, dict], None]:
+    """
+    运行对话工作流并将输出转换为结构化事件，SSE 和 WebSocket 接口共用，产生回复时把本轮消息和回复一起保存到会话
+    
+    Args:
+        messages (list[dict]): 本轮新增的消息
+        session_id (str, optional): 会话ID
+        
+    Yields:
+        tuple[str, dict]: 事件名称（updates、messages 或 custom）和事件数据
+    """
+    from langchain_core.messages import message_to_dict
+    
+    reply = None
+    try:
+        async for chunk in get_chat_graph().astream(
+            {
+                "messages": turn_messages(messages, session_id),
+                
+            }, 
+            stream_mode=["messages", "updates", "custom"]
+        ):
+            logging.info(f"Chunk: {chunk}")
+            mode, *_ = chunk
+            
+            if mode == "updates":
+                mode, data = chunk
+                node_name = list(data.keys())[0]
+                if node_name == "llm_response":
+                    reply = data[node_name]['messages'][-1]['content']
+                # 结构化响应数据
+                yield mode, {
+                    "mode": mode,
+                    "node": node_name,
+                    "data": data[node_name]
+                }
+            
+            elif mode == "messages":
+                mode, message_chunk = chunk
+                llm_token, metadata = message_chunk
+                # 结构化响应数据
+                yield mode, {
+                    "mode": mode,
+                    "node": metadata.get('langgraph_node', ""),
+                    "data": message_to_dict(llm_token),
+                }
+            
+            # 自定义消息用来显示当前正在运行的节点
+            elif mode == "custom":
+                mode, data = chunk
+                node_name = data.get('node', "")
+                # 结构化响应数据
+                yield mode, {
+                    "mode": mode,
+                    "node": node_name,
+                    "data": data
+                }
+    finally:
+        if session_id and reply is not None:
+            get_session_manager().add_reply(session_id, messages, reply, get_chat_llm())
+
+
+async def sse_events(events: AsyncGenerator[tuple[str, dict], None]) -> AsyncGenerator[str, None]:
+    """把结构化事件转换为 SSE 事件文本"""
+    async with aclosing(events):
+        async for event, response in events:
+            yield format_sse(event, response)
+
+
 @router.post("/stream", tags=["chat"])
 async def run_workflow_stream(input_data:InputData,request: Request):
     """
@@ -32,72 +114,23 @@ async def run_workflow_stream(input_data:InputData,request: Request):
         HTTPException: 当messages字段不是列表时抛出400错误
     """
     logging.info(f"开始请求，数据体: {input_data}")
-    messages = input_data.messages 
+    session_id = input_data.session_id
     
     # 由于中断由API入口介入，持久化数据的过程应该控制在这里，可以由custom自定义事件进行控制
     async def stream_updates(req: Request) -> AsyncGenerator[str, None]:
         try:
             logging.info(f"开始流式传输:")
-            # 添加心跳机制 (每30秒发送空注释)
-            last_sent = time.time()
-            heartbeat_interval = 30
-            
-            async for chunk in app.astream(
-                {
-                    "messages": messages,
+            # 工作流在独立任务中运行，心跳按定时器发送 (防止代理超时断开)，客户端过慢时按策略合并、丢弃或断开
+            # 提前退出时泵取消工作流任务并关闭事件生成器，本轮消息和已产生的回复在此时一起保存
+            pump = sse_pump(sse_events(chat_run_events(input_data.messages, session_id)), "stream.chat", HEARTBEAT_INTERVAL)
+            async with aclosing(pump.stream()) as pumped:
+                async for event in pumped:
+                    # --- 在循环开始时主动检查连接状态 ---
+                    if await req.is_disconnected():
+                        logging.warning("客户端在流式传输过程中断开连接，提前终止。")
+                        break # 退出循环
                     
-                }, 
-                stream_mode=["messages", "updates", "custom"]
-            ):
-                # --- 在循环开始时主动检查连接状态 ---
-                if await req.is_disconnected():
-                    logging.warning("客户端在流式传输过程中断开连接，提前终止。")
-                    break # 退出循环
-                
-                logging.info(f"Chunk: {chunk}")
-                mode, *_ = chunk
-                
-                # 发送心跳 (防止代理超时断开)
-                if time.time() - last_sent > heartbeat_interval:
-                    yield ":keep-alive\n\n"
-                    last_sent = time.time()
-                
-                if mode == "updates":
-                    mode, data = chunk
-                    node_name = list(data.keys())[0]
-                    # 结构化响应数据
-                    response = {
-                        "mode": mode,
-                        "node": node_name,
-                        "data": data[node_name]
-                    }
-                    yield f"event: updates\ndata: {json.dumps(response)}\n\n"
-                    last_sent = time.time()
-                
-                elif mode == "messages":
-                    mode, message_chunk = chunk
-                    llm_token, metadata = message_chunk
-                    # 结构化响应数据
-                    response = {
-                        "mode": mode,
-                        "node": metadata.get('langgraph_node', ""),
-                        "data": message_to_dict(llm_token),
-                    }
-                    yield f"event: messages\ndata: {json.dumps(response)}\n\n"
-                    last_sent = time.time()
-                
-                # 自定义消息用来显示当前正在运行的节点
-                elif mode == "custom":
-                    mode, data = chunk
-                    node_name = data.get('node', "")
-                    # 结构化响应数据
-                    response = {
-                        "mode": mode,
-                        "node": node_name,
-                        "data": data
-                    }
-                    yield f"event: custom\ndata: {json.dumps(response)}\n\n"
-                    last_sent = time.time()
+                    yield event
             
         except asyncio.CancelledError:
             # 这是捕获客户端中断的核心位置
@@ -126,6 +159,41 @@ async def run_workflow_stream(input_data:InputData,request: Request):
             "X-Accel-Buffering": "no",
             # 添加浏览器兼容头部
             "Content-Encoding": "none",
-            "X-SSE-Content-Type": "text/event-stream"
+            "X-SSE-Content-Type": "text/event-stream",
+            **({"X-Session-Id": session_id} if session_id else {})
         }
-    )
\ No newline at end of file
+    )
+
+
+async def websocket_run_events(input_data: dict) -> AsyncGenerator[tuple[str, dict], None]:
+    """WebSocket 连接上的一次对话，输入数据与流式接口相同（messages、session_id）"""
+    data = InputData.model_validate(input_data)
+    async for event in chat_run_events(data.messages, data.session_id):
+        yield event
+
+
+@router.websocket("/ws")
+async def run_workflow_websocket(websocket: WebSocket):
+    """
+    WebSocket 流式接口：一个连接上可以进行多轮对话并单独取消，事件以 msgpack 二进制帧发送，
+    帧格式见 src/utils/websocket.py
+    
+    Args:
+        websocket (WebSocket): WebSocket 连接
+    """
+    await RunMultiplexer(websocket, websocket_run_events, "chat").serve()
+
+
+@router.delete("/session/{session_id}", tags=["chat"])
+async def delete_session(session_id: str):
+    """
+    删除服务端保存的对话会话
+    
+    Args:
+        session_id (str): 会话ID
+        
+    Returns:
+        dict: 被删除的会话ID
+    """
+    get_session_manager().delete(session_id)
+    return {"session_id": session_id}
\ No newline at end of file
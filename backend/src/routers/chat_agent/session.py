@@ -0,0 +1,286 @@
+"""
+对话会话存储模块
+
+该模块负责在服务端保存对话历史，客户端只需携带 session_id 和新一轮消息。
+历史策略按 token 预算保留最近的消息窗口，更早的消息在后台折叠进滚动摘要，
+使每轮提示词大小和延迟不随对话长度增长。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+from ...utils.lazy import lazy
+from ...utils.scheduler import WORKLOAD_BACKGROUND, get_llm_scheduler
+from ...utils.tokens import estimate_message_tokens, estimate_messages_tokens
+
+# 环境变量名称
+CHAT_SESSION_DB = "CHAT_SESSION_DB"
+CHAT_HISTORY_WINDOW_TOKENS = "CHAT_HISTORY_WINDOW_TOKENS"
+CHAT_HISTORY_SUMMARY_TRIGGER_TOKENS = "CHAT_HISTORY_SUMMARY_TRIGGER_TOKENS"
+
+DEFAULT_WINDOW_TOKENS = 2000
+DEFAULT_SUMMARY_TRIGGER_TOKENS = 3000
+
+summary_instructions = """You maintain a rolling summary of a conversation between a user and an assistant.
+Merge the previous summary with the new messages into one concise summary.
+Keep facts, user preferences, decisions and open questions. Drop greetings and filler.
+Reply with the summary text only, in the language of the conversation.
+
+<PreviousSummary>
+{summary}
+</PreviousSummary>
+
+<NewMessages>
+{messages}
+</NewMessages>
+"""
+
+summary_system_prompt = "以下是此前对话的摘要，请结合摘要和后续消息继续对话：\n{summary}"
+
+
+@dataclass
+class ChatSession:
+    """对话会话，messages 只包含尚未折叠进摘要的消息"""
+    session_id: str
+    summary: str = ""
+    messages: list[dict] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+
+class InMemorySessionStore:
+    """基于内存的会话存储"""
+
+    def __init__(self):
+        self._sessions: dict[str, ChatSession] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> ChatSession:
+        """获取会话快照，不存在时返回空会话"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return ChatSession(session_id=session_id)
+            return ChatSession(
+                session_id=session_id,
+                summary=session.summary,
+                messages=list(session.messages),
+                updated_at=session.updated_at,
+            )
+
+    def append(self, session_id: str, messages: list[dict]):
+        """追加消息"""
+        with self._lock:
+            session = self._sessions.setdefault(session_id, ChatSession(session_id=session_id))
+            session.messages.extend(messages)
+            session.updated_at = time.time()
+
+    def fold(self, session_id: str, summary: str, count: int):
+        """用新摘要替换最早的 count 条消息"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.summary = summary
+            del session.messages[:count]
+            session.updated_at = time.time()
+
+    def delete(self, session_id: str):
+        """删除会话"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """基于 SQLite 的会话存储，进程重启后历史仍然保留"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL DEFAULT '', updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, message TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages (session_id, id)"
+            )
+
+    def get(self, session_id: str) -> ChatSession:
+        """获取会话快照，不存在时返回空会话"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, updated_at FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return ChatSession(session_id=session_id)
+            rows = self._conn.execute(
+                "SELECT message FROM chat_messages WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        return ChatSession(
+            session_id=session_id,
+            summary=row[0],
+            messages=[json.loads(message) for message, in rows],
+            updated_at=row[1],
+        )
+
+    def append(self, session_id: str, messages: list[dict]):
+        """追加消息"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO chat_sessions (session_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (session_id, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO chat_messages (session_id, message) VALUES (?, ?)",
+                [(session_id, json.dumps(message, ensure_ascii=False)) for message in messages],
+            )
+
+    def fold(self, session_id: str, summary: str, count: int):
+        """用新摘要替换最早的 count 条消息"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE chat_sessions SET summary = ?, updated_at = ? WHERE session_id = ?",
+                (summary, time.time(), session_id),
+            )
+            self._conn.execute(
+                "DELETE FROM chat_messages WHERE id IN ("
+                "SELECT id FROM chat_messages WHERE session_id = ? ORDER BY id LIMIT ?)",
+                (session_id, count),
+            )
+
+    def delete(self, session_id: str):
+        """删除会话"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+
+
+class HistoryPolicy:
+    """按 token 预算划分最近窗口和待折叠历史"""
+
+    def __init__(self, window_tokens: int, summary_trigger_tokens: int):
+        self.window_tokens = window_tokens
+        self.summary_trigger_tokens = max(summary_trigger_tokens, window_tokens)
+
+    def window_start(self, messages: list[dict]) -> int:
+        """返回最近窗口的起始下标，窗口至少包含最后一条消息"""
+        budget = self.window_tokens
+        start = len(messages)
+        while start > 0:
+            cost = estimate_message_tokens(messages[start - 1])
+            if cost > budget and start < len(messages):
+                break
+            budget -= cost
+            start -= 1
+        return start
+
+    def build_prompt(self, session: ChatSession) -> list[dict]:
+        """
+        构造发送给模型的消息：摘要 + 全部尚未折叠的消息
+
+        窗口之前的消息在折叠进摘要之前（未达到触发阈值或后台摘要仍在进行）也保留在提示中，
+        提示大小由触发阈值限制，折叠后回到最近窗口
+        """
+        if not session.summary:
+            return list(session.messages)
+        return [{"role": "system", "content": summary_system_prompt.format(summary=session.summary)}, *session.messages]
+
+    def foldable_count(self, session: ChatSession) -> int:
+        """返回需要折叠进摘要的最早消息数量，未超过触发阈值时为 0"""
+        if estimate_messages_tokens(session.messages) <= self.summary_trigger_tokens:
+            return 0
+        return self.window_start(session.messages)
+
+
+class SessionManager:
+    """会话管理器，负责读写会话以及后台滚动摘要"""
+
+    def __init__(self, store, policy: HistoryPolicy):
+        self.store = store
+        self.policy = policy
+        self._summarizing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def build_turn(self, session_id: str, messages: list[dict]) -> list[dict]:
+        """返回本轮使用的提示消息，本轮消息此时不写入会话，收到回复后与回复一起保存"""
+        session = self.store.get(session_id)
+        session.messages.extend(messages)
+        return self.policy.build_prompt(session)
+
+    def add_reply(self, session_id: str, messages: list[dict], content: str, llm):
+        """
+        一次写入本轮消息和助手回复，并在需要时启动后台摘要；没有产生回复的轮次不会留下孤立的用户消息
+
+        Args:
+            session_id (str): 会话ID
+            messages (list[dict]): 本轮新增的消息
+            content (str): 助手回复
+            llm: 生成摘要使用的语言模型
+        """
+        self.store.append(session_id, [*messages, {"role": "assistant", "content": content}])
+        self.schedule_summary(session_id, llm)
+
+    def schedule_summary(self, session_id: str, llm):
+        """启动后台摘要任务，同一会话同时只有一个摘要任务"""
+        if session_id in self._summarizing:
+            return
+        self._summarizing.add(session_id)
+        task = asyncio.create_task(self._summarize(session_id, llm))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, session_id: str, llm):
+        try:
+            session = self.store.get(session_id)
+            count = self.policy.foldable_count(session)
+            if count == 0:
+                return
+            folded = session.messages[:count]
+            transcript = "\n".join(f"{message.get('role', '')}: {message.get('content', '')}" for message in folded)
+            async with get_llm_scheduler().aslot(WORKLOAD_BACKGROUND):
+                response = await llm.ainvoke([{
+                    "role": "user",
+                    "content": summary_instructions.format(summary=session.summary, messages=transcript),
+                }])
+            self.store.fold(session_id, response.content, count)
+            logging.info(f"会话 {session_id} 已折叠 {count} 条历史消息进摘要")
+        except Exception as e:
+            logging.error(f"会话 {session_id} 摘要失败: {str(e)}", exc_info=True)
+        finally:
+            self._summarizing.discard(session_id)
+
+    def delete(self, session_id: str):
+        """删除会话"""
+        self.store.delete(session_id)
+
+
+def _create_store():
+    """根据环境变量选择会话存储"""
+    db_path = os.getenv(CHAT_SESSION_DB)
+    if db_path:
+        return SQLiteSessionStore(db_path)
+    return InMemorySessionStore()
+
+
+@lazy
+def get_session_manager() -> SessionManager:
+    """获取全局会话管理器"""
+    return SessionManager(
+        _create_store(),
+        HistoryPolicy(
+            window_tokens=int(os.getenv(CHAT_HISTORY_WINDOW_TOKENS, DEFAULT_WINDOW_TOKENS)),
+            summary_trigger_tokens=int(os.getenv(CHAT_HISTORY_SUMMARY_TRIGGER_TOKENS, DEFAULT_SUMMARY_TRIGGER_TOKENS)),
+        ),
+    )
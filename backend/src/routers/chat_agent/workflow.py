@@ -1,21 +1,32 @@
-from math import log
-from langgraph.graph import StateGraph, START, END
+"""
+对话智能体的工作流定义
+LangGraph 和模型客户端在第一次使用时才导入和初始化
+"""
+
 import logging
-from langchain_openai import ChatOpenAI
-from langgraph.config import get_stream_writer
 from typing import TypedDict
 from typing_extensions import Annotated
 import operator
 import os
 from dotenv import load_dotenv
 
+from ...utils.lazy import lazy
+from ...utils.scheduler import WORKLOAD_CHAT, get_llm_scheduler
+from ...utils.warmup import warm_up_model
+
 load_dotenv()
 
-api_key = os.getenv("QWEN_API_KEY")
-base_url = os.getenv("QWEN_API_BASE_URL")
 model_name = 'qwen-turbo'
 
-llm = ChatOpenAI(model=model_name, api_key=api_key, base_url=base_url, temperature=0.7)
+
+@lazy
+def get_chat_llm():
+    """获取对话模型，首次使用时才导入 OpenAI 客户端并初始化"""
+    from langchain_openai import ChatOpenAI
+    
+    return ChatOpenAI(
+        model=model_name, api_key=os.getenv("QWEN_API_KEY"), base_url=os.getenv("QWEN_API_BASE_URL"), temperature=0.7
+    )
 
 # langgraph 中的update模式只会返回节点中state更新的数据部分，而values是返回全局的state
 class OverState(TypedDict):
@@ -29,12 +40,21 @@ def custom_check_point_output(data: dict):
     Args:
         data (dict): 要输出的数据
     """
+    from langgraph.config import get_stream_writer
+    
     writer = get_stream_writer()  
     writer(data)
 
-def llm_response(state:OverState):
+async def llm_response(state:OverState):
     logging.info(f"llm_response received state: {state['messages']}")
-    response = llm.invoke(state['messages'])
+    warm_up = warm_up_model.get()
+    if warm_up is not None:
+        # 启动预热不调用模型，也不占用调度器
+        response = await warm_up.ainvoke(state['messages'])
+    else:
+        # 对话以最高优先级调度，排队期间不占用线程，避免被深度搜索的调用拖慢
+        async with get_llm_scheduler().aslot(WORKLOAD_CHAT):
+            response = await get_chat_llm().ainvoke(state['messages'])
     ai_response_content = response.content
     logging.info(f"llm_response received response: {ai_response_content}")
     custom_check_point_output({'type':'update_message','message':ai_response_content})
@@ -44,13 +64,18 @@ def check_state(state:OverState):
     logging.info(f"check_state running")
     return { 'is_over': True }
 
-graph_builder = StateGraph(OverState)
-
-graph_builder.add_node("llm_response",llm_response)
-graph_builder.add_node("check_state",check_state)
-
-graph_builder.add_edge(START, "llm_response")
-graph_builder.add_edge("llm_response", "check_state")
-graph_builder.add_edge("check_state", END)
-
-app = graph_builder.compile()
\ No newline at end of file
+@lazy
+def get_chat_graph():
+    """获取编译后的对话工作流"""
+    from langgraph.graph import StateGraph, START, END
+    
+    graph_builder = StateGraph(OverState)
+    
+    graph_builder.add_node("llm_response",llm_response)
+    graph_builder.add_node("check_state",check_state)
+    
+    graph_builder.add_edge(START, "llm_response")
+    graph_builder.add_edge("llm_response", "check_state")
+    graph_builder.add_edge("check_state", END)
+    
+    return graph_builder.compile()
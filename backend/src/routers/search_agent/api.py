@@ -6,23 +6,175 @@
 import time
 import logging
 import json
-from typing import AsyncGenerator
+import uuid
+from contextlib import aclosing
+from typing import AsyncGenerator, Optional
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-from langchain_core.messages import message_to_dict
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, WebSocket
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from .models import InputData
-from .workflow import create_workflow
+from ...utils.admin import ERROR_ADMIN_REQUIRED, is_admin, require_admin
+from ...utils.metrics import get_metrics
+from ...utils.responses import FastJSONResponse
+from ...utils.runtime import SamplingProfiler, load_profile, save_profile
+from ...utils.scheduler import set_workload, workload_for_effort
+from ...utils.stream_pump import SSE_HEARTBEAT, format_sse, sse_pump
+from ...utils.websocket import RunMultiplexer
+from .models import InputData, BatchInputData, ProjectionEnum
+from .projection import project_state, source_page
+from .workflow import get_search_graph
 from .config import get_config
-from .constants import ERROR_QUERY_EMPTY, ERROR_MESSAGES_NOT_LIST, MAX_SEARCH_LOOP
+from .cache import get_answer_cache, make_cache_key
+from .coalescing import get_run_coalescer
+from .jobs import Job, JobQueueFullError, JOB_SUCCEEDED, get_job_manager
+from .batch import BatchRun
+from .constants import (
+    ERROR_QUERY_EMPTY,
+    ERROR_MESSAGES_NOT_LIST,
+    ERROR_JOB_NOT_FOUND,
+    ERROR_JOB_NOT_FINISHED,
+    ERROR_JOB_QUEUE_FULL,
+    ERROR_BATCH_EMPTY,
+    ERROR_BATCH_TOO_LARGE,
+    ERROR_PROFILE_NOT_FOUND,
+    ERROR_SOURCES_NOT_FOUND,
+    SOURCES_PAGE_SIZE,
+    SOURCES_PAGE_MAX,
+    BATCH_MAX_QUERIES,
+    MAX_SEARCH_LOOP,
+    EFFORT_MAX_SEARCH_LOOP,
+)
 
 # 创建路由器
 router = APIRouter()
 
-# 初始化工作流
-config = get_config()
-app = create_workflow()
+# 工作流和客户端在应用启动时初始化，见 src/startup.py
+answer_cache = get_answer_cache()
+run_coalescer = get_run_coalescer()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+    # 添加浏览器兼容头部
+    "Content-Encoding": "none",
+    "X-SSE-Content-Type": "text/event-stream"
+}
+
+
+def get_max_search_loop(effort: str) -> int:
+    """根据搜索强度获取最大搜索次数"""
+    return EFFORT_MAX_SEARCH_LOOP.get(effort, MAX_SEARCH_LOOP)
+
+
+async def graph_run_events(
+    query: str, messages: list, max_search_loop: int, final_state: Optional[dict] = None, run_id: Optional[str] = None
+) -> AsyncGenerator[tuple[str, dict], None]:
+    """
+    运行工作流并将输出转换为结构化事件，SSE 和 WebSocket 接口共用
+    
+    Args:
+        query (str): 用户查询字符串
+        messages (list): 消息历史列表
+        max_search_loop (int): 最大搜索次数
+        final_state (dict, optional): 传入时同时订阅状态值，运行结束后包含工作流的最终状态
+        run_id (str, optional): 运行ID，默认随机生成
+        
+    Yields:
+        tuple[str, dict]: 事件名称（updates、messages 或 custom）和事件数据
+    """
+    from langchain_core.messages import message_to_dict
+    
+    from .nodes import release_run
+    
+    run_id = run_id or str(uuid.uuid4())
+    try:
+        async for chunk in get_search_graph().astream(
+            {
+                "query": query,
+                "messages": messages,
+                "max_search_loop": max_search_loop,
+                "search_loop": 0, # 当前搜索次数
+                "run_id": run_id
+            }, 
+            stream_mode=["messages", "custom"] if final_state is None else ["messages", "custom", "values"]
+        ):
+            logging.info(f"Chunk: {chunk}")
+            mode, *_ = chunk
+        
+            if mode == "updates":
+                mode, data = chunk
+                node_name = list(data.keys())[0]
+                # 结构化响应数据
+                yield mode, {
+                    "mode": mode,
+                    "node": node_name,
+                    "data": data[node_name]
+                }
+        
+            elif mode == "messages":
+                mode, message_chunk = chunk
+                llm_token, metadata = message_chunk
+                # 结构化响应数据
+                yield mode, {
+                    "mode": mode,
+                    "node": metadata.get('langgraph_node', ""),
+                    "data": message_to_dict(llm_token),
+                }
+        
+            # 自定义消息用来显示当前正在运行的节点
+            elif mode == "custom":
+                mode, data = chunk
+                node_name = data['node']
+                # 结构化响应数据
+                yield mode, {
+                    "mode": mode,
+                    "node": node_name,
+                    "data": data
+                }
+        
+            # 状态值只用于记录最终状态，不发送给客户端
+            elif mode == "values":
+                mode, data = chunk
+                final_state.update(data)
+    finally:
+        # 客户端断开或运行出错时也释放运行范围的对象
+        release_run(run_id)
+
+
+async def graph_events(
+    query: str, messages: list, max_search_loop: int, final_state: Optional[dict] = None, run_id: Optional[str] = None
+) -> AsyncGenerator[str, None]:
+    """
+    运行工作流并将输出转换为 SSE 事件，参数同 graph_run_events
+        
+    Yields:
+        str: SSE 格式的事件文本
+    """
+    async for event, response in graph_run_events(query, messages, max_search_loop, final_state, run_id):
+        yield format_sse(event, response)
+
+
+async def run_job(job: Job, result: dict) -> AsyncGenerator[str, None]:
+    """
+    后台任务运行函数，产生与流式接口相同的事件，成功结束后写入回答缓存
+    
+    Args:
+        job (Job): 研究任务
+        result (dict): 运行结束后写入可 JSON 序列化的最终状态
+        
+    Yields:
+        str: SSE 格式的事件文本
+    """
+    set_workload(workload_for_effort(job.effort))
+    state = {}
+    events = []
+    async for event in graph_events(job.query, job.messages, get_max_search_loop(job.effort), final_state=state):
+        events.append(event)
+        yield event
+    result.update(jsonable_encoder(state))
+    answer_cache.put(make_cache_key(job.query, job.effort, job.messages), state=result, events=events)
 
 
 @router.get("/{query}", tags=["search"])
@@ -45,16 +197,47 @@ async def test(query: str):
     return {"result": query}
 
 
-@router.get("/query/{query}", tags=["search"])
-async def run_workflow_non_stream(query: str):
+@router.delete("/cache", tags=["search"], dependencies=[Depends(require_admin)])
+async def invalidate_cache(query: Optional[str] = None, effort: Optional[str] = None):
+    """
+    失效回答缓存，管理员专用
+    
+    Args:
+        query (str, optional): 需要失效的查询，为空时失效全部查询
+        effort (str, optional): 需要失效的搜索强度，为空时失效全部强度
+        
+    Returns:
+        dict: 被删除的缓存条目数量
+    """
+    return {"invalidated": answer_cache.invalidate(query, effort)}
+
+
+def projected_response(state: dict, projection: ProjectionEnum) -> FastJSONResponse:
+    """按投影序列化工作流结果，记录各投影的响应大小和序列化耗时"""
+    metrics = get_metrics()
+    started_at = time.perf_counter()
+    response = FastJSONResponse(project_state(state, projection))
+    metrics.observe(f"query.serialize_seconds.{projection.value}", time.perf_counter() - started_at)
+    metrics.observe(f"query.response_bytes.{projection.value}", len(response.body))
+    return response
+
+
+@router.get("/query/{query}", tags=["search"], response_class=FastJSONResponse)
+async def run_workflow_non_stream(
+    query: str, effort: str = "low", refresh: bool = False, projection: ProjectionEnum = ProjectionEnum.FULL
+):
     """
     运行非流式工作流
     
     Args:
         query (str): 用户查询字符串
+        effort (str): 搜索强度，low、medium 或 high
+        refresh (bool): 为 True 时跳过缓存重新运行工作流
+        projection (ProjectionEnum): 返回字段，answer 只返回回答，citations 额外返回被引用的来源，
+            full 返回完整的工作流状态；来源可通过 /query/{query}/sources 分页获取
         
     Returns:
-        dict: 工作流执行结果
+        FastJSONResponse: 按投影选取字段的工作流执行结果
         
     Raises:
         HTTPException: 当查询字符串为空时抛出400错误
@@ -64,18 +247,66 @@ async def run_workflow_non_stream(query: str):
     if not query or not query.strip():
         raise HTTPException(status_code=400, detail=ERROR_QUERY_EMPTY)
     
+    set_workload(workload_for_effort(effort))
+    cache_key = make_cache_key(query, effort, [])
+    if not refresh:
+        cached = answer_cache.get_state(cache_key)
+        if cached is not None:
+            logging.info(f"命中回答缓存: {query}")
+            return projected_response(cached, projection)
+    
+    from .nodes import release_run
+    
+    run_id = str(uuid.uuid4())
     try:
         logging.info(f"开始非流式传输: {query}")
-        result = await app.ainvoke({"query": query.strip()})
+        result = await get_search_graph().ainvoke({
+            "query": query.strip(),
+            "messages": [],
+            "max_search_loop": get_max_search_loop(effort),
+            "search_loop": 0,
+            "run_id": run_id
+        })
         logging.info(f"非流式传输完成: {query}")
-        return result
+        answer_cache.put(cache_key, state=result)
     except Exception as e:
         logging.error(f"非流式传输错误: {query}, 错误: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"非流式传输错误: {str(e)}")
+    finally:
+        release_run(run_id)
+    return projected_response(result, projection)
+
+
+@router.get("/query/{query}/sources", tags=["search"], response_class=FastJSONResponse)
+async def get_query_sources(
+    query: str,
+    effort: str = "low",
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=SOURCES_PAGE_SIZE, ge=1, le=SOURCES_PAGE_MAX),
+):
+    """
+    分页获取非流式查询结果的来源，来源按 URL 去重，编号与回答中的引用一致
+    
+    Args:
+        query (str): 用户查询字符串
+        effort (str): 搜索强度，与查询时一致
+        offset (int): 起始位置
+        limit (int): 每页数量
+        
+    Returns:
+        FastJSONResponse: 包含 total、offset、limit 和 items 的分页结果
+        
+    Raises:
+        HTTPException: 查询结果不在缓存中时抛出404错误
+    """
+    state = answer_cache.get_state(make_cache_key(query, effort, []))
+    if state is None:
+        raise HTTPException(status_code=404, detail=ERROR_SOURCES_NOT_FOUND)
+    return FastJSONResponse(source_page(state, offset, limit))
 
 
 @router.post("/stream", tags=["search"])
-async def run_workflow_stream(input_data: InputData):
+async def run_workflow_stream(input_data: InputData, x_admin_token: Optional[str] = Header(default=None)):
     """
     运行流式工作流
     
@@ -83,6 +314,9 @@ async def run_workflow_stream(input_data: InputData):
         input_data (InputData): 包含查询字符串和消息历史的输入数据
             - query (str): 用户查询字符串（必填）
             - messages (list, optional): 消息历史列表
+            - refresh (bool, optional): 为 True 时跳过缓存重新运行工作流
+            - profile (bool, optional): 为 True 时对本次运行采样分析，结束前发送 profile 事件，需要管理员令牌
+        x_admin_token (str, optional): 管理员令牌
             
     Returns:
         StreamingResponse: SSE流式响应对象
@@ -90,19 +324,16 @@ async def run_workflow_stream(input_data: InputData):
     Raises:
         HTTPException: 当查询字符串为空时抛出400错误
         HTTPException: 当messages字段不是列表时抛出400错误
+        HTTPException: 非管理员请求采样分析时抛出403错误
     """
     logging.info(f"开始请求，数据体: {input_data}")
     query = input_data["query"]  # 必填字段直接访问
     messages = input_data.get("messages", [])
     effort = input_data.get("effort", 'low')
-    max_search_loop = MAX_SEARCH_LOOP  # 默认最大搜索次数
+    refresh = input_data.get("refresh", False)
+    profile = input_data.get("profile", False)
     # 最大搜索次数
-    if effort == "low":
-        max_search_loop = 3
-    elif effort == "medium":
-        max_search_loop = 5
-    elif effort == "high":
-        max_search_loop = 10
+    max_search_loop = get_max_search_loop(effort)
     
     # 输入验证
     if not query or not query.strip():
@@ -112,66 +343,54 @@ async def run_workflow_stream(input_data: InputData):
     if messages and not isinstance(messages, list):
         raise HTTPException(status_code=400, detail=ERROR_MESSAGES_NOT_LIST)
     
+    if profile and not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail=ERROR_ADMIN_REQUIRED)
+    
+    # 工作流在当前上下文中创建，节点内的模型和搜索调用按搜索强度调度
+    set_workload(workload_for_effort(effort))
+    cache_key = make_cache_key(query, effort, messages)
+    # 采样分析的运行总是实际执行工作流
+    cached_events = None if refresh or profile else answer_cache.get_events(cache_key)
+    if cached_events is not None:
+        logging.info(f"命中回答缓存，回放事件: {query}")
+        
+        async def replay_updates() -> AsyncGenerator[str, None]:
+            for event in cached_events:
+                yield event
+            yield "event: end\ndata: {}\n\n"
+        
+        return StreamingResponse(
+            replay_updates(),
+            media_type="text/event-stream",
+            headers={**SSE_HEADERS, "X-Cache": "HIT"}
+        )
+    
+    run_id = str(uuid.uuid4())
+    profiler = SamplingProfiler() if profile else None
+    if messages or profiler is not None:
+        events = graph_events(query, messages, max_search_loop, run_id=run_id)
+    else:
+        # 无历史的相同请求合并到同一次工作流执行
+        events = run_coalescer.subscribe(cache_key, lambda: graph_events(query, messages, max_search_loop))
+    
     async def stream_updates() -> AsyncGenerator[str, None]:
+        # 记录本次运行的事件序列，成功结束后写入缓存
+        recorded_events = []
+        completed = False
+        # 工作流在独立任务中运行，心跳按定时器发送 (防止代理超时断开)，客户端过慢时按策略合并、丢弃或断开
+        pump = sse_pump(events, "stream.search", get_config().heartbeat_interval)
         try:
             logging.info(f"开始流式传输: {query}")
-            # 添加心跳机制 (每30秒发送空注释)
-            last_sent = time.time()
-            heartbeat_interval = config.heartbeat_interval
+            if profiler is not None:
+                profiler.start()
             
-            async for chunk in app.astream(
-                {
-                    "query": query,
-                    "messages": messages,
-                    "max_search_loop": max_search_loop,
-                    "search_loop": 0 # 当前搜索次数
-                }, 
-                stream_mode=["messages", "custom"]
-            ):
-                logging.info(f"Chunk: {chunk}")
-                mode, *_ = chunk
-                
-                # 发送心跳 (防止代理超时断开)
-                if time.time() - last_sent > heartbeat_interval:
-                    yield ":keep-alive\n\n"
-                    last_sent = time.time()
-                
-                if mode == "updates":
-                    mode, data = chunk
-                    node_name = list(data.keys())[0]
-                    # 结构化响应数据
-                    response = {
-                        "mode": mode,
-                        "node": node_name,
-                        "data": data[node_name]
-                    }
-                    yield f"event: updates\ndata: {json.dumps(response)}\n\n"
-                    last_sent = time.time()
-                
-                elif mode == "messages":
-                    mode, message_chunk = chunk
-                    llm_token, metadata = message_chunk
-                    # 结构化响应数据
-                    response = {
-                        "mode": mode,
-                        "node": metadata.get('langgraph_node', ""),
-                        "data": message_to_dict(llm_token),
-                    }
-                    yield f"event: messages\ndata: {json.dumps(response)}\n\n"
-                    last_sent = time.time()
-                
-                # 自定义消息用来显示当前正在运行的节点
-                elif mode == "custom":
-                    mode, data = chunk
-                    node_name = data['node']
-                    # 结构化响应数据
-                    response = {
-                        "mode": mode,
-                        "node": node_name,
-                        "data": data
-                    }
-                    yield f"event: custom\ndata: {json.dumps(response)}\n\n"
-                    last_sent = time.time()
+            async for event in pump.stream():
+                if event != SSE_HEARTBEAT:
+                    recorded_events.append(event)
+                yield event
+            
+            # 丢弃过低价值事件的序列不完整，不写入缓存
+            completed = pump.dropped == 0
             
         except Exception as e:
             logging.error(f"流式传输错误: {query}, 错误: {str(e)}", exc_info=True)
@@ -181,6 +400,18 @@ async def run_workflow_stream(input_data: InputData):
             logging.error(f"Streaming error: {str(e)}")
         
         finally:
+            if completed:
+                answer_cache.put(cache_key, events=recorded_events)
+            if profiler is not None:
+                profiler.stop()
+                save_profile(run_id, profiler)
+                profile_data = json.dumps({
+                    "run_id": run_id,
+                    "samples": profiler.samples,
+                    "duration": profiler.duration,
+                    "top_functions": profiler.top_functions(),
+                })
+                yield f"event: profile\ndata: {profile_data}\n\n"
             logging.info(f"流式传输结束: {query}")
             # 发送结束事件
             yield "event: end\ndata: {}\n\n"
@@ -188,12 +419,206 @@ async def run_workflow_stream(input_data: InputData):
     return StreamingResponse(
         stream_updates(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-            # 添加浏览器兼容头部
-            "Content-Encoding": "none",
-            "X-SSE-Content-Type": "text/event-stream"
-        }
-    )
\ No newline at end of file
+        headers={**SSE_HEADERS, "X-Cache": "MISS"}
+    )
+
+
+async def websocket_run_events(input_data: dict) -> AsyncGenerator[tuple[str, dict], None]:
+    """
+    WebSocket 连接上的一次运行，输入数据与流式接口相同（query、effort、messages）
+    
+    Raises:
+        ValueError: 查询字符串为空或 messages 字段不是列表时抛出，作为该运行的 error 事件发送
+    """
+    query = input_data.get("query") or ""
+    messages = input_data.get("messages") or []
+    effort = input_data.get("effort", "low")
+    if not query.strip():
+        raise ValueError(ERROR_QUERY_EMPTY)
+    if not isinstance(messages, list):
+        raise ValueError(ERROR_MESSAGES_NOT_LIST)
+    set_workload(workload_for_effort(effort))
+    async for event in graph_run_events(query, messages, get_max_search_loop(effort)):
+        yield event
+
+
+@router.websocket("/ws")
+async def run_workflow_websocket(websocket: WebSocket):
+    """
+    WebSocket 流式接口：一个连接上可以同时运行多个工作流并单独取消，事件以 msgpack 二进制帧发送，
+    帧格式见 src/utils/websocket.py
+    
+    Args:
+        websocket (WebSocket): WebSocket 连接
+    """
+    await RunMultiplexer(websocket, websocket_run_events, "search").serve()
+
+
+@router.get("/profiles/{run_id}", tags=["search"], dependencies=[Depends(require_admin)])
+async def get_profile(run_id: str):
+    """
+    获取流式运行的采样分析结果，需要管理员令牌
+    
+    Args:
+        run_id (str): profile 事件中的运行ID
+        
+    Returns:
+        PlainTextResponse: 折叠栈文本，每行为以分号分隔的调用栈和采样次数，可直接用于 flamegraph
+        
+    Raises:
+        HTTPException: 分析结果不存在时抛出404错误
+    """
+    try:
+        run_id = str(uuid.UUID(run_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail=ERROR_PROFILE_NOT_FOUND)
+    folded = load_profile(run_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail=ERROR_PROFILE_NOT_FOUND)
+    return PlainTextResponse(folded)
+
+
+@router.post("/jobs", tags=["search"], status_code=202)
+async def submit_job(input_data: InputData):
+    """
+    提交后台研究任务，立即返回任务ID
+    
+    Args:
+        input_data (InputData): 与流式接口相同的输入数据
+        
+    Returns:
+        dict: 任务状态
+        
+    Raises:
+        HTTPException: 当查询字符串为空时抛出400错误
+        HTTPException: 当messages字段不是列表时抛出400错误
+        HTTPException: 当排队任务过多时抛出503错误
+    """
+    query = input_data["query"]
+    messages = input_data.get("messages", [])
+    effort = input_data.get("effort", 'low')
+    
+    if not query or not query.strip():
+        raise HTTPException(status_code=400, detail=ERROR_QUERY_EMPTY)
+    if messages and not isinstance(messages, list):
+        raise HTTPException(status_code=400, detail=ERROR_MESSAGES_NOT_LIST)
+    
+    try:
+        job = await get_job_manager().submit(query.strip(), effort, messages or [])
+    except JobQueueFullError:
+        raise HTTPException(status_code=503, detail=ERROR_JOB_QUEUE_FULL)
+    logging.info(f"提交后台任务: {job.id}, 查询: {query}")
+    return job.to_dict()
+
+
+def get_job_or_404(job_id: str) -> Job:
+    """获取任务，不存在时抛出404错误"""
+    job = get_job_manager().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=ERROR_JOB_NOT_FOUND)
+    return job
+
+
+@router.get("/jobs/{job_id}", tags=["search"])
+async def get_job_status(job_id: str):
+    """
+    查询后台任务状态
+    
+    Args:
+        job_id (str): 任务ID
+        
+    Returns:
+        dict: 任务状态，包含已产生的事件数量
+    """
+    return get_job_or_404(job_id).to_dict()
+
+
+@router.get("/jobs/{job_id}/result", tags=["search"])
+async def get_job_result(job_id: str):
+    """
+    获取后台任务的最终状态
+    
+    Args:
+        job_id (str): 任务ID
+        
+    Returns:
+        dict: 与非流式接口相同的工作流最终状态
+        
+    Raises:
+        HTTPException: 当任务不存在时抛出404错误
+        HTTPException: 当任务尚未成功结束时抛出409错误
+    """
+    job = get_job_or_404(job_id)
+    if job.status != JOB_SUCCEEDED:
+        raise HTTPException(status_code=409, detail={"message": ERROR_JOB_NOT_FINISHED, **job.to_dict()})
+    return get_job_manager().store.result(job_id)
+
+
+@router.get("/jobs/{job_id}/stream", tags=["search"])
+async def stream_job(job_id: str, after: int = 0, last_event_id: Optional[str] = Header(default=None)):
+    """
+    接入后台任务的事件流，任务运行中或已结束均可接入
+    
+    Args:
+        job_id (str): 任务ID
+        after (int): 起始事件序号，默认从头回放
+        last_event_id (str, optional): 断线重连时浏览器自动携带的 Last-Event-ID，优先于 after
+        
+    Returns:
+        StreamingResponse: SSE流式响应对象，每个事件带有序号 id
+    """
+    get_job_or_404(job_id)
+    if last_event_id is not None and last_event_id.isdigit():
+        after = int(last_event_id) + 1
+    
+    async def stream_events() -> AsyncGenerator[str, None]:
+        seq = after
+        async for event in get_job_manager().stream(job_id, after):
+            yield f"id: {seq}\n{event}"
+            seq += 1
+        yield "event: end\ndata: {}\n\n"
+    
+    return StreamingResponse(stream_events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/batch", tags=["search"])
+async def run_batch(input_data: BatchInputData):
+    """
+    批量研究，整个批次的搜索查询去重后共享搜索结果
+    
+    Args:
+        input_data (BatchInputData): 批量输入数据
+            - queries (list[str]): 研究问题列表（必填）
+            - effort (str, optional): 搜索强度
+            - refresh (bool, optional): 为 True 时跳过缓存重新运行工作流
+            
+    Returns:
+        StreamingResponse: JSONL 流式响应，每行一个进度或结果，最后一行为批次汇总
+        
+    Raises:
+        HTTPException: 当问题列表为空或包含空问题时抛出400错误
+        HTTPException: 当问题数量超过上限时抛出400错误
+    """
+    queries = [query.strip() for query in input_data["queries"] if isinstance(query, str)]
+    effort = input_data.get("effort", 'low')
+    if not queries or len(queries) != len(input_data["queries"]) or not all(queries):
+        raise HTTPException(status_code=400, detail=ERROR_BATCH_EMPTY)
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=ERROR_BATCH_TOO_LARGE)
+    
+    logging.info(f"开始批量研究: {len(queries)} 个问题")
+    batch = BatchRun(
+        queries,
+        max_search_loop=get_max_search_loop(effort),
+        effort=effort,
+        concurrency=get_config().batch_concurrency,
+        refresh=input_data.get("refresh", False),
+    )
+    
+    async def stream_lines() -> AsyncGenerator[str, None]:
+        # 客户端断开时立即关闭批次，取消仍在运行的条目
+        async with aclosing(batch.run()) as lines:
+            async for line in lines:
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream_lines(), media_type="application/x-ndjson")
@@ -0,0 +1,231 @@
+"""
+批量研究
+一次提交多个相关问题：先为所有条目生成搜索查询，再对整个批次的查询去重并预取，
+每个不同的查询只调用一次搜索提供方；随后以有限并发恢复各条目的反思和回答阶段，
+各条目共享同一份搜索结果，结果完成一条输出一条。
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Optional
+
+from ...utils.metrics import get_metrics
+from ...utils.scheduler import WORKLOAD_BACKGROUND, set_workload
+from .cache import get_answer_cache, make_cache_key, normalize_query
+from .constants import BATCH_SEARCH_CONCURRENCY
+from .models import SearchDepthEnum
+from .providers import SearchMemo, search_memo
+
+# 在知识库检索前中断，此时所有条目的首轮搜索查询都已生成
+PLANNED_NODE = "knowledge_lookup"
+
+
+def planned_search_queries(state: dict) -> list[str]:
+    """
+    获取条目首轮要执行的搜索查询，查询计划中依赖其他步骤的查询执行时才能确定，不参与预取
+
+    Args:
+        state (dict): 中断时的工作流状态
+
+    Returns:
+        list[str]: 搜索查询
+    """
+    plan = state.get("query_plan")
+    if plan:
+        return [step["query"] for step in plan if not step["depends_on"]]
+    return list(state.get("web_search_query_wait_list") or [])
+
+
+def prefetch_search(query: str):
+    """按网络搜索节点的方式预取一个查询的结果，知识库能回答的查询跳过"""
+    from .knowledge import get_knowledge_store
+    from .nodes import gather_sources
+
+    knowledge_store = get_knowledge_store()
+    if knowledge_store is not None and knowledge_store.lookup(query) is not None:
+        return
+    gather_sources(query, SearchDepthEnum.BASIC.value)
+
+
+class BatchRun:
+    """一次批量研究"""
+
+    def __init__(self, queries: list[str], max_search_loop: int, effort: str, concurrency: int, refresh: bool = False):
+        """
+        Args:
+            queries (list[str]): 研究问题
+            max_search_loop (int): 每个条目的最大搜索次数
+            effort (str): 搜索强度，用于回答缓存
+            concurrency (int): 同时运行的条目数
+            refresh (bool): 为 True 时跳过回答缓存
+        """
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        from .workflow import create_workflow
+
+        self.queries = queries
+        self.max_search_loop = max_search_loop
+        self.effort = effort
+        self.refresh = refresh
+        self.memo = SearchMemo()
+        self.checkpointer = InMemorySaver()
+        # 批次独立的检查点存储，批次结束后随之释放
+        self.graph = create_workflow(checkpointer=self.checkpointer, interrupt_before=[PLANNED_NODE])
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._batch_id = uuid.uuid4().hex
+
+    def _thread(self, index: int) -> dict:
+        return {"configurable": {"thread_id": f"{self._batch_id}-{index}"}}
+
+    async def _plan(self, index: int) -> tuple[Optional[list[str]], Optional[dict]]:
+        """运行到首轮搜索前，返回首轮搜索查询；不需要搜索的条目直接运行结束并返回结果"""
+        config = self._thread(index)
+        await self.graph.ainvoke({
+            "query": self.queries[index],
+            "messages": [],
+            "max_search_loop": self.max_search_loop,
+            "search_loop": 0
+        }, config)
+        snapshot = self.graph.get_state(config)
+        if snapshot.next:
+            return planned_search_queries(snapshot.values), None
+        return None, self._finish(index, snapshot.values)
+
+    async def _prefetch(self, query: str, semaphore: asyncio.Semaphore):
+        search_memo.set(self.memo)
+        set_workload(WORKLOAD_BACKGROUND)
+        async with semaphore:
+            await asyncio.to_thread(prefetch_search, query)
+
+    async def _answer(self, index: int) -> dict:
+        """从中断处恢复运行，后续轮次每次在知识库检索前中断时继续"""
+        config = self._thread(index)
+        while True:
+            await self.graph.ainvoke(None, config)
+            snapshot = self.graph.get_state(config)
+            if not snapshot.next:
+                return self._finish(index, snapshot.values)
+
+    async def _run_item(self, index: int, step) -> tuple[int, object, Optional[Exception]]:
+        """在共享搜索结果的上下文中以有限并发运行条目的一个阶段，返回 (下标, 结果, 异常)"""
+        search_memo.set(self.memo)
+        # 批量研究是离线任务，以后台优先级调度，不影响交互请求
+        set_workload(WORKLOAD_BACKGROUND)
+        async with self._semaphore:
+            try:
+                return index, await step(index), None
+            except asyncio.CancelledError:
+                # 批次被中断（例如客户端断开），清理条目的检查点后继续传播取消
+                self.checkpointer.delete_thread(self._thread(index)["configurable"]["thread_id"])
+                raise
+            except Exception as e:
+                logging.error(f"批量研究条目失败: {self.queries[index]}, 错误: {str(e)}", exc_info=True)
+                self.checkpointer.delete_thread(self._thread(index)["configurable"]["thread_id"])
+                return index, None, e
+
+    @staticmethod
+    async def _cancel(tasks: list[asyncio.Task]):
+        """取消并等待尚未完成的条目任务，批次提前结束时不留下继续运行的任务"""
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _finish(self, index: int, state: dict) -> dict:
+        from fastapi.encoders import jsonable_encoder
+
+        from .nodes import release_run
+
+        release_run(state.get("run_id"))
+        self.checkpointer.delete_thread(self._thread(index)["configurable"]["thread_id"])
+        result = jsonable_encoder(state)
+        get_answer_cache().put(make_cache_key(self.queries[index], self.effort, []), state=result)
+        return result
+
+    def _result_line(self, index: int, result: Optional[dict] = None, error: Optional[Exception] = None, cached=False) -> dict:
+        line = {"event": "result", "index": index, "query": self.queries[index]}
+        if error is not None:
+            return {**line, "status": "failed", "error": str(error)}
+        return {**line, "status": "succeeded", "cached": cached, "result": result}
+
+    async def run(self) -> AsyncIterator[dict]:
+        """
+        运行批次
+
+        Yields:
+            dict: 按完成顺序产生的进度和结果，event 为 planned、searched、result 或 summary
+        """
+        metrics = get_metrics()
+        started_at = time.time()
+        counts = {"succeeded": 0, "failed": 0, "cached": 0}
+
+        def count(line: dict) -> dict:
+            counts[line["status"]] += 1
+            if line.get("cached"):
+                counts["cached"] += 1
+            return line
+
+        # 命中回答缓存的条目直接返回
+        pending = []
+        answer_cache = get_answer_cache()
+        for index, query in enumerate(self.queries):
+            cached = None if self.refresh else answer_cache.get_state(make_cache_key(query, self.effort, []))
+            if cached is not None:
+                yield count(self._result_line(index, cached, cached=True))
+            else:
+                pending.append(index)
+
+        # 第一阶段：为所有条目生成搜索查询
+        planned: dict[int, list[str]] = {}
+        tasks = [asyncio.create_task(self._run_item(index, self._plan)) for index in pending]
+        try:
+            for future in asyncio.as_completed(tasks):
+                index, value, error = await future
+                if error is not None:
+                    yield count(self._result_line(index, error=error))
+                    continue
+                queries, result = value
+                if result is not None:
+                    yield count(self._result_line(index, result))
+                else:
+                    planned[index] = queries
+                    yield {"event": "planned", "index": index, "search_queries": queries}
+        finally:
+            await self._cancel(tasks)
+
+        # 第二阶段：整个批次的查询去重后预取
+        unique_queries = list({normalize_query(q): q for queries in planned.values() for q in queries}.values())
+        total_queries = sum(len(queries) for queries in planned.values())
+        semaphore = asyncio.Semaphore(BATCH_SEARCH_CONCURRENCY)
+        errors = await asyncio.gather(*(self._prefetch(query, semaphore) for query in unique_queries), return_exceptions=True)
+        for query, error in zip(unique_queries, errors):
+            # 预取失败的查询在条目自己的搜索节点中重试
+            if isinstance(error, Exception):
+                logging.warning(f"批量研究预取搜索失败: {query}, 错误: {str(error)}")
+        metrics.incr("batch.search_queries", total_queries)
+        metrics.incr("batch.unique_search_queries", len(unique_queries))
+        yield {"event": "searched", "search_queries": total_queries, "unique_search_queries": len(unique_queries)}
+
+        # 第三阶段：共享搜索结果完成各条目的反思和回答
+        tasks = [asyncio.create_task(self._run_item(index, self._answer)) for index in planned]
+        try:
+            for future in asyncio.as_completed(tasks):
+                index, result, error = await future
+                yield count(self._result_line(index, result, error))
+        finally:
+            await self._cancel(tasks)
+
+        elapsed = time.time() - started_at
+        metrics.incr("batch.items", len(self.queries))
+        metrics.observe("batch.run_time", elapsed)
+        yield {
+            "event": "summary",
+            "items": len(self.queries),
+            **counts,
+            "search_queries": total_queries,
+            "unique_search_queries": len(unique_queries),
+            "searches": len(self.memo),
+            "search_reuses": self.memo.hits,
+            "elapsed": elapsed,
+        }
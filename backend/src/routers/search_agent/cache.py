@@ -0,0 +1,134 @@
+"""
+深度搜索完整回答缓存
+按规范化查询、effort 和消息历史哈希缓存最终状态与 SSE 事件序列，
+重复提问时直接返回缓存结果或全速回放事件，无需重新运行工作流。
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from ...utils.metrics import get_metrics
+from .constants import ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES
+
+CacheKey = tuple[str, str, str]
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询：去除首尾空白、合并连续空白并转为小写"""
+    return " ".join(query.split()).lower()
+
+
+def make_cache_key(query: str, effort: str, messages: list[dict]) -> CacheKey:
+    """
+    生成缓存键
+
+    Args:
+        query (str): 用户查询
+        effort (str): 搜索强度
+        messages (list[dict]): 消息历史
+
+    Returns:
+        CacheKey: (规范化查询, effort, 消息历史哈希)
+    """
+    history = json.dumps(messages or [], ensure_ascii=False, sort_keys=True)
+    history_hash = hashlib.sha256(history.encode("utf-8")).hexdigest()[:16]
+    return normalize_query(query), effort, history_hash
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目，state 供非流式接口使用，events 供流式接口回放"""
+    expires_at: float
+    state: Optional[dict] = None
+    events: Optional[list[str]] = None
+    created_at: float = field(default_factory=time.time)
+
+
+class AnswerCache:
+    """带过期时间的 LRU 回答缓存"""
+
+    def __init__(self, ttl: dict[str, int], max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: CacheKey) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_state(self, key: CacheKey) -> Optional[dict]:
+        """获取缓存的最终状态"""
+        with self._lock:
+            entry = self._get(key)
+            state = entry.state if entry else None
+        get_metrics().incr("answer_cache.state_hit" if state is not None else "answer_cache.state_miss")
+        return state
+
+    def get_events(self, key: CacheKey) -> Optional[list[str]]:
+        """获取缓存的 SSE 事件序列"""
+        with self._lock:
+            entry = self._get(key)
+            events = entry.events if entry else None
+        get_metrics().incr("answer_cache.events_hit" if events is not None else "answer_cache.events_miss")
+        return events
+
+    def put(self, key: CacheKey, state: Optional[dict] = None, events: Optional[list[str]] = None):
+        """写入缓存，同一键的 state 和 events 分别保留"""
+        ttl = self.ttl.get(key[1])
+        if not ttl:
+            return
+        with self._lock:
+            entry = self._get(key)
+            if entry is None:
+                entry = CacheEntry(expires_at=time.time() + ttl)
+                self._entries[key] = entry
+            if state is not None:
+                entry.state = state
+            if events is not None:
+                entry.events = events
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            get_metrics().set_gauge("answer_cache.entries", len(self._entries))
+
+    def invalidate(self, query: Optional[str] = None, effort: Optional[str] = None) -> int:
+        """
+        失效缓存条目
+
+        Args:
+            query (str, optional): 查询，为空时匹配全部查询
+            effort (str, optional): 搜索强度，为空时匹配全部强度
+
+        Returns:
+            int: 被删除的条目数量
+        """
+        normalized = normalize_query(query) if query else None
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (normalized is None or key[0] == normalized) and (effort is None or key[1] == effort)
+            ]
+            for key in keys:
+                del self._entries[key]
+            get_metrics().set_gauge("answer_cache.entries", len(self._entries))
+        return len(keys)
+
+
+# 全局回答缓存实例
+answer_cache = AnswerCache(ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES)
+
+
+def get_answer_cache() -> AnswerCache:
+    """获取全局回答缓存实例"""
+    return answer_cache
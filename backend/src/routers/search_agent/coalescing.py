@@ -0,0 +1,94 @@
+"""
+相同运行的请求合并
+相同的规范化查询、effort 且无消息历史的并发流式请求共享一次工作流执行，
+执行产生的事件按顺序分发给每个订阅者，后加入的订阅者会先收到已产生的事件。
+"""
+
+import asyncio
+from typing import AsyncIterator, Callable, Hashable, Optional
+
+from ...utils.metrics import get_metrics
+
+
+class SharedRun:
+    """一次共享的工作流执行"""
+
+    def __init__(self, source: AsyncIterator[str]):
+        self.events: list[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Condition()
+        # 执行与任何单个客户端解耦，发起者断开后其他订阅者仍可继续接收
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]):
+        try:
+            async for event in source:
+                self.events.append(event)
+                async with self._changed:
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """从头开始订阅事件，执行失败时抛出原始异常"""
+        index = 0
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.events) or self.done)
+
+
+class RunCoalescer:
+    """按键合并进行中的工作流执行"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._runs: dict[Hashable, SharedRun] = {}
+
+    def subscribe(self, key: Hashable, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        订阅指定键的执行，不存在进行中的执行时由 factory 创建
+
+        Args:
+            key (Hashable): 运行键
+            factory (Callable): 创建事件源的函数
+
+        Returns:
+            AsyncIterator[str]: 事件迭代器
+        """
+        metrics = get_metrics()
+        run = self._runs.get(key)
+        if run is None or run.done:
+            run = SharedRun(factory())
+            self._runs[key] = run
+            run.task.add_done_callback(lambda _: self._release(key, run))
+            metrics.incr(f"{self.name}.leaders")
+        else:
+            metrics.incr(f"{self.name}.followers")
+        metrics.set_gauge(f"{self.name}.in_flight", len(self._runs))
+        return run.subscribe()
+
+    def _release(self, key: Hashable, run: SharedRun):
+        if self._runs.get(key) is run:
+            del self._runs[key]
+        get_metrics().set_gauge(f"{self.name}.in_flight", len(self._runs))
+
+
+# 全局运行合并器
+run_coalescer = RunCoalescer("coalescing.runs")
+
+
+def get_run_coalescer() -> RunCoalescer:
+    """获取全局运行合并器"""
+    return run_coalescer
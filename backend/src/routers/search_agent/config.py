@@ -1,20 +1,53 @@
 """
 搜索智能体的配置管理
 包含环境变量配置、客户端初始化和系统提示配置
+配置在第一次访问时创建，模型和搜索客户端在第一次使用时才导入依赖并初始化
 """
 
 import os
-import time
+from functools import cached_property
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from tavily import TavilyClient
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
+
+from ...utils.lazy import lazy
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from tavily import TavilyClient
 
 from .constants import (
     QWEN_API_KEY, 
     QWEN_API_BASE_URL, 
     SEARCH_MODEL_NAME, 
     TAVILY_API_KEY, 
+    SPECULATIVE_ANSWER,
+    BACKUP_MODEL_NAME,
+    SEARCH_PROVIDERS,
+    SEARCH_MODE,
+    LOCAL_SEARCH_DB,
+    DEFAULT_SEARCH_PROVIDERS,
+    DEFAULT_SEARCH_MODE,
+    DEFAULT_LOCAL_SEARCH_DB,
+    KNOWLEDGE_STORE,
+    KNOWLEDGE_STORE_DB,
+    KNOWLEDGE_MAX_AGE,
+    DEFAULT_KNOWLEDGE_STORE_DB,
+    DEFAULT_KNOWLEDGE_MAX_AGE,
+    PASSAGE_RETRIEVAL,
+    SEARCH_NOTES,
+    ADAPTIVE_SEARCH_DEPTH,
+    QUERY_PLAN,
+    FAST_ROUTER,
+    FAST_ROUTER_SHADOW_RATE,
+    JOBS_DB,
+    JOB_WORKERS,
+    JOB_QUEUE_MAX,
+    DEFAULT_JOBS_DB,
+    DEFAULT_JOB_WORKERS,
+    DEFAULT_JOB_QUEUE_MAX,
+    BATCH_CONCURRENCY,
+    DEFAULT_BATCH_CONCURRENCY,
+    LLM_REQUEST_TIMEOUT,
     DEFAULT_SEARCH_MODEL_NAME,
     ERROR_QWEN_API_KEY_MISSING, 
     ERROR_QWEN_API_BASE_URL_MISSING, 
@@ -23,7 +56,7 @@ from .constants import (
     DEFAULT_NUMBER_QUERIES
 )
 
-from .prompts import answer_instructions,system_instructions
+from .prompts import answer_instructions,system_instructions,get_current_date
 
 class SearchAgentConfig:
     """搜索智能体配置类"""
@@ -35,12 +68,22 @@ class SearchAgentConfig:
         # 验证和获取环境变量
         self.api_key = self._get_env_var(QWEN_API_KEY, ERROR_QWEN_API_KEY_MISSING)
         self.base_url = self._get_env_var(QWEN_API_BASE_URL, ERROR_QWEN_API_BASE_URL_MISSING)
-        self.tavily_api_key = self._get_env_var(TAVILY_API_KEY, ERROR_TAVILY_API_KEY_MISSING)
+        # 搜索提供方，例如 "tavily"、"local"（完全离线）或 "local,tavily"
+        self.search_providers = [
+            name.strip() for name in os.getenv(SEARCH_PROVIDERS, DEFAULT_SEARCH_PROVIDERS).split(",") if name.strip()
+        ]
+        self.search_mode = os.getenv(SEARCH_MODE, DEFAULT_SEARCH_MODE)
+        self.local_search_db = os.getenv(LOCAL_SEARCH_DB, DEFAULT_LOCAL_SEARCH_DB)
+        # 来源知识库：搜索前先检索已获取过的新鲜来源，默认关闭，开启时写入 KNOWLEDGE_STORE_DB
+        self.knowledge_store = os.getenv(KNOWLEDGE_STORE, "false").lower() == "true"
+        self.knowledge_store_db = os.getenv(KNOWLEDGE_STORE_DB, DEFAULT_KNOWLEDGE_STORE_DB)
+        self.knowledge_max_age = float(os.getenv(KNOWLEDGE_MAX_AGE, DEFAULT_KNOWLEDGE_MAX_AGE))
+        # 只有使用 Tavily 时才需要 API Key
+        self.tavily_api_key = (
+            self._get_env_var(TAVILY_API_KEY, ERROR_TAVILY_API_KEY_MISSING) if "tavily" in self.search_providers else None
+        )
         self.model_name = os.getenv(SEARCH_MODEL_NAME, DEFAULT_SEARCH_MODEL_NAME)
-        
-        # 初始化客户端
-        self.llm = self._init_llm()
-        self.tavily_client = self._init_tavily_client()
+        self.backup_model_name = os.getenv(BACKUP_MODEL_NAME)
         
         # 配置系统提示
         self.system_prompt = self._init_system_prompt()
@@ -50,6 +93,25 @@ class SearchAgentConfig:
         # 其他配置
         self.max_search_loop = MAX_SEARCH_LOOP
         self.heartbeat_interval = 30  # 心跳间隔（秒）
+        # 段落检索：反思和回答提示只携带最相关的段落
+        self.passage_retrieval = os.getenv(PASSAGE_RETRIEVAL, "false").lower() == "true"
+        # 搜索笔记：每个搜索分支把自己的结果浓缩为笔记，反思和回答基于笔记进行
+        self.search_notes = os.getenv(SEARCH_NOTES, "false").lower() == "true"
+        # 自适应搜索深度：首轮使用 basic，针对知识缺口的后续查询和结果较差的查询升级为 advanced
+        self.adaptive_search_depth = os.getenv(ADAPTIVE_SEARCH_DEPTH, "true").lower() == "true"
+        # 查询计划：首轮查询按依赖关系组成 DAG 并发执行
+        self.query_plan = os.getenv(QUERY_PLAN, "false").lower() == "true"
+        # 快速路由：明显的请求由本地规则和分类器判断，并按比例在后台用语言模型复核
+        self.fast_router = os.getenv(FAST_ROUTER, "true").lower() == "true"
+        self.fast_router_shadow_rate = float(os.getenv(FAST_ROUTER_SHADOW_RATE, "0"))
+        # 后台任务：任务数据库、每个进程同时运行的任务数和最多排队的任务数
+        self.jobs_db = os.getenv(JOBS_DB, DEFAULT_JOBS_DB)
+        self.job_workers = int(os.getenv(JOB_WORKERS, DEFAULT_JOB_WORKERS))
+        self.job_queue_max = int(os.getenv(JOB_QUEUE_MAX, DEFAULT_JOB_QUEUE_MAX))
+        # 批量研究：同时运行的条目数
+        self.batch_concurrency = int(os.getenv(BATCH_CONCURRENCY, DEFAULT_BATCH_CONCURRENCY))
+        # 推测式回答：最后一轮反思时并行生成回答草稿
+        self.speculative_answer = os.getenv(SPECULATIVE_ANSWER, "false").lower() == "true"
     
     def _get_env_var(self, var_name: str, error_message: str) -> str:
         """获取环境变量，如果不存在则抛出异常"""
@@ -58,48 +120,68 @@ class SearchAgentConfig:
             raise ValueError(error_message)
         return value
     
-    def _init_llm(self) -> ChatOpenAI:
-        """初始化语言模型客户端"""
+    @cached_property
+    def llm(self) -> "ChatOpenAI":
+        """主语言模型客户端"""
+        return self._init_llm()
+    
+    @cached_property
+    def backup_llm(self) -> Optional["ChatOpenAI"]:
+        """备用语言模型客户端，未配置时为 None"""
+        return self._init_llm(self.backup_model_name) if self.backup_model_name else None
+    
+    @cached_property
+    def tavily_client(self) -> Optional["TavilyClient"]:
+        """Tavily 搜索客户端，未使用 Tavily 时为 None"""
+        return self._init_tavily_client() if self.tavily_api_key else None
+    
+    def init_clients(self):
+        """初始化所有客户端，在应用启动时调用"""
+        return self.llm, self.backup_llm, self.tavily_client
+    
+    def _init_llm(self, model_name: Optional[str] = None) -> "ChatOpenAI":
+        """初始化语言模型客户端，默认使用主模型"""
+        from langchain_openai import ChatOpenAI
+        
         return ChatOpenAI(
-            model=self.model_name, 
+            model=model_name or self.model_name, 
             api_key=self.api_key, 
             base_url=self.base_url, 
-            temperature=0.7
+            temperature=0.7,
+            timeout=LLM_REQUEST_TIMEOUT
         )
     
-    def _init_tavily_client(self) -> TavilyClient:
+    def _init_tavily_client(self) -> "TavilyClient":
         """初始化Tavily搜索客户端"""
+        from tavily import TavilyClient
+        
         return TavilyClient(api_key=self.tavily_api_key)
     
     def _init_system_prompt(self) -> str:
-        """初始化简单系统提示"""
-        return system_instructions
+        """初始化简单系统提示，包含当天日期"""
+        return system_instructions.format(date=get_current_date())
     
     def update_system_prompts(self):
-        """更新系统提示（例如，当日期变化时）"""
+        """更新系统提示（例如，当日期变化时），由启动的后台任务每天零点调用"""
         self.system_prompt = self._init_system_prompt()
-        self.reply_system_prompt = self._init_reply_system_prompt()
-
-
-# 全局配置实例
-config = SearchAgentConfig()
 
 
+@lazy
 def get_config() -> SearchAgentConfig:
     """获取全局配置实例"""
-    return config
+    return SearchAgentConfig()
 
 
-def get_llm() -> ChatOpenAI:
+def get_llm() -> "ChatOpenAI":
     """获取语言模型实例"""
-    return config.llm
+    return get_config().llm
 
 
-def get_tavily_client() -> TavilyClient:
+def get_tavily_client() -> "TavilyClient":
     """获取Tavily客户端实例"""
-    return config.tavily_client
+    return get_config().tavily_client
 
 
 def get_system_prompt() -> str:
     """获取简单系统提示"""
-    return config.system_prompt
\ No newline at end of file
+    return get_config().system_prompt
\ No newline at end of file
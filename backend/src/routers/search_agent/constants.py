@@ -11,6 +11,24 @@ QWEN_API_KEY = "QWEN_API_KEY"
 QWEN_API_BASE_URL = "QWEN_API_BASE_URL"
 SEARCH_MODEL_NAME = "SEARCH_MODEL_NAME"
 TAVILY_API_KEY = "TAVILY_API_KEY"
+SPECULATIVE_ANSWER = "SPECULATIVE_ANSWER"
+BACKUP_MODEL_NAME = "BACKUP_MODEL_NAME"
+SEARCH_PROVIDERS = "SEARCH_PROVIDERS"
+SEARCH_MODE = "SEARCH_MODE"
+LOCAL_SEARCH_DB = "LOCAL_SEARCH_DB"
+KNOWLEDGE_STORE = "KNOWLEDGE_STORE"
+KNOWLEDGE_STORE_DB = "KNOWLEDGE_STORE_DB"
+KNOWLEDGE_MAX_AGE = "KNOWLEDGE_MAX_AGE"
+PASSAGE_RETRIEVAL = "PASSAGE_RETRIEVAL"
+SEARCH_NOTES = "SEARCH_NOTES"
+ADAPTIVE_SEARCH_DEPTH = "ADAPTIVE_SEARCH_DEPTH"
+QUERY_PLAN = "QUERY_PLAN"
+FAST_ROUTER = "FAST_ROUTER"
+FAST_ROUTER_SHADOW_RATE = "FAST_ROUTER_SHADOW_RATE"
+JOBS_DB = "JOBS_DB"
+JOB_WORKERS = "JOB_WORKERS"
+JOB_QUEUE_MAX = "JOB_QUEUE_MAX"
+BATCH_CONCURRENCY = "BATCH_CONCURRENCY"
 
 # 默认模型名称
 
@@ -20,6 +38,13 @@ ERROR_MESSAGES_NOT_LIST = "Messages must be a list"
 ERROR_QWEN_API_KEY_MISSING = "QWEN_API_KEY 环境变量未设置"
 ERROR_QWEN_API_BASE_URL_MISSING = "QWEN_API_BASE_URL 环境变量未设置"
 ERROR_TAVILY_API_KEY_MISSING = "TAVILY_API_KEY 环境变量未设置"
+ERROR_JOB_NOT_FOUND = "Job not found"
+ERROR_JOB_NOT_FINISHED = "Job has not finished"
+ERROR_JOB_QUEUE_FULL = "Too many queued jobs, try again later"
+ERROR_BATCH_EMPTY = "Queries cannot be empty"
+ERROR_BATCH_TOO_LARGE = "Too many queries in one batch"
+ERROR_PROFILE_NOT_FOUND = "Profile not found"
+ERROR_SOURCES_NOT_FOUND = "No cached result for this query, run the query first"
 
 # 提示词常量
 DEFAULT_SEARCH_MODEL_NAME = "qwen-plus-latest"
@@ -28,6 +53,100 @@ DEFAULT_NUMBER_QUERIES = 3
 # 最大搜索循环次数
 MAX_SEARCH_LOOP = 3
 
+# 上游弹性策略：截止时间（秒）、对冲延迟下限（秒）、模型单次请求超时（秒）
+LLM_DEADLINE = 90
+LLM_HEDGE_MIN_DELAY = 5
+LLM_REQUEST_TIMEOUT = 60
+SEARCH_DEADLINE = 20
+SEARCH_HEDGE_MIN_DELAY = 2
+HEDGE_PERCENTILE = 0.95
+# 搜索降级时可复用的最近成功结果数量
+SEARCH_FALLBACK_CACHE_SIZE = 256
+
+# 搜索提供方：默认提供方、本地索引路径、扇出单提供方超时（秒）、级联模式下视为足够的结果数
+DEFAULT_SEARCH_PROVIDERS = "tavily"
+DEFAULT_SEARCH_MODE = "fanout"
+DEFAULT_LOCAL_SEARCH_DB = "local_search.db"
+SEARCH_FANOUT_TIMEOUT = 20
+SEARCH_CASCADE_MIN_RESULTS = 3
+# 倒数排名融合平滑常数
+RRF_K = 60
+LOCAL_SEARCH_MAX_RESULTS = 5
+LOCAL_SEARCH_CHUNK_SIZE = 1500
+
+# 自适应搜索深度：basic 结果少于最少结果数或查询词覆盖率低于阈值时升级为 advanced，
+# advanced 搜索的额外选项，以及各深度每次调用消耗的 Tavily 额度
+SEARCH_ESCALATION_MIN_RESULTS = 3
+SEARCH_ESCALATION_MIN_COVERAGE = 0.5
+# 不请求 raw_content：来源只使用 Tavily 针对查询提取的内容，完整网页的开头多为导航和模板文字，且会放大状态、知识库和事件
+ADVANCED_SEARCH_OPTIONS = {"max_results": 8}
+SEARCH_DEPTH_CREDITS = {"basic": 1, "advanced": 2}
+
+# 来源知识库：默认路径、来源新鲜期（秒），以及查询视为可由知识库回答的最少来源数和查询词覆盖率
+DEFAULT_KNOWLEDGE_STORE_DB = "knowledge_store.db"
+DEFAULT_KNOWLEDGE_MAX_AGE = 24 * 60 * 60
+KNOWLEDGE_MIN_RESULTS = 3
+KNOWLEDGE_MIN_COVERAGE = 0.7
+KNOWLEDGE_MAX_RESULTS = 5
+
+# 段落检索：特征哈希向量维度、段落最大字符数、每个子问题检索的段落数、提示中的最大段落数、同时保留索引的运行数
+EMBEDDING_DIM = 1024
+PASSAGE_SIZE = 500
+PASSAGE_TOP_K = 4
+PASSAGE_MAX_RESULTS = 24
+PASSAGE_INDEX_MAX_RUNS = 256
+
+# 来源内存控制：状态中每个来源内容的最大字符数、超出预算时被压缩来源保留的字符数、
+# 事件中来源预览的字符数，以及每次运行来源内容的字节预算
+SOURCE_CONTENT_MAX_CHARS = 8000
+SOURCE_EVICTED_CHARS = 500
+SOURCE_PREVIEW_CHARS = 300
+RUN_SOURCE_BUDGET_BYTES = 512 * 1024
+
+# 非流式结果的来源分页：默认和最大每页数量
+SOURCES_PAGE_SIZE = 20
+SOURCES_PAGE_MAX = 100
+
+# 证据渲染：每个来源在提示中的最大字符数、同时保留渲染器的运行数
+EVIDENCE_MAX_CHARS_PER_SOURCE = 1200
+EVIDENCE_RENDERER_MAX_RUNS = 256
+
+# 快速路由：本地判断直接生效的最低置信度
+FAST_ROUTER_MIN_CONFIDENCE = 0.9
+
+# 查询计划：最大步骤数
+QUERY_PLAN_MAX_STEPS = 6
+# 改写依赖步骤的查询时，每个依赖步骤提供的来源数
+QUERY_PLAN_INPUT_SOURCES = 3
+
+# 搜索笔记：每个搜索分支生成的笔记最大词数
+SEARCH_NOTE_MAX_WORDS = 150
+
+# 后台任务：默认数据库路径、每个进程同时运行的任务数、最多排队的任务数、
+# 结束任务的保留时间（秒），以及跨进程等待新任务和新事件的轮询间隔（秒）
+DEFAULT_JOBS_DB = "jobs.db"
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_JOB_QUEUE_MAX = 100
+JOB_RETENTION = 7 * 24 * 60 * 60
+JOB_POLL_INTERVAL = 1.0
+
+# 批量研究：单个批次的最大查询数、默认同时运行的条目数、预取搜索的并发数
+BATCH_MAX_QUERIES = 500
+DEFAULT_BATCH_CONCURRENCY = 4
+BATCH_SEARCH_CONCURRENCY = 8
+
+# 不同搜索强度对应的最大搜索循环次数
+EFFORT_MAX_SEARCH_LOOP = {"low": 3, "medium": 5, "high": 10}
+
+# 回答缓存：不同搜索强度的缓存有效期（秒）和最大条目数
+ANSWER_CACHE_TTL = {"low": 15 * 60, "medium": 30 * 60, "high": 60 * 60}
+ANSWER_CACHE_MAX_ENTRIES = 1024
+
+# 推测式回答：本地充分性判断的最少来源数和查询词覆盖率，以及草稿最长保留时间（秒）
+SPECULATIVE_MIN_SOURCES = 3
+SPECULATIVE_MIN_TERM_COVERAGE = 0.6
+SPECULATIVE_DRAFT_MAX_AGE = 600
+
 # 系统提示词
 SYSTEM_PROMPT_TEMPLATE = "You are a helpful robot,current time is:{current_time},no_think."
 
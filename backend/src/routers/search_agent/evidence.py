@@ -0,0 +1,164 @@
+"""
+提示证据渲染
+把搜索结果渲染为紧凑的编号文本块（按 URL 去重、压缩空白、按来源截断），替代列表的 repr。
+来源编号在一次运行内保持稳定，并通过事件发送给前端，回答只需用 [n] 引用来源。
+"""
+
+import re
+import threading
+from typing import Optional
+
+from .constants import EVIDENCE_MAX_CHARS_PER_SOURCE, EVIDENCE_RENDERER_MAX_RUNS
+from .runs import RunRegistry
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_CITATION_PATTERN = re.compile(r"\[(\d+)\]")
+
+
+def compact_text(text: str, max_chars: int) -> str:
+    """
+    压缩空白并截断文本
+
+    Args:
+        text (str): 原始文本
+        max_chars (int): 最大字符数
+
+    Returns:
+        str: 处理后的文本，截断时以省略号结尾
+    """
+    text = _WHITESPACE_PATTERN.sub(" ", text or "").strip()
+    if len(text) > max_chars:
+        text = text[:max_chars].rstrip() + "…"
+    return text
+
+
+class EvidenceRenderer:
+    """单次运行的证据渲染器，搜索结果只追加，因此来源编号和已渲染的条目可以跨轮复用"""
+
+    def __init__(self, max_chars: int = EVIDENCE_MAX_CHARS_PER_SOURCE):
+        self.max_chars = max_chars
+        self.ids: dict[str, int] = {}
+        self.sources: list[dict] = []
+        self.result_count = 0
+        self.reported_count = 0
+        self._contents: dict[int, str] = {}
+        self._entries: dict[int, str] = {}
+        # 已渲染的证据块，键为 (已同步的结果数, 渲染输入)
+        self._blocks: dict[tuple, str] = {}
+        # 并行的搜索分支会同时分配编号
+        self._lock = threading.Lock()
+
+    def assign(self, items: list[dict]) -> list[int]:
+        """
+        为来源分配编号，相同 URL 共用一个编号
+
+        Args:
+            items (list[dict]): 包含 title、url、content 的来源
+
+        Returns:
+            list[int]: 各来源的编号
+        """
+        source_ids = []
+        with self._lock:
+            for item in items:
+                url = item.get("url", "")
+                if url not in self.ids:
+                    source_id = len(self.sources) + 1
+                    self.ids[url] = source_id
+                    self.sources.append({"id": source_id, "title": item.get("title", ""), "url": url})
+                    # 只保留渲染需要的部分，状态中的来源内容被压缩后原文可以释放
+                    self._contents[source_id] = compact_text(item.get("content", ""), self.max_chars)
+                source_ids.append(self.ids[url])
+        return source_ids
+
+    def sync(self, results: list[dict]) -> list[dict]:
+        """
+        同步本次运行的全部搜索结果
+
+        Args:
+            results (list[dict]): 本次运行的全部搜索结果
+
+        Returns:
+            list[dict]: 尚未发送给前端的来源的 id、title、url
+        """
+        self.assign(results[self.result_count:])
+        with self._lock:
+            if len(results) != self.result_count:
+                self.result_count = len(results)
+                self._blocks.clear()
+            new_sources = self.sources[self.reported_count:]
+            self.reported_count = len(self.sources)
+        return new_sources
+
+    def entry(self, source_id: int) -> str:
+        """渲染单个来源的条目"""
+        entry = self._entries.get(source_id)
+        if entry is None:
+            entry = self._render_entry(source_id, self._contents[source_id])
+            self._entries[source_id] = entry
+        return entry
+
+    def _render_entry(self, source_id: int, content: str) -> str:
+        source = self.sources[source_id - 1]
+        return f"[{source_id}] {compact_text(source['title'], 200)} ({source['url']})\n{compact_text(content, self.max_chars)}"
+
+    def render_sources(self, source_ids: list[int]) -> str:
+        """渲染指定来源的条目，重复的编号只渲染一次"""
+        return "\n\n".join(self.entry(source_id) for source_id in dict.fromkeys(source_ids))
+
+    def render(self, passages: Optional[list[dict]] = None, notes: Optional[list[dict]] = None) -> str:
+        """
+        渲染证据块，同一轮内相同的输入只渲染一次
+
+        Args:
+            passages (list[dict], optional): 段落检索选出的段落
+            notes (list[dict], optional): 搜索分支生成的笔记，优先于段落使用
+
+        Returns:
+            str: 编号证据文本，两者都为空时渲染全部来源
+        """
+        if notes:
+            key = (self.result_count, "notes", tuple((note["query"], note["note"]) for note in notes))
+        elif passages is not None:
+            key = (self.result_count, "passages", tuple((p["url"], p["content"]) for p in passages))
+        else:
+            key = (self.result_count, "all")
+        block = self._blocks.get(key)
+        if block is not None:
+            return block
+        if notes:
+            block = self._render_notes(notes)
+        elif passages is not None:
+            # 同一来源的段落共用一个编号
+            block = "\n\n".join(
+                self._render_entry(self.ids[p["url"]], p["content"]) for p in passages if p["url"] in self.ids
+            )
+        else:
+            block = self.render_sources([source["id"] for source in self.sources])
+        self._blocks[key] = block
+        return block
+
+    def _render_notes(self, notes: list[dict]) -> str:
+        # 内容为空的笔记不算覆盖了它的来源，这些来源和没有笔记的来源一样按原文渲染
+        notes = [note for note in notes if note["note"].strip()]
+        covered = {source_id for note in notes for source_id in note["source_ids"]}
+        parts = [f'Notes on "{note["query"]}":\n{note["note"]}' for note in notes]
+        # 没有笔记覆盖的来源（例如知识库命中的来源）仍以条目形式提供
+        uncovered = [source["id"] for source in self.sources if source["id"] not in covered]
+        if uncovered:
+            parts.append(self.render_sources(uncovered))
+        # 来源索引只列出笔记中实际引用的来源，供回答生成链接
+        cited_ids = {int(source_id) for note in notes for source_id in _CITATION_PATTERN.findall(note["note"])}
+        cited = [source for source in self.sources if source["id"] in covered & cited_ids]
+        if cited:
+            parts.append("Source index:\n" + "\n".join(f"[{s['id']}] {compact_text(s['title'], 200)} ({s['url']})" for s in cited))
+        return "\n\n".join(parts)
+
+
+# 全局证据渲染器注册表
+evidence_renderers: RunRegistry[EvidenceRenderer] = RunRegistry(EvidenceRenderer, EVIDENCE_RENDERER_MAX_RUNS)
+
+
+def get_evidence_renderers() -> RunRegistry[EvidenceRenderer]:
+    """获取全局证据渲染器注册表"""
+    return evidence_renderers
@@ -0,0 +1,216 @@
+"""
+本地快速路由
+在 agent_router 调用语言模型之前，用规则和随仓库提供样本训练的朴素贝叶斯文本分类器判断明显的情况
+（寒暄、简短的追问、明确的研究请求），只有置信度不足的请求才交给语言模型路由。
+本地判断与语言模型路由的一致性会记录到日志和指标中，用于根据真实流量调整阈值。
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from ...utils.lazy import lazy
+from ...utils.metrics import get_metrics
+from ...utils.scheduler import WORKLOAD_BACKGROUND, workload_scope
+from .config import get_config
+from .constants import FAST_ROUTER_MIN_CONFIDENCE
+
+_EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), "data", "router_examples.json")
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+_PUNCTUATION_PATTERN = re.compile(r"[\s\W_]+")
+
+# 寒暄：整句只包含这些词
+_SMALL_TALK_PATTERN = re.compile(
+    r"(hi|hello|hey|thanks|thank you|thx|ok|okay|bye|good (morning|afternoon|evening|night)|"
+    r"你好|您好|嗨|谢谢|多谢|好的|好|收到|再见|嗯|哈哈)+"
+)
+# 简短追问：只在已有对话历史时生效
+_FOLLOW_UP_PATTERN = re.compile(
+    r"(continue|go on|more details?( please)?|elaborate|shorter( please)?|"
+    r"继续|接着说|展开说说|详细一点|再详细一些|举个例子|换个说法|再简短一些|翻译成(英文|中文))"
+)
+# 明确的研究请求：英文按单词边界匹配请求句式，"newsletter"、"researcher" 或 "写一首关于新闻的诗" 不会命中
+_RESEARCH_REQUEST_PATTERN = re.compile(
+    r"\b(search (the web |online |the internet )?(for|about)|search (online|the web|the internet)|look up|google it|"
+    r"(find|get|give me|show me|what is|what are) the (latest|recent) |"
+    r"latest ((news|updates?|developments?|information|info) )?(on|about|for|regarding)|deep research|research report)\b|"
+    r"(联网|上网查|帮我搜|搜索一下|搜一下|查一下|查找|最新(的)?(新闻|消息|进展|动态)|调研|研究报告|深度研究)"
+)
+# 只包含研究相关的词，不能确定是研究请求，以低于阈值的置信度交给语言模型判断
+_RESEARCH_KEYWORD_PATTERN = re.compile(r"\b(search|latest|news|research)\b|搜索|最新|新闻")
+_RESEARCH_KEYWORD_CONFIDENCE = 0.6
+_FOLLOW_UP_MAX_CHARS = 20
+
+
+@dataclass
+class RouteDecision:
+    """本地路由判断"""
+    need_deep_research: bool
+    confidence: float
+    reason: str
+    source: str  # rule 或 model
+
+
+def _features(text: str) -> list[str]:
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    words = [token for token in tokens if token.isascii()]
+    chars = [token for token in tokens if not token.isascii()]
+    return words + [a + b for a, b in zip(chars, chars[1:])] + chars
+
+
+class NaiveBayesClassifier:
+    """多项式朴素贝叶斯文本分类器，特征为英文单词、中文单字和相邻两字"""
+
+    def __init__(self, examples: dict[str, list[str]]):
+        """
+        Args:
+            examples (dict[str, list[str]]): 各类别的训练样本
+        """
+        self.labels = list(examples)
+        total = sum(len(texts) for texts in examples.values())
+        self.log_priors = {label: math.log(len(texts) / total) for label, texts in examples.items()}
+        counts = {label: Counter(f for text in texts for f in _features(text)) for label, texts in examples.items()}
+        vocabulary = set().union(*counts.values())
+        self.log_likelihoods = {}
+        self.log_unseen = {}
+        for label, counter in counts.items():
+            denominator = sum(counter.values()) + len(vocabulary)
+            self.log_likelihoods[label] = {f: math.log((n + 1) / denominator) for f, n in counter.items()}
+            self.log_unseen[label] = math.log(1 / denominator)
+        self.vocabulary = vocabulary
+
+    def predict(self, text: str) -> tuple[str, float]:
+        """
+        预测文本类别
+
+        Args:
+            text (str): 文本
+
+        Returns:
+            tuple[str, float]: 类别和后验概率
+        """
+        # 未见过的特征对各类别的区分没有帮助，直接忽略
+        features = [f for f in _features(text) if f in self.vocabulary]
+        scores = {
+            label: self.log_priors[label] + sum(
+                self.log_likelihoods[label].get(f, self.log_unseen[label]) for f in features
+            )
+            for label in self.labels
+        }
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1 / normalizer
+
+
+class FastRouter:
+    """本地快速路由"""
+
+    def __init__(self, classifier: NaiveBayesClassifier, min_confidence: float = FAST_ROUTER_MIN_CONFIDENCE):
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        # 影子校验在后台调用语言模型路由，不阻塞请求
+        self._shadow_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="fast-router-shadow")
+
+    def classify(self, query: str, messages: list[dict]) -> RouteDecision:
+        """
+        判断请求是否需要深度研究
+
+        Args:
+            query (str): 用户查询
+            messages (list[dict]): 对话历史
+
+        Returns:
+            RouteDecision: 本地判断，置信度低于阈值时应交给语言模型路由
+        """
+        started_at = time.perf_counter()
+        decision = self._classify(query, messages)
+        metrics = get_metrics()
+        metrics.observe("fast_router.latency", time.perf_counter() - started_at)
+        if self.is_confident(decision):
+            metrics.incr(f"fast_router.decisions.{decision.source}")
+        else:
+            metrics.incr("fast_router.fallthrough")
+        return decision
+
+    def _classify(self, query: str, messages: list[dict]) -> RouteDecision:
+        text = _PUNCTUATION_PATTERN.sub(" ", query.lower()).strip()
+        compact = text.replace(" ", "")
+        if _SMALL_TALK_PATTERN.fullmatch(text) or _SMALL_TALK_PATTERN.fullmatch(compact):
+            return RouteDecision(False, 0.99, "寒暄，无需深度研究", "rule")
+        if messages and len(compact) <= _FOLLOW_UP_MAX_CHARS and (
+            _FOLLOW_UP_PATTERN.fullmatch(text) or _FOLLOW_UP_PATTERN.fullmatch(compact)
+        ):
+            return RouteDecision(False, 0.97, "针对已有回答的简短追问", "rule")
+        if _RESEARCH_REQUEST_PATTERN.search(text):
+            return RouteDecision(True, 0.95, "明确要求搜索或最新信息", "rule")
+        if _RESEARCH_KEYWORD_PATTERN.search(text):
+            return RouteDecision(True, _RESEARCH_KEYWORD_CONFIDENCE, "包含研究相关的词，需要语言模型判断", "rule")
+        label, probability = self.classifier.predict(query)
+        return RouteDecision(label == "research", probability, f"本地分类器判断为 {label}", "model")
+
+    def is_confident(self, decision: RouteDecision) -> bool:
+        """判断本地结果是否足以直接路由"""
+        return decision.confidence >= self.min_confidence
+
+    def record_agreement(self, query: str, decision: RouteDecision, need_deep_research: bool):
+        """
+        记录本地判断与语言模型路由的一致性
+
+        Args:
+            query (str): 用户查询
+            decision (RouteDecision): 本地判断
+            need_deep_research (bool): 语言模型路由的结果
+        """
+        metrics = get_metrics()
+        agreed = decision.need_deep_research == need_deep_research
+        metrics.incr("fast_router.llm_checks")
+        if agreed:
+            metrics.incr("fast_router.agreements")
+        checks = metrics.counter("fast_router.llm_checks")
+        metrics.set_gauge("fast_router.agreement_rate", metrics.counter("fast_router.agreements") / checks)
+        logging.info("fast_router agreement: " + json.dumps({
+            "query": query[:200],
+            "local": decision.need_deep_research,
+            "confidence": round(decision.confidence, 4),
+            "source": decision.source,
+            "confident": self.is_confident(decision),
+            "llm": need_deep_research,
+            "agreed": agreed,
+        }, ensure_ascii=False))
+
+    def shadow(self, query: str, decision: RouteDecision, route_with_llm: Callable[[], bool]):
+        """
+        在后台用语言模型路由复核本地已决定的请求，只记录一致性
+
+        Args:
+            query (str): 用户查询
+            decision (RouteDecision): 本地判断
+            route_with_llm (Callable[[], bool]): 调用语言模型路由并返回是否需要深度研究
+        """
+        def check():
+            try:
+                # 影子校验只用于调整阈值，以后台优先级调度
+                with workload_scope(WORKLOAD_BACKGROUND):
+                    self.record_agreement(query, decision, route_with_llm())
+            except Exception as e:
+                logging.warning(f"快速路由影子校验失败: {query}, 错误: {str(e)}")
+
+        self._shadow_executor.submit(check)
+
+
+@lazy
+def get_fast_router() -> Optional[FastRouter]:
+    """获取全局快速路由，首次访问时加载随仓库提供的样本训练分类器，未启用时返回 None"""
+    if not get_config().fast_router:
+        return None
+    with open(_EXAMPLES_PATH, encoding="utf-8") as f:
+        examples = json.load(f)
+    return FastRouter(NaiveBayesClassifier(examples))
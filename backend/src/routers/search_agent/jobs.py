@@ -0,0 +1,388 @@
+"""
+后台研究任务
+提交研究请求后立即返回任务ID，由固定数量的工作协程从 SQLite 持久化队列中领取任务运行工作流，
+运行产生的 SSE 事件和最终状态写入本地数据库。客户端可以随时查询状态、获取结果，
+或从任意位置重新接入事件流，不必在整个运行期间保持连接。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Optional
+
+from ...utils.lazy import lazy
+from ...utils.metrics import get_metrics
+from .config import get_config
+from .constants import JOB_POLL_INTERVAL, JOB_RETENTION
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class JobQueueFullError(Exception):
+    """排队任务数达到上限"""
+
+
+@dataclass
+class Job:
+    """研究任务"""
+    id: str
+    query: str
+    effort: str
+    messages: list[dict] = field(default_factory=list)
+    status: str = JOB_QUEUED
+    error: Optional[str] = None
+    event_count: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        """任务是否已结束"""
+        return self.status in JOB_FINISHED_STATUSES
+
+    def to_dict(self) -> dict:
+        """任务状态，不包含消息历史和结果"""
+        return {
+            "job_id": self.id,
+            "query": self.query,
+            "effort": self.effort,
+            "status": self.status,
+            "error": self.error,
+            "event_count": self.event_count,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_JOB_COLUMNS = "id, query, effort, messages, status, error, event_count, created_at, started_at, finished_at"
+
+
+def _row_to_job(row) -> Job:
+    job_id, query, effort, messages, status, error, event_count, created_at, started_at, finished_at = row
+    return Job(
+        id=job_id,
+        query=query,
+        effort=effort,
+        messages=json.loads(messages),
+        status=status,
+        error=error,
+        event_count=event_count,
+        created_at=created_at,
+        started_at=started_at,
+        finished_at=finished_at,
+    )
+
+
+class JobStore:
+    """基于 SQLite 的任务存储，同时作为多个工作进程共享的任务队列"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): SQLite 数据库路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            # WAL 模式下逐条追加事件不需要每次同步刷盘，读取也不会阻塞写入
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    effort TEXT NOT NULL,
+                    messages TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    result TEXT,
+                    worker_pid INTEGER,
+                    event_count INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                ) WITHOUT ROWID;
+            """)
+
+    def create(self, query: str, effort: str, messages: list[dict]) -> Job:
+        """创建排队中的任务"""
+        job = Job(id=uuid.uuid4().hex, query=query, effort=effort, messages=messages)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, query, effort, messages, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, query, effort, json.dumps(messages, ensure_ascii=False), job.status, job.created_at),
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """获取任务，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def claim(self) -> Optional[Job]:
+        """领取最早排队的任务并标记为运行中，没有排队任务时返回 None"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, worker_pid = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1) "
+                f"RETURNING {_JOB_COLUMNS}",
+                (JOB_RUNNING, time.time(), os.getpid(), JOB_QUEUED),
+            ).fetchone()
+        return _row_to_job(row) if row else None
+
+    def append_event(self, job_id: str, seq: int, event: str):
+        """追加一条事件，seq 从 0 开始连续编号"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO job_events (job_id, seq, event) VALUES (?, ?, ?)", (job_id, seq, event))
+            self._conn.execute("UPDATE jobs SET event_count = ? WHERE id = ?", (seq + 1, job_id))
+
+    def events(self, job_id: str, after: int = 0) -> list[str]:
+        """获取序号不小于 after 的事件"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event FROM job_events WHERE job_id = ? AND seq >= ? ORDER BY seq", (job_id, after)
+            ).fetchall()
+        return [event for event, in rows]
+
+    def result(self, job_id: str) -> Optional[dict]:
+        """获取任务的最终状态，尚未成功结束时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        """记录任务结束状态、结果或错误信息"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, time.time(), job_id),
+            )
+
+    def count(self, status: str) -> int:
+        """统计指定状态的任务数量"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def recover(self) -> int:
+        """
+        把运行进程已退出的运行中任务标记为失败
+
+        Returns:
+            int: 被标记的任务数量
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id, worker_pid FROM jobs WHERE status = ?", (JOB_RUNNING,)).fetchall()
+        # 当前进程刚启动，记录为当前 PID 的任务来自上一个使用相同 PID 的进程
+        orphaned = [job_id for job_id, pid in rows if pid == os.getpid() or not _process_alive(pid)]
+        for job_id in orphaned:
+            self.finish(job_id, JOB_FAILED, error="interrupted")
+        return len(orphaned)
+
+    def purge(self, max_age: float) -> int:
+        """
+        删除结束时间早于 max_age 秒之前的任务及其事件
+
+        Returns:
+            int: 删除的任务数量
+        """
+        before = time.time() - max_age
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE finished_at < ?)", (before,)
+            )
+            return self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (before,)).rowcount
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# 任务运行函数：运行工作流并逐条产生 SSE 事件，结束时把可 JSON 序列化的最终状态写入 result
+JobRunner = Callable[[Job, dict], AsyncIterator[str]]
+
+
+class JobManager:
+    """后台任务工作池"""
+
+    def __init__(self, store: JobStore, runner: JobRunner, workers: int, max_queued: int):
+        """
+        Args:
+            store (JobStore): 任务存储
+            runner (JobRunner): 任务运行函数
+            workers (int): 每个进程的工作协程数量，即同时运行的任务数
+            max_queued (int): 最多排队的任务数，超过时拒绝提交
+        """
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self._tasks: list[asyncio.Task] = []
+        self._running: set[str] = set()
+        # 任务提交或产生新事件时递增，等待者据此判断是否需要重新读取
+        self._version = 0
+        self._changed: Optional[asyncio.Condition] = None
+
+    async def start(self):
+        """启动工作协程，在应用启动时调用"""
+        self._changed = asyncio.Condition()
+        interrupted = self.store.recover()
+        purged = self.store.purge(JOB_RETENTION)
+        if interrupted or purged:
+            logging.info(f"后台任务恢复: {interrupted} 个中断任务标记为失败，清理 {purged} 个过期任务")
+        self._tasks = [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.workers)]
+        self._update_gauges()
+
+    async def stop(self):
+        """停止工作协程，运行中的任务标记为中断"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, query: str, effort: str, messages: list[dict]) -> Job:
+        """
+        提交任务
+
+        Args:
+            query (str): 用户查询
+            effort (str): 搜索强度
+            messages (list[dict]): 消息历史
+
+        Returns:
+            Job: 排队中的任务
+
+        Raises:
+            JobQueueFullError: 排队任务数达到上限
+        """
+        metrics = get_metrics()
+        if self.store.count(JOB_QUEUED) >= self.max_queued:
+            metrics.incr("jobs.rejected")
+            raise JobQueueFullError()
+        job = self.store.create(query, effort, messages)
+        metrics.incr("jobs.submitted")
+        self._update_gauges()
+        await self._notify()
+        return job
+
+    async def stream(self, job_id: str, after: int = 0) -> AsyncIterator[str]:
+        """
+        从指定序号开始订阅任务事件，任务结束且事件读完后返回
+
+        Args:
+            job_id (str): 任务ID
+            after (int): 起始事件序号
+
+        Yields:
+            str: SSE 格式的事件文本
+        """
+        while True:
+            seen = self._version
+            job = self.store.get(job_id)
+            events = self.store.events(job_id, after)
+            for event in events:
+                yield event
+            after += len(events)
+            if job is None or (job.finished and after >= job.event_count):
+                return
+            # 任务可能在其他工作进程中运行，收不到本进程的通知，因此按间隔轮询
+            await self._wait(seen)
+
+    async def _work(self):
+        while True:
+            seen = self._version
+            job = self.store.claim()
+            if job is None:
+                await self._wait(seen)
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        metrics = get_metrics()
+        metrics.observe("jobs.queue_wait", time.time() - job.created_at)
+        self._running.add(job.id)
+        self._update_gauges()
+        started_at = time.time()
+        result: dict = {}
+        seq = 0
+        try:
+            async for event in self.runner(job, result):
+                self.store.append_event(job.id, seq, event)
+                seq += 1
+                await self._notify()
+            self.store.finish(job.id, JOB_SUCCEEDED, result=result)
+            metrics.incr("jobs.succeeded")
+        except asyncio.CancelledError:
+            self.store.finish(job.id, JOB_FAILED, error="interrupted")
+            metrics.incr("jobs.interrupted")
+            raise
+        except Exception as e:
+            logging.error(f"后台任务失败: {job.id}, 错误: {str(e)}", exc_info=True)
+            self.store.finish(job.id, JOB_FAILED, error=str(e))
+            metrics.incr("jobs.failed")
+        finally:
+            metrics.observe("jobs.run_time", time.time() - started_at)
+            self._running.discard(job.id)
+            self._update_gauges()
+            await self._notify()
+
+    async def _notify(self):
+        if self._changed is None:
+            return
+        async with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    async def _wait(self, seen: int):
+        if self._changed is None:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            return
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self._version != seen), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def _update_gauges(self):
+        metrics = get_metrics()
+        metrics.set_gauge("jobs.queue_depth", self.store.count(JOB_QUEUED))
+        metrics.set_gauge("jobs.running", len(self._running))
+
+
+@lazy
+def get_job_manager() -> JobManager:
+    """获取全局后台任务工作池"""
+    # 运行函数依赖 API 模块中的事件转换，在此处导入以避免循环导入
+    from .api import run_job
+
+    config = get_config()
+    return JobManager(JobStore(config.jobs_db), run_job, config.job_workers, config.job_queue_max)
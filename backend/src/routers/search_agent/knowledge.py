@@ -0,0 +1,128 @@
+"""
+已获取来源的持久化知识库
+网络搜索得到的来源按 URL 去重写入本地 SQLite FTS5 索引并记录获取时间；
+发起网络搜索前先在知识库中检索足够新鲜且覆盖查询的来源，命中的查询不再调用外部搜索。
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Collection, Optional
+
+from ...utils.lazy import lazy
+from ...utils.metrics import get_metrics
+from ...utils.text import term_coverage
+from .config import get_config
+from .constants import KNOWLEDGE_MIN_RESULTS, KNOWLEDGE_MIN_COVERAGE, KNOWLEDGE_MAX_RESULTS
+from .providers import fts_match_expression
+from .sources import make_source
+
+
+class KnowledgeStore:
+    """本地来源知识库"""
+
+    def __init__(self, path: str, max_age: float):
+        """
+        Args:
+            path (str): SQLite 数据库路径
+            max_age (float): 来源视为新鲜的最长时间（秒）
+        """
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sources (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS sources_fts USING fts5(
+                    title, content, content='sources', content_rowid='id', tokenize='trigram'
+                );
+                CREATE TRIGGER IF NOT EXISTS sources_ai AFTER INSERT ON sources BEGIN
+                    INSERT INTO sources_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS sources_ad AFTER DELETE ON sources BEGIN
+                    INSERT INTO sources_fts(sources_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS sources_au AFTER UPDATE ON sources BEGIN
+                    INSERT INTO sources_fts(sources_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+                    INSERT INTO sources_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+                END;
+            """)
+
+    def add_sources(self, sources: list[dict]):
+        """
+        写入来源，相同 URL 覆盖内容并刷新获取时间
+
+        Args:
+            sources (list[dict]): 包含 title、url、content 的来源
+        """
+        now = time.time()
+        rows = [(item["url"], item.get("title", ""), item.get("content", ""), now) for item in sources if item.get("url")]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO sources (url, title, content, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET title = excluded.title, content = excluded.content, "
+                "fetched_at = excluded.fetched_at",
+                rows,
+            )
+
+    def search(self, query: str, limit: int = KNOWLEDGE_MAX_RESULTS) -> list[dict]:
+        """
+        检索新鲜的来源
+
+        Args:
+            query (str): 查询文本
+            limit (int): 最多返回的来源数量
+
+        Returns:
+            list[dict]: 按相关度排序的来源
+        """
+        expression = fts_match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.title, s.url, s.content FROM sources_fts JOIN sources s ON s.id = sources_fts.rowid "
+                "WHERE sources_fts MATCH ? AND s.fetched_at >= ? ORDER BY bm25(sources_fts) LIMIT ?",
+                (expression, time.time() - self.max_age, limit),
+            ).fetchall()
+        return [make_source(title, url, content) for title, url, content in rows]
+
+    def lookup(self, query: str, exclude_urls: Collection[str] = ()) -> Optional[list[dict]]:
+        """
+        判断知识库能否回答查询，只计入本次运行还没有的来源
+
+        Args:
+            query (str): 查询文本
+            exclude_urls (Collection[str]): 本次运行已有来源的 URL
+
+        Returns:
+            list[dict] | None: 新来源数量和查询词覆盖率达到阈值时返回新来源，否则返回 None
+        """
+        metrics = get_metrics()
+        metrics.incr("knowledge_store.lookups")
+        sources = [
+            source for source in self.search(query, KNOWLEDGE_MAX_RESULTS + len(exclude_urls))
+            if source["url"] not in exclude_urls
+        ][:KNOWLEDGE_MAX_RESULTS]
+        if len(sources) < KNOWLEDGE_MIN_RESULTS or term_coverage(query, sources) < KNOWLEDGE_MIN_COVERAGE:
+            return None
+        metrics.incr("knowledge_store.searches_avoided")
+        return sources
+
+
+@lazy
+def get_knowledge_store() -> Optional[KnowledgeStore]:
+    """获取全局知识库实例，未启用时返回 None"""
+    config = get_config()
+    if not config.knowledge_store:
+        return None
+    return KnowledgeStore(config.knowledge_store_db, config.knowledge_max_age)
@@ -0,0 +1,110 @@
+"""
+搜索状态中的只追加消息历史
+节点不再原地修改 state['messages']，而是只返回本节点新增的消息，由状态归约函数 append_messages 追加。
+每个版本都是 MessageLog，不同版本共享同一批消息对象和同一个编码缓存：
+每条消息的提示文本（repr）和 token 估算只计算一次，后续节点和后续版本直接复用。
+MessageLog 是 list 的子类，可以直接传给语言模型、JSON/msgpack 序列化和检查点；原地修改的方法会抛出 TypeError。
+"""
+
+from itertools import chain
+from typing import Iterable, Optional
+
+from ...utils.tokens import estimate_message_tokens
+
+
+class _EncodingCache:
+    """按位置保存消息的提示文本和 token 估算，条目持有消息对象，以对象身份校验是否属于当前版本"""
+
+    def __init__(self):
+        self.entries: list[tuple[dict, str, int]] = []
+
+    def get(self, index: int, message: dict) -> tuple[str, int]:
+        if index < len(self.entries) and self.entries[index][0] is message:
+            return self.entries[index][1], self.entries[index][2]
+        entry = (message, repr(message), estimate_message_tokens(message))
+        if index < len(self.entries):
+            # 从同一前缀分叉出的另一个版本占用了该位置，覆盖后对方在下次读取时重新计算
+            self.entries[index] = entry
+        elif index == len(self.entries):
+            self.entries.append(entry)
+        return entry[1], entry[2]
+
+
+def _read_only(name: str):
+    def method(self, *args, **kwargs):
+        raise TypeError(f"MessageLog is append-only, use extended() instead of {name}()")
+    method.__name__ = name
+    return method
+
+
+class MessageLog(list):
+    """只追加的消息历史"""
+
+    __slots__ = ("_cache",)
+
+    def __init__(self, messages: Iterable[dict] = (), cache: Optional[_EncodingCache] = None):
+        """
+        Args:
+            messages (Iterable[dict]): openai 格式的消息
+            cache (_EncodingCache, optional): 与前一个版本共享的编码缓存
+        """
+        super().__init__(messages)
+        self._cache = cache if cache is not None else _EncodingCache()
+
+    def extended(self, messages: Iterable[dict]) -> "MessageLog":
+        """
+        返回追加了消息的新版本，当前版本不变
+
+        Args:
+            messages (Iterable[dict]): 新增的消息
+
+        Returns:
+            MessageLog: 与当前版本共享消息对象和编码缓存的新版本
+        """
+        return MessageLog(chain(self, messages), self._cache)
+
+    def text(self) -> str:
+        """消息列表的提示文本，与 str(list(messages)) 相同"""
+        return "[" + ", ".join(self._cache.get(index, message)[0] for index, message in enumerate(self)) + "]"
+
+    def tokens(self) -> int:
+        """估算的 token 总数，与 estimate_messages_tokens 相同"""
+        return sum(self._cache.get(index, message)[1] for index, message in enumerate(self))
+
+    def __reduce__(self):
+        # 复制和 pickle 时保留编码缓存，且不经过被禁用的 extend
+        return MessageLog, (list(self), self._cache)
+
+    append = _read_only("append")
+    extend = _read_only("extend")
+    insert = _read_only("insert")
+    pop = _read_only("pop")
+    remove = _read_only("remove")
+    clear = _read_only("clear")
+    sort = _read_only("sort")
+    reverse = _read_only("reverse")
+    __setitem__ = _read_only("__setitem__")
+    __delitem__ = _read_only("__delitem__")
+    __iadd__ = _read_only("__iadd__")
+    __imul__ = _read_only("__imul__")
+
+
+def as_message_log(messages: Optional[Iterable[dict]]) -> MessageLog:
+    """把状态或请求中的消息列表转换为 MessageLog，已经是 MessageLog 时原样返回"""
+    if isinstance(messages, MessageLog):
+        return messages
+    return MessageLog(messages or ())
+
+
+def append_messages(existing: Optional[Iterable[dict]], new: Optional[Iterable[dict]]) -> MessageLog:
+    """
+    消息历史的状态归约函数，只追加
+
+    Args:
+        existing (Iterable[dict]): 已有的消息，检查点恢复后可能是普通列表
+        new (Iterable[dict]): 节点新增的消息，或运行输入的历史消息
+
+    Returns:
+        MessageLog: 追加后的消息历史
+    """
+    return as_message_log(existing).extended(new or ())
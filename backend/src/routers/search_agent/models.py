@@ -11,6 +11,9 @@ from operator import add
 from typing import List
 from typing_extensions import Annotated
 
+from .message_log import append_messages
+from .sources import merge_sources
+
 
 class SearchDepthEnum(str, Enum):
     """搜索深度枚举"""
@@ -18,6 +21,13 @@ class SearchDepthEnum(str, Enum):
     ADVANCED = "advanced"
 
 
+class ProjectionEnum(str, Enum):
+    """非流式接口返回字段的投影"""
+    ANSWER = "answer"  # 只返回回答
+    CITATIONS = "citations"  # 回答和被引用的来源
+    FULL = "full"  # 完整的工作流状态
+
+
 class WebSearchJudgement(BaseModel):
     """判断是否需要网页搜索的模型"""
     reason: str = Field(description="选择执行该动作的原因")
@@ -71,9 +81,31 @@ class SearchQueryList(BaseModel):
     )
     
 
+class PlannedQuery(BaseModel):
+    """查询计划中的一个步骤"""
+    id: str = Field(description="A short unique id of the step, e.g. q1")
+    query: str = Field(description="The web search query of the step")
+    depends_on: List[str] = Field(
+        default_factory=list,
+        description="Ids of the steps whose answers are needed to write this query"
+    )
+
+class QueryPlan(BaseModel):
+    """带依赖关系的查询计划"""
+    rationale: str = Field(
+        description="A brief explanation of how the research question is decomposed."
+    )
+    steps: List[PlannedQuery] = Field(
+        description="The search steps of the plan."
+    )
+
+
 class WebSearchState(TypedDict):
     search_query: str
     id: str
+    run_id: str  # 运行ID
+    query: str  # 研究主题
+    search_depth: str  # 搜索深度
 
 class WebSearchDoc(BaseModel):
     """网页搜索结果模型"""
@@ -84,12 +116,15 @@ class WebSearchDoc(BaseModel):
 # 定义状态类
 class OverallState(TypedDict):
     """工作流状态类，用于在各个节点之间传递状态"""
+    run_id: str  # 运行ID
     query: str  # 用户查询
-    messages: list[dict]  # 消息历史
+    messages: Annotated[list, append_messages]  # 消息历史，节点只返回新增的消息
     web_search_query_wait_list: list[str]  # 待网络搜索查询列表
     web_search_depth: str  # 搜索深度
-    web_search_results_list: Annotated[list, add]  # 搜索结果列表
+    web_search_results_list: Annotated[list, merge_sources]  # 搜索结果列表，超出字节预算时压缩排名最低的来源
     web_search_queries_list: Annotated[list, add]  # 搜索查询历史列表
+    web_search_notes: Annotated[list, add]  # 搜索分支生成的查询笔记
+    source_ids: Annotated[list, add]  # 证据渲染器分配编号的来源（id、title、url），与回答中的 [n] 引用一致
     max_search_loop: int  # 最大搜索循环次数
     search_loop: int  # 当前搜索循环次数
     response: str  # 响应内容
@@ -99,6 +134,8 @@ class OverallState(TypedDict):
     is_sufficient: bool  # 搜索结果是否足够
     followup_search_query: list[str]  # 后续搜索查询
     knowledge_gap: str  # 知识缺口
+    speculative_draft_id: str  # 推测式回答草稿ID
+    query_plan: list[dict]  # 待执行的查询计划步骤
 
 
 class InputData(TypedDict):
@@ -106,4 +143,12 @@ class InputData(TypedDict):
     query: str  # 必填字段
     effort: str  # 必填字段
     model: NotRequired[str]  # 可选字段
-    messages: NotRequired[list[dict]]  # 可选字段
\ No newline at end of file
+    messages: NotRequired[list[dict]]  # 可选字段
+    refresh: NotRequired[bool]  # 可选字段，为 True 时跳过回答缓存
+    profile: NotRequired[bool]  # 可选字段，管理员专用，为 True 时对本次运行采样分析
+
+class BatchInputData(TypedDict):
+    """批量研究输入数据模型"""
+    queries: list[str]  # 必填字段
+    effort: NotRequired[str]  # 可选字段，所有条目使用相同的搜索强度
+    refresh: NotRequired[bool]  # 可选字段，为 True 时跳过回答缓存
@@ -4,13 +4,16 @@
 """
 import logging
 from functools import wraps
-from typing import Callable, Any, Dict, List, Optional
+from typing import Callable, Any, Dict, List, Optional, Sequence
 from langgraph.types import Command,Send
+from langgraph.constants import TAG_NOSTREAM
 from typing_extensions import Literal
 from fastapi import HTTPException
-from langchain.output_parsers import PydanticOutputParser
 from enum import Enum
 import uuid
+import time
+import random
+import threading
 
 from .models import (
     OverallState, 
@@ -19,14 +22,84 @@ from .models import (
     ClarifyUser, 
     AnalyzeRouter,
     SearchQueryList,
+    QueryPlan,
     WebSearchState,
-    WebSearchDoc
+    WebSearchDoc,
+    SearchDepthEnum
 )
 from ...utils.helpers import send_node_execution_update, send_stream_message_update, send_messages_update
-from .prompts import clarify_with_user_instructions,answer_instructions,analyze_need_web_search_instructions,query_writer_instructions,reflection_instructions
+from ...utils.resilience import ResilientUpstream
+from ...utils.metrics import get_metrics
+from ...utils.scheduler import get_llm_scheduler
+from ...utils.tokens import estimate_tokens
+from ...utils.text import term_coverage
+from ...utils.warmup import warm_up_model
+from .prompts import clarify_with_user_instructions,answer_instructions,analyze_need_web_search_instructions,query_writer_instructions,reflection_instructions,search_note_instructions,query_plan_instructions,resolve_planned_query_instructions,router_system_instructions
 from .config import get_config
+from .constants import (
+    LLM_DEADLINE,
+    LLM_HEDGE_MIN_DELAY,
+    HEDGE_PERCENTILE,
+    SEARCH_NOTE_MAX_WORDS,
+    SEARCH_ESCALATION_MIN_RESULTS,
+    SEARCH_ESCALATION_MIN_COVERAGE,
+    ADVANCED_SEARCH_OPTIONS,
+    QUERY_PLAN_MAX_STEPS,
+    QUERY_PLAN_INPUT_SOURCES,
+    EVIDENCE_MAX_CHARS_PER_SOURCE,
+)
+from .providers import search_web
+from .knowledge import get_knowledge_store
+from .passages import get_passage_indexes
+from .evidence import EvidenceRenderer, compact_text, get_evidence_renderers
+from .message_log import as_message_log
+from .runnables import get_runnable_registry, output_parser, prompt_template
+from .sources import make_source, source_previews
+from .planner import QueryPlanScheduler, normalize_plan
+from .fast_router import get_fast_router
+from .speculation import start_draft, take_draft, discard_draft, evidence_looks_sufficient, DraftReplayModel
+
+# 上游弹性策略：截止时间、对冲请求和熔断器
+llm_upstream = ResilientUpstream(
+    "llm", deadline=LLM_DEADLINE, hedge_percentile=HEDGE_PERCENTILE, hedge_min_delay=LLM_HEDGE_MIN_DELAY
+)
+
+
+def invoke_llm(
+    messages: list[dict],
+    schema: Any = None,
+    hedge: bool = True,
+    deadline: Optional[float] = LLM_DEADLINE,
+    tags: Optional[list[str]] = None,
+):
+    """
+    通过调度器和弹性层调用语言模型，失败或熔断时降级到备用模型
+    
+    Args:
+        messages (list[dict]): 消息列表
+        schema (Any, optional): 结构化输出模型，为空时直接调用
+        hedge (bool): 是否允许对冲请求，流式输出的调用应关闭
+        deadline (float, optional): 截止时间（秒），None 表示不限制
+        tags (list[str], optional): 调用的标签，例如 TAG_NOSTREAM 表示不向前端流式输出
+        
+    Returns:
+        Any: 模型响应或结构化输出
+    """
+    def build(llm):
+        return get_runnable_registry().get(llm, schema, tags)
+    
+    warm_up = warm_up_model.get()
+    if warm_up is not None:
+        # 启动预热：不经过调度器、弹性层和调用缓存，不影响排队和对冲延迟统计
+        runnable = warm_up.with_structured_output(schema) if schema is not None else warm_up
+        return runnable.invoke(messages)
+    fallback = None
+    if get_config().backup_llm is not None:
+        fallback = lambda: build(get_config().backup_llm).invoke(messages)
+    # 按当前请求的工作负载类别排队，对话等高优先级调用先于排队中的搜索调用执行
+    with get_llm_scheduler().slot():
+        return llm_upstream.call(build(get_config().llm).invoke, messages, fallback=fallback, hedge=hedge, deadline=deadline)
 
-config = get_config()
 
 class NodeStatus(str, Enum):
     """节点状态枚举"""
@@ -63,26 +136,47 @@ def agent_router(state: OverallState) -> Command[Literal['clarify_with_user', 'a
     send_node_update('agent_router', NodeStatus.RUNNING)
     
     query = state.get("query", "")
-    messages = state.get("messages", [])
-    parser = PydanticOutputParser(pydantic_object=AnalyzeRouter)
-    format_instructions = parser.get_format_instructions()
-    
-    router_system_prompt = f"你是一个智能分析路由，判断用户的提问是否需要进行深度研究，还是可以直接回答,你给出的回答必须使用json格式，满足以下格式要求：{format_instructions}"
-    structured_output_model = config.llm.with_structured_output(schema=AnalyzeRouter).with_retry(stop_after_attempt=3)
-    
-    response = structured_output_model.invoke([
-        {'role': 'system', 'content': router_system_prompt},
-        *state['messages'],
-        {"role": "user", "content": state['query']}
-    ])
+    history = as_message_log(state.get("messages"))
+    get_metrics().observe("search.history_tokens", history.tokens())
+    
+    fast_router = get_fast_router()
+    decision = fast_router.classify(query, history) if fast_router is not None else None
+    fast_path = decision is not None and fast_router.is_confident(decision)
+    if fast_path:
+        # 明显的请求直接由本地判断路由，按比例在后台用语言模型复核
+        response = AnalyzeRouter(
+            reason=decision.reason, confidence=decision.confidence, need_deep_research=decision.need_deep_research
+        )
+        if random.random() < get_config().fast_router_shadow_rate and warm_up_model.get() is None:
+            fast_router.shadow(query, decision, lambda: route_with_llm(query, history).need_deep_research)
+    else:
+        response = route_with_llm(query, history)
+        if decision is not None and warm_up_model.get() is None:
+            fast_router.record_agreement(query, decision, response.need_deep_research)
     
-    messages.append({"role": "user", "content": query})
-    send_node_update('agent_router', NodeStatus.DONE, response.model_dump())
+    new_messages = [{"role": "user", "content": query}]
+    send_node_update(
+        'agent_router',
+        NodeStatus.DONE,
+        {**response.model_dump(), "fast_path": fast_path}
+    )
     
+    # API 入口传入运行ID时沿用，流结束后据此释放运行范围的对象
+    run_id = state.get("run_id") or str(uuid.uuid4())
     if response.need_deep_research:
-        return Command(goto="clarify_with_user", update={"messages": messages})
+        return Command(goto="clarify_with_user", update={"messages": new_messages, "run_id": run_id})
     else:
-        return Command(goto="assistant", update={"messages": messages, "isNeedWebSearch": False})
+        return Command(goto="assistant", update={"messages": new_messages, "isNeedWebSearch": False, "run_id": run_id})
+
+
+def route_with_llm(query: str, messages: Sequence[dict]) -> AnalyzeRouter:
+    """用语言模型判断是否需要深度研究"""
+    router_system_prompt = prompt_template(router_system_instructions, AnalyzeRouter).format()
+    return invoke_llm([
+        {'role': 'system', 'content': router_system_prompt},
+        *messages,
+        {"role": "user", "content": query}
+    ], schema=AnalyzeRouter)
 
 
 @error_handler("clarify_with_user")
@@ -90,15 +184,14 @@ def clarify_with_user(state: OverallState) -> Command[Literal['analyze_need_web_
     """与用户进行交流，澄清用户的需求"""
     send_node_update('clarify_with_user', NodeStatus.RUNNING)
     
-    model = config.llm.with_structured_output(ClarifyUser).with_retry(stop_after_attempt=3)
-    messages = state['messages']
+    messages = as_message_log(state['messages'])
     
-    response = model.invoke([{
+    response = invoke_llm([{
         "role": "user",
         "content": clarify_with_user_instructions.format(
-            messages=str(messages),
+            messages=messages.text(),
         )
-    }])
+    }], schema=ClarifyUser)
     
     send_node_update(
         'clarify_with_user',
@@ -111,12 +204,12 @@ def clarify_with_user(state: OverallState) -> Command[Literal['analyze_need_web_
     )
     
     if response.need_clarification:
-        messages.extend([{'role': 'assistant', 'content': response.question}])
-        send_messages_update('clarify_with_user', messages)
-        return Command(goto="__end__", update={"messages": messages, "query": state['query']})
+        new_messages = [{'role': 'assistant', 'content': response.question}]
+        send_messages_update('clarify_with_user', messages.extended(new_messages))
+        return Command(goto="__end__", update={"messages": new_messages, "query": state['query']})
     else:
-        messages.extend([{'role': 'assistant', 'content': response.verification}])
-        return Command(goto="analyze_need_web_search", update={"messages": messages, "query": response.verification})
+        new_messages = [{'role': 'assistant', 'content': response.verification}]
+        return Command(goto="analyze_need_web_search", update={"messages": new_messages, "query": response.verification})
 
 
 @error_handler("analyze_need_web_search")
@@ -124,18 +217,16 @@ def analyze_need_web_search(state: OverallState) -> OverallState:
     """判断是否需要进行网页搜索"""
     send_node_update('analyze_need_web_search', NodeStatus.RUNNING)
     
-    parser = PydanticOutputParser(pydantic_object=WebSearchJudgement)
-    format_instructions = parser.get_format_instructions()
     query = state['query']
-    prompt = analyze_need_web_search_instructions.format(query=query, format_instructions=format_instructions)
+    prompt = prompt_template(analyze_need_web_search_instructions, WebSearchJudgement).format(query=query)
     
-    response = config.llm.invoke([
-        {'role': 'system', 'content': config.system_prompt},
+    response = invoke_llm([
+        {'role': 'system', 'content': get_config().system_prompt},
         *state['messages'],
         {"role": "user", "content": prompt}
     ])
     
-    model = parser.parse(response.content)
+    model = output_parser(WebSearchJudgement).parse(response.content)
     logging.info(f"Parsed analyze_need_web_search model: {model}")
     
     send_node_update(
@@ -163,16 +254,15 @@ def generate_search_query(state: OverallState) -> OverallState:
     
     query = state['query']
     messages = state.get("messages", [])
-    generated_queries_number = state.get("generated_queries_number", config.default_number_queries)
-    parser = PydanticOutputParser(pydantic_object=SearchQueryList)
-    format_instructions = parser.get_format_instructions()
-    prompt = query_writer_instructions.format(query=query, format_instructions=format_instructions,number_queries=generated_queries_number)
-    llm_with_structured = config.llm.with_structured_output(SearchQueryList).with_retry(stop_after_attempt=3)
-    response:SearchQueryList = llm_with_structured.invoke([
-        {'role': 'system', 'content': config.system_prompt},
+    if get_config().query_plan:
+        return plan_search_queries(state)
+    generated_queries_number = state.get("generated_queries_number", get_config().default_number_queries)
+    prompt = prompt_template(query_writer_instructions, SearchQueryList).format(query=query, number_queries=generated_queries_number)
+    response:SearchQueryList = invoke_llm([
+        {'role': 'system', 'content': get_config().system_prompt},
         *messages,
         {"role": "user", "content": prompt}
-    ])
+    ], schema=SearchQueryList)
     
     logging.info(f"Parsed generate_search_query model: {response}")
     
@@ -180,14 +270,86 @@ def generate_search_query(state: OverallState) -> OverallState:
         'generate_search_query',
         NodeStatus.DONE,
         {
-            "query": '|'.join(response.query)
+            "query": '|'.join(response.query),
+            "web_search_depth": SearchDepthEnum.BASIC.value
         }
     )
 
     return {
         'web_search_query_wait_list': response.query,
+        'web_search_depth': SearchDepthEnum.BASIC.value,
     }
 
+
+def plan_search_queries(state: OverallState) -> OverallState:
+    """生成带依赖关系的查询计划"""
+    max_steps = min(QUERY_PLAN_MAX_STEPS, state.get("max_search_loop", get_config().max_search_loop))
+    prompt = prompt_template(query_plan_instructions, QueryPlan).format(query=state['query'], max_steps=max_steps)
+    response: QueryPlan = invoke_llm([
+        {'role': 'system', 'content': get_config().system_prompt},
+        *state.get("messages", []),
+        {"role": "user", "content": prompt}
+    ], schema=QueryPlan)
+    
+    logging.info(f"Parsed query plan: {response}")
+    steps = normalize_plan([step.model_dump() for step in response.steps], max_steps)
+    
+    send_node_update(
+        'generate_search_query',
+        NodeStatus.DONE,
+        {
+            "query": '|'.join(step['query'] for step in steps),
+            "web_search_depth": SearchDepthEnum.BASIC.value,
+            "query_plan": steps
+        }
+    )
+    
+    return {
+        'web_search_query_wait_list': [step['query'] for step in steps],
+        'web_search_depth': SearchDepthEnum.BASIC.value,
+        'query_plan': steps,
+    }
+
+@error_handler("knowledge_lookup")
+def knowledge_lookup(state: OverallState) -> OverallState:
+    """网络搜索前先检索来源知识库，知识库能回答的查询不再调用外部搜索"""
+    knowledge_store = get_knowledge_store()
+    # 查询计划的步骤在执行时各自检索知识库
+    if knowledge_store is None or state.get('query_plan'):
+        return {}
+    send_node_update('knowledge_lookup', NodeStatus.RUNNING)
+    
+    answered_queries = []
+    remaining_queries = []
+    sources_gathered = []
+    # 本次运行已有的来源不算作知识库命中，否则后续查询会被本次刚保存的来源"回答"，重复追加并消耗搜索次数
+    known_urls = {source['url'] for source in state.get('web_search_results_list', [])}
+    for query in state['web_search_query_wait_list']:
+        sources = knowledge_store.lookup(query, known_urls)
+        if sources is None:
+            remaining_queries.append(query)
+        else:
+            answered_queries.append(query)
+            sources_gathered.extend(sources)
+            known_urls.update(source['url'] for source in sources)
+    
+    send_node_update(
+        'knowledge_lookup',
+        NodeStatus.DONE,
+        {
+            "knowledge_hits": "|".join(answered_queries),
+            "web_search_query_wait_list": "|".join(remaining_queries),
+            "web_search_results": source_previews(sources_gathered)
+        }
+    )
+    
+    return {
+        "web_search_results_list": sources_gathered,
+        "web_search_queries_list": answered_queries,
+        "web_search_query_wait_list": remaining_queries,
+    }
+
+
 @error_handler("web_search")
 def web_search(state: WebSearchState) -> OverallState:
     """网页搜索"""
@@ -196,20 +358,194 @@ def web_search(state: WebSearchState) -> OverallState:
     send_node_update('web_search', NodeStatus.RUNNING, {"id": random_uuid_str})
     
     query = state['search_query']
+    sources_gathered, search_depth = gather_sources(query, state.get('search_depth') or SearchDepthEnum.BASIC.value)
+    
+    update = {
+        "web_search_results_list": sources_gathered,
+        "web_search_queries_list": [query]
+    }
+    event_data = {"id": random_uuid_str, "web_search_results": source_previews(sources_gathered), "search_depth": search_depth}
+    if get_config().search_notes and sources_gathered:
+        note = write_search_note(state, sources_gathered)
+        if note is not None:
+            update["web_search_notes"] = [note]
+            event_data["note"] = note["note"]
+    
+    send_node_update('web_search', NodeStatus.DONE, event_data)
     
-    response = config.tavily_client.search(query, search_depth='basic')
-    search_result = response['results']
+    return update
+
+
+def gather_sources(query: str, search_depth: str) -> tuple[list[dict], str]:
+    """
+    执行网络搜索并写入知识库，basic 结果较差时升级为 advanced 重新搜索
+    
+    Args:
+        query (str): 搜索查询
+        search_depth (str): 初始搜索深度
+        
+    Returns:
+        tuple[list[dict], str]: 包含 title、url、content 的来源，以及实际使用的搜索深度
+    """
+    search_result = search_at_depth(query, search_depth)
+    escalate = get_config().adaptive_search_depth and search_depth == SearchDepthEnum.BASIC.value
+    if escalate and results_look_poor(query, search_result):
+        get_metrics().incr("search.depth.escalations")
+        search_depth = SearchDepthEnum.ADVANCED.value
+        search_result = search_at_depth(query, search_depth)
     # sources_gathered = [WebSearchDoc(title=item['title'], url=item['url'], content=item['content']) for item in search_result]
-    sources_gathered = [{"title": item['title'], "url": item['url'], "content": item['content']} for item in search_result]
+    sources_gathered = [
+        make_source(item['title'], item['url'], item['content'], item.get('score'))
+        for item in search_result
+    ]
+    
+    knowledge_store = get_knowledge_store()
+    if knowledge_store is not None:
+        knowledge_store.add_sources(sources_gathered)
+    return sources_gathered, search_depth
+
+
+@error_handler("execute_query_plan")
+def execute_query_plan(state: OverallState) -> OverallState:
+    """按依赖关系并发执行查询计划，依赖的步骤完成后立即启动后续步骤"""
+    send_node_update('execute_query_plan', NodeStatus.RUNNING)
+    
+    steps = state['query_plan']
+    knowledge_store = get_knowledge_store()
+    resolved_queries: dict[str, str] = {}
+    notes: dict[str, dict] = {}
+    # 已有或已被其他步骤取用的来源不算作知识库命中
+    known_urls = {source['url'] for source in state.get('web_search_results_list', [])}
+    known_urls_lock = threading.Lock()
+    
+    def lookup_knowledge(query: str) -> Optional[list[dict]]:
+        if knowledge_store is None:
+            return None
+        with known_urls_lock:
+            sources = knowledge_store.lookup(query, known_urls)
+            if sources is not None:
+                known_urls.update(source['url'] for source in sources)
+        return sources
+    
+    def run_step(step: dict, inputs: dict[str, list[dict]]) -> list[dict]:
+        query = resolve_planned_query(step['query'], inputs) if inputs else step['query']
+        resolved_queries[step['id']] = query
+        event_id = str(uuid.uuid4())
+        send_node_update('web_search', NodeStatus.RUNNING, {"id": event_id})
+        
+        sources = lookup_knowledge(query)
+        event_data = {"id": event_id, "query": query, "step": step['id'], "knowledge_hit": sources is not None}
+        if sources is None:
+            sources, event_data["search_depth"] = gather_sources(query, SearchDepthEnum.BASIC.value)
+        if get_config().search_notes and sources:
+            note = write_search_note(
+                {"search_query": query, "run_id": state.get('run_id', ''), "query": state['query']}, sources
+            )
+            if note is not None:
+                notes[step['id']] = note
+                event_data["note"] = note["note"]
+        send_node_update('web_search', NodeStatus.DONE, {**event_data, "web_search_results": source_previews(sources)})
+        return sources
+    
+    results = QueryPlanScheduler(steps, run_step).run()
     
-    send_node_update('web_search', NodeStatus.DONE, {"id": random_uuid_str,"web_search_results": sources_gathered})
+    send_node_update(
+        'execute_query_plan',
+        NodeStatus.DONE,
+        {
+            "query_plan": [
+                {**step, "query": resolved_queries.get(step['id'], step['query']), "results": len(results[step['id']])}
+                for step in steps
+            ]
+        }
+    )
     
+    # 按计划顺序合并结果，保证来源编号稳定
     return {
-        "web_search_results_list": sources_gathered,
-        "web_search_queries_list": [query]
+        "web_search_results_list": [source for step in steps for source in results[step['id']]],
+        "web_search_queries_list": [resolved_queries.get(step['id'], step['query']) for step in steps],
+        "web_search_notes": [notes[step['id']] for step in steps if step['id'] in notes],
+        "web_search_query_wait_list": [],
+        "query_plan": [],
     }
 
 
+def resolve_planned_query(query: str, inputs: dict[str, list[dict]]) -> str:
+    """
+    用依赖步骤的结果把查询模板改写为具体的搜索查询
+    
+    Args:
+        query (str): 规划器给出的查询模板
+        inputs (dict[str, list[dict]]): 依赖步骤的搜索结果
+        
+    Returns:
+        str: 改写后的查询，失败时返回原查询
+    """
+    sources = "\n\n".join(
+        f"{compact_text(source['title'], 200)}\n{compact_text(source['content'], EVIDENCE_MAX_CHARS_PER_SOURCE)}"
+        for results in inputs.values()
+        for source in results[:QUERY_PLAN_INPUT_SOURCES]
+    )
+    if not sources:
+        return query
+    prompt = resolve_planned_query_instructions.format(query=query, sources=sources)
+    try:
+        response = invoke_llm([{"role": "user", "content": prompt}], tags=[TAG_NOSTREAM])
+    except Exception as e:
+        logging.warning(f"查询计划步骤改写失败: {query}, 错误: {str(e)}")
+        return query
+    lines = [line.strip().strip('"') for line in response.content.splitlines() if line.strip()]
+    return lines[0] if lines else query
+
+
+def search_at_depth(query: str, search_depth: str) -> list[dict]:
+    """按搜索深度执行搜索，advanced 搜索附带更多结果和网页原文"""
+    options = ADVANCED_SEARCH_OPTIONS if search_depth == SearchDepthEnum.ADVANCED.value else {}
+    return search_web(query, search_depth=search_depth, **options)
+
+
+def results_look_poor(query: str, results: list[dict]) -> bool:
+    """判断搜索结果是否较差：结果太少或查询词覆盖率太低"""
+    if len(results) < SEARCH_ESCALATION_MIN_RESULTS:
+        return True
+    return term_coverage(query, results) < SEARCH_ESCALATION_MIN_COVERAGE
+
+
+def write_search_note(state: WebSearchState, sources: list[dict]) -> Optional[dict]:
+    """
+    在搜索分支内把本次查询的结果浓缩为带来源编号的笔记
+    
+    Args:
+        state (WebSearchState): 搜索分支状态
+        sources (list[dict]): 本次查询的搜索结果
+        
+    Returns:
+        dict | None: 包含 query、note、source_ids 的笔记，生成失败时返回 None，由反思直接使用原始结果
+    """
+    renderer = get_evidence_renderer(state)
+    source_ids = renderer.assign(sources)
+    rendered_sources = renderer.render_sources(source_ids)
+    prompt = search_note_instructions.format(
+        research_topic=state.get('query', state['search_query']),
+        search_query=state['search_query'],
+        max_words=SEARCH_NOTE_MAX_WORDS,
+        sources=rendered_sources,
+    )
+    metrics = get_metrics()
+    try:
+        # 笔记只用于后续提示，不向前端流式输出
+        response = invoke_llm([{"role": "user", "content": prompt}], tags=[TAG_NOSTREAM])
+    except Exception as e:
+        metrics.incr("search_notes.failures")
+        logging.warning(f"搜索笔记生成失败: {state['search_query']}, 错误: {str(e)}")
+        return None
+    note = response.content.strip()
+    metrics.incr("search_notes.created")
+    metrics.incr("search_notes.source_tokens", estimate_tokens(rendered_sources))
+    metrics.incr("search_notes.note_tokens", estimate_tokens(note))
+    return {"query": state['search_query'], "note": note, "source_ids": source_ids}
+
+
 @error_handler("evaluate_search_results")
 def evaluate_search_results(state: OverallState) -> OverallState:
     """评估搜索结果,是否足够可以回答用户提问"""
@@ -218,32 +554,57 @@ def evaluate_search_results(state: OverallState) -> OverallState:
     current_search_results = state['web_search_results_list']
     query = state['query']
     messages = state.get("messages", [])
+    query_count = len(state['web_search_queries_list'])
+    # 为本轮新增的来源分配编号，编号随事件发送给前端，回答中的 [n] 引用与之对应
+    new_sources = get_evidence_renderer(state).sync(current_search_results)
+    
+    # 推测式回答：已是最后一轮或本地判断证据充分时，与反思并行生成回答草稿
+    draft_id = ""
+    if get_config().speculative_answer and (
+        query_count >= state["max_search_loop"] or evidence_looks_sufficient(query, current_search_results)
+    ):
+        draft_id = start_draft(
+            get_config().llm, build_answer_messages(state), upstream=llm_upstream, fallback_llm=get_config().backup_llm
+        )
 
-    parser = PydanticOutputParser(pydantic_object=EvaluateWebSearchResult)
-    format_instructions = parser.get_format_instructions()
-    
-    prompt = reflection_instructions.format(
+    prompt = prompt_template(reflection_instructions, EvaluateWebSearchResult).format(
         research_topic=query,
-        format_instructions=format_instructions,
-        summaries=current_search_results
+        summaries=render_evidence(state, [state.get('knowledge_gap', '')])
     )
-    llm_with_structured = config.llm.with_structured_output(EvaluateWebSearchResult).with_retry(stop_after_attempt=3)
-    response:EvaluateWebSearchResult = llm_with_structured.invoke([
-        {'role': 'system', 'content': config.system_prompt},
-        *messages,
-        {"role": "user", "content": prompt}
-    ])
+    try:
+        response:EvaluateWebSearchResult = invoke_llm([
+            {'role': 'system', 'content': get_config().system_prompt},
+            *messages,
+            {"role": "user", "content": prompt}
+        ], schema=EvaluateWebSearchResult)
+    except Exception:
+        # 反思失败时草稿不会被回答节点取用，立即丢弃，不占用模型调用和草稿表
+        discard_draft(draft_id)
+        raise
 
     logging.info(f"Parsed evaluate_search_results model: {response}")
     
+    if draft_id and not is_search_finished(
+        response.is_sufficient, query_count, state["max_search_loop"], response.follow_up_queries
+    ):
+        discard_draft(draft_id)
+        draft_id = ""
+    
+    # 针对具体知识缺口的后续查询直接使用 advanced 搜索
+    search_depth = SearchDepthEnum.BASIC.value
+    if get_config().adaptive_search_depth and response.knowledge_gap and response.follow_up_queries:
+        search_depth = SearchDepthEnum.ADVANCED.value
+    
     send_node_update(
         'evaluate_search_results',
         NodeStatus.DONE,
         {
             "is_sufficient": response.is_sufficient,
+            "search_depth": search_depth,
             "followup_search_query": "|".join(response.follow_up_queries),
             "knowledge_gap": response.knowledge_gap,
             "web_search_query_wait_list": "|".join(response.follow_up_queries),
+            "sources": new_sources,
         }
     )
     
@@ -252,40 +613,89 @@ def evaluate_search_results(state: OverallState) -> OverallState:
         "followup_search_query": response.follow_up_queries,
         "knowledge_gap": response.knowledge_gap,
         "web_search_query_wait_list": response.follow_up_queries,
+        "web_search_depth": search_depth,
+        "speculative_draft_id": draft_id,
+        # 编号由证据渲染器按分配顺序决定（开启搜索笔记或查询计划时按分支完成顺序），投影和来源分页以此为准
+        "source_ids": new_sources,
     }
 
 
-@error_handler("assistant_node")
-def assistant_node(state: OverallState) -> OverallState:
-    """助手响应"""
-    send_node_update('assistant_node', NodeStatus.RUNNING)
-    
-    query = state['query']
-    
+def get_evidence_renderer(state: OverallState | WebSearchState) -> EvidenceRenderer:
+    """获取运行的证据渲染器，缺少运行ID时使用临时渲染器"""
+    run_id = state.get('run_id')
+    if not run_id:
+        return EvidenceRenderer()
+    return get_evidence_renderers().get(run_id)
+
+
+def render_evidence(state: OverallState, extra_queries: Optional[list[str]] = None) -> str:
+    """
+    渲染放入提示的证据：开启搜索笔记时合并各搜索分支的笔记，开启段落检索时只渲染与研究主题、子问题和额外查询最相关的段落，
+    否则渲染全部来源
+    
+    Args:
+        state (OverallState): 工作流状态
+        extra_queries (list[str]): 额外的检索查询，例如知识缺口
+        
+    Returns:
+        str: 以 [n] 编号的证据文本
+    """
+    results = state['web_search_results_list']
+    renderer = get_evidence_renderer(state)
+    renderer.sync(results)
+    if get_config().search_notes and state.get('web_search_notes'):
+        return renderer.render(notes=state['web_search_notes'])
+    if not get_config().passage_retrieval or not state.get('run_id'):
+        return renderer.render()
+    index = get_passage_indexes().get(state['run_id'])
+    index.sync(results)
+    passages = index.retrieve([state['query'], *state.get('web_search_queries_list', []), *(extra_queries or [])])
+    return renderer.render(passages)
+
+
+def build_answer_messages(state: OverallState) -> list[dict]:
+    """构造最终回答的提示消息"""
     if state['isNeedWebSearch']:
-        summaries = state['web_search_results_list']
-        send_messages = [
-            {'role': 'system', 'content': config.system_prompt},
+        return [
+            {'role': 'system', 'content': get_config().system_prompt},
             *state['messages'],
             {
                 "role": "user",
-                "content": answer_instructions.format(research_topic=query,summaries=summaries)
+                "content": answer_instructions.format(research_topic=state['query'], summaries=render_evidence(state))
             }
         ]
-    else:
-        send_messages = [
-            {'role': 'system', 'content': config.system_prompt},
-            *state['messages']
-        ]
+    return [
+        {'role': 'system', 'content': get_config().system_prompt},
+        *state['messages']
+    ]
+
+
+@error_handler("assistant_node")
+def assistant_node(state: OverallState) -> OverallState:
+    """助手响应"""
+    send_node_update('assistant_node', NodeStatus.RUNNING)
     
-    ai_response = config.llm.invoke(send_messages)
+    query = state['query']
+    send_messages = build_answer_messages(state)
+    
+    draft = take_draft(state.get('speculative_draft_id'))
+    ai_response = None
+    if draft is not None:
+        # 反思已确认结束搜索，直接回放推测生成的草稿
+        try:
+            ai_response = DraftReplayModel(draft=draft, assistant_started_at=time.time()).invoke(send_messages)
+        except Exception as e:
+            # 草稿已输出部分片段时无法无缝切换，否则与非推测路径一样重新生成
+            if draft.first_token_at is not None:
+                raise
+            logging.warning(f"推测式回答草稿失败，改为正常生成: {query}, 错误: {str(e)}")
+    if ai_response is None:
+        # 回答以流式输出，不发起对冲请求，也不设置整体截止时间（由模型请求超时兜底）
+        ai_response = invoke_llm(send_messages, hedge=False, deadline=None)
     logging.info(f"助手响应生成成功: {query}")
     
-    messages = [
-        *state["messages"],
-        {"role": "user", "content": f"{state['query']}"},
-        {"role": "assistant", "content": ai_response.content}
-    ]
+    # 用户提问已由 agent_router 追加，这里只追加回答
+    new_messages = [{"role": "assistant", "content": ai_response.content}]
     
     send_node_update(
         'assistant_node',
@@ -293,22 +703,47 @@ def assistant_node(state: OverallState) -> OverallState:
         {"response": "Response generated successfully"}
     )
     
-    send_messages_update('assistant_node', messages)
+    send_messages_update('assistant_node', as_message_log(state["messages"]).extended(new_messages))
+    release_run(state.get('run_id'))
     
     return {
         "response": ai_response.content,
-        "messages": messages
+        "messages": new_messages
     }
 
+def release_run(run_id: Optional[str]):
+    """释放运行范围的段落索引和证据渲染器，回答生成后或流结束时调用"""
+    get_passage_indexes().release(run_id)
+    get_evidence_renderers().release(run_id)
+
+
+def is_search_finished(is_sufficient: bool, query_count: int, max_search_loop: int, wait_list: list[str]) -> bool:
+    """判断搜索循环是否结束"""
+    return is_sufficient or query_count >= max_search_loop or wait_list == []
+
+
 def need_web_search(state: OverallState) -> str:
     """判断是否需要进行下一次搜索"""
     query_count = len(state['web_search_queries_list'])
-    if state["is_sufficient"] or query_count >= state["max_search_loop"]:
-        return "assistant"
-    elif state['web_search_query_wait_list'] == []:
+    if is_search_finished(state["is_sufficient"], query_count, state["max_search_loop"], state['web_search_query_wait_list']):
         return "assistant"
     else:
-        return [
-            Send("web_search", {"search_query": search_query, "id": int(idx)})
-            for idx, search_query in enumerate(state['web_search_query_wait_list'])
-        ]
\ No newline at end of file
+        return "knowledge_lookup"
+
+
+def dispatch_web_search(state: OverallState):
+    """为知识库未能回答的查询并行发起网络搜索，全部已回答时直接进入评估，存在查询计划时按计划执行"""
+    if state.get('query_plan'):
+        return "execute_query_plan"
+    if not state['web_search_query_wait_list']:
+        return "evaluate_search_results"
+    return [
+        Send("web_search", {
+            "search_query": search_query,
+            "id": int(idx),
+            "run_id": state.get("run_id", ""),
+            "query": state["query"],
+            "search_depth": state.get("web_search_depth") or SearchDepthEnum.BASIC.value,
+        })
+        for idx, search_query in enumerate(state['web_search_query_wait_list'])
+    ]
\ No newline at end of file
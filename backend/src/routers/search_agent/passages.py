@@ -0,0 +1,161 @@
+"""
+单次运行的段落检索索引
+把搜索结果切分为段落，使用本地特征哈希向量（无需 GPU 和网络）建立 NumPy 内存索引，
+反思和回答提示只携带与子问题、知识缺口最相关的段落，而不是完整的搜索结果。
+"""
+
+import re
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from .constants import (
+    EMBEDDING_DIM,
+    PASSAGE_SIZE,
+    PASSAGE_TOP_K,
+    PASSAGE_MAX_RESULTS,
+    PASSAGE_INDEX_MAX_RUNS,
+)
+from .runs import RunRegistry
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+_SENTENCE_PATTERN = re.compile(r"(?<=[。！？.!?\n])\s*")
+
+
+def split_passages(source: dict, size: int = PASSAGE_SIZE) -> list[dict]:
+    """
+    按句子把来源内容切分为不超过 size 个字符的段落
+
+    Args:
+        source (dict): 包含 title、url、content 的来源
+        size (int): 段落最大字符数
+
+    Returns:
+        list[dict]: 段落列表，保留来源的 title 和 url
+    """
+    passages = []
+    current = ""
+    for sentence in _SENTENCE_PATTERN.split(source.get("content", "")):
+        if current and len(current) + len(sentence) > size:
+            passages.append(current)
+            current = ""
+        # 超长句子直接按长度切开
+        while len(sentence) > size:
+            passages.append(sentence[:size])
+            sentence = sentence[size:]
+        current += sentence
+    if current.strip():
+        passages.append(current)
+    return [{"title": source.get("title", ""), "url": source.get("url", ""), "content": passage} for passage in passages]
+
+
+class HashingEmbedder:
+    """特征哈希向量：英文词与相邻词对、中文相邻两字，哈希到固定维度并做 L2 归一化"""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    @staticmethod
+    def _features(text: str) -> list[str]:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        words = [token for token in tokens if token.isascii()]
+        chars = [token for token in tokens if not token.isascii()]
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        features += [a + b for a, b in zip(chars, chars[1:])] or chars
+        return features
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        计算文本向量
+
+        Args:
+            texts (list[str]): 文本列表
+
+        Returns:
+            np.ndarray: 形状为 (len(texts), dim) 的 float32 矩阵
+        """
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                value = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                cols.append(value % self.dim)
+                # 用哈希的最高位决定符号，抵消哈希冲突带来的偏差
+                signs.append(1.0 if value & 0x80000000 else -1.0)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if rows:
+            np.add.at(matrix, (np.array(rows), np.array(cols)), np.array(signs, dtype=np.float32))
+        # 次线性词频缩放
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class PassageIndex:
+    """单次运行的段落向量索引，搜索结果只追加，因此按已索引来源数量增量更新"""
+
+    def __init__(self, embedder: Optional[HashingEmbedder] = None):
+        self.embedder = embedder or HashingEmbedder()
+        self.passages: list[dict] = []
+        self.vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self.source_count = 0
+
+    def sync(self, sources: list[dict]):
+        """索引尚未索引的新来源"""
+        new_sources = sources[self.source_count:]
+        self.source_count = len(sources)
+        passages = [passage for source in new_sources for passage in split_passages(source)]
+        if passages:
+            vectors = self.embedder.embed([f"{p['title']} {p['content']}" for p in passages])
+            self.passages.extend(passages)
+            self.vectors = np.vstack([self.vectors, vectors])
+
+    def search(self, query: str, k: int = PASSAGE_TOP_K) -> list[tuple[float, int]]:
+        """
+        检索与查询最相关的段落
+
+        Args:
+            query (str): 查询文本
+            k (int): 返回数量
+
+        Returns:
+            list[tuple[float, int]]: (相似度, 段落下标)，按相似度降序
+        """
+        if not self.passages:
+            return []
+        scores = self.vectors @ self.embedder.embed([query])[0]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return sorted(((float(scores[i]), int(i)) for i in top), reverse=True)
+
+    def retrieve(self, queries: list[str], k: int = PASSAGE_TOP_K, limit: int = PASSAGE_MAX_RESULTS) -> list[dict]:
+        """
+        为多个子问题检索段落并去重合并
+
+        Args:
+            queries (list[str]): 子问题或知识缺口
+            k (int): 每个子问题检索的段落数
+            limit (int): 合并后的最大段落数
+
+        Returns:
+            list[dict]: 段落列表，按来源顺序排列以保持上下文连贯
+        """
+        best: dict[int, float] = {}
+        for query in queries:
+            if not query:
+                continue
+            for score, index in self.search(query, k):
+                best[index] = max(score, best.get(index, -1.0))
+        selected = sorted(best, key=best.get, reverse=True)[:limit]
+        return [self.passages[index] for index in sorted(selected)]
+
+
+# 全局段落索引注册表
+passage_indexes: RunRegistry[PassageIndex] = RunRegistry(PassageIndex, PASSAGE_INDEX_MAX_RUNS)
+
+
+def get_passage_indexes() -> RunRegistry[PassageIndex]:
+    """获取全局段落索引注册表"""
+    return passage_indexes
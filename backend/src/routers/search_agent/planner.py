@@ -0,0 +1,99 @@
+"""
+查询计划调度
+规划器把研究问题拆分为带依赖关系的子查询 DAG，调度器并发执行所有就绪的子查询，
+依赖的子查询一完成就启动后续子查询，而不是按反思轮次整体同步。
+"""
+
+import contextvars
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+from ...utils.metrics import get_metrics
+
+# 查询计划执行线程池
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="query-plan")
+
+
+def normalize_plan(steps: list[dict], max_steps: int) -> list[dict]:
+    """
+    规范化规划器输出：去除重复或空的步骤，截断到最大步骤数，只保留对前面步骤的依赖以保证计划无环
+
+    Args:
+        steps (list[dict]): 包含 id、query、depends_on 的步骤
+        max_steps (int): 最大步骤数
+
+    Returns:
+        list[dict]: 规范化后的步骤
+    """
+    plan = []
+    seen = set()
+    for step in steps:
+        if not step.get("query") or step.get("id") in seen:
+            continue
+        seen.add(step["id"])
+        plan.append({"id": step["id"], "query": step["query"], "depends_on": list(step.get("depends_on") or [])})
+        if len(plan) >= max_steps:
+            break
+    earlier = set()
+    for step in plan:
+        step["depends_on"] = [dep for dep in dict.fromkeys(step["depends_on"]) if dep in earlier]
+        earlier.add(step["id"])
+    return plan
+
+
+class QueryPlanScheduler:
+    """按依赖关系并发执行查询计划"""
+
+    def __init__(self, steps: list[dict], run_step: Callable[[dict, dict[str, list[dict]]], list[dict]]):
+        """
+        Args:
+            steps (list[dict]): 规范化后的步骤
+            run_step (Callable): 执行单个步骤的函数，参数为步骤和其依赖步骤的结果，返回该步骤的结果
+        """
+        self.steps = {step["id"]: step for step in steps}
+        self.run_step = run_step
+        self.results: dict[str, list[dict]] = {}
+        self._lock = threading.Lock()
+
+    def _ready(self, pending: set[str]) -> list[str]:
+        return [step_id for step_id in pending if all(dep in self.results for dep in self.steps[step_id]["depends_on"])]
+
+    def _submit(self, step_id: str) -> Future:
+        step = self.steps[step_id]
+        inputs = {dep: self.results[dep] for dep in step["depends_on"] if dep in self.results}
+        # 复制上下文，步骤内发送的节点事件仍能写入当前运行的流
+        return _executor.submit(contextvars.copy_context().run, self.run_step, step, inputs)
+
+    def run(self) -> dict[str, list[dict]]:
+        """
+        执行查询计划
+
+        Returns:
+            dict[str, list[dict]]: 各步骤的结果，失败的步骤结果为空列表
+        """
+        metrics = get_metrics()
+        pending = set(self.steps)
+        running: dict[Future, str] = {}
+        while pending or running:
+            for step_id in self._ready(pending):
+                pending.discard(step_id)
+                running[self._submit(step_id)] = step_id
+            if not running:
+                # 规范化后的计划无环，这里只防御外部传入的循环依赖
+                logging.warning(f"查询计划存在循环依赖: {sorted(pending)}")
+                metrics.incr("query_plan.cycles")
+                for step_id in sorted(pending):
+                    running[self._submit(step_id)] = step_id
+                pending.clear()
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step_id = running.pop(future)
+                try:
+                    self.results[step_id] = future.result()
+                except Exception as e:
+                    metrics.incr("query_plan.step_failures")
+                    logging.error(f"查询计划步骤执行失败: {self.steps[step_id]['query']}, 错误: {str(e)}")
+                    self.results[step_id] = []
+        return self.results
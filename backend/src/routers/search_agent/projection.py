@@ -0,0 +1,58 @@
+"""
+非流式结果的字段投影
+完整的工作流状态包含全部搜索结果、查询历史和消息历史，只需要回答的调用方按投影获取需要的字段，
+来源通过单独的接口分页获取。
+"""
+
+from .models import ProjectionEnum
+from .sources import cited_ids, numbered_sources
+
+
+def project_state(state: dict, projection: ProjectionEnum) -> dict:
+    """
+    按投影选取工作流最终状态中的字段
+
+    Args:
+        state (dict): 工作流最终状态
+        projection (ProjectionEnum): answer 只返回回答，citations 额外返回被引用的来源，full 返回完整状态
+
+    Returns:
+        dict: 投影后的结果
+    """
+    if projection == ProjectionEnum.FULL:
+        return state
+    result = {
+        "run_id": state.get("run_id"),
+        "query": state.get("query"),
+        "response": state.get("response", ""),
+    }
+    if projection == ProjectionEnum.CITATIONS:
+        sources = numbered_sources(state.get("web_search_results_list") or [], state.get("source_ids"))
+        cited = set(cited_ids(result["response"]))
+        result["citations"] = [
+            {"id": source["id"], "title": source.get("title", ""), "url": source.get("url", "")}
+            for source in sources if source["id"] in cited
+        ]
+        result["sources_total"] = len(sources)
+    return result
+
+
+def source_page(state: dict, offset: int, limit: int) -> dict:
+    """
+    分页获取工作流最终状态中按 URL 去重并编号的来源
+
+    Args:
+        state (dict): 工作流最终状态
+        offset (int): 起始位置
+        limit (int): 每页数量
+
+    Returns:
+        dict: 包含 total、offset、limit 和 items 的分页结果
+    """
+    sources = numbered_sources(state.get("web_search_results_list") or [], state.get("source_ids"))
+    return {
+        "total": len(sources),
+        "offset": offset,
+        "limit": limit,
+        "items": sources[offset:offset + limit],
+    }
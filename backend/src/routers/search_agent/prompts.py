@@ -4,7 +4,10 @@ from datetime import datetime
 def get_current_date():
     return datetime.now().strftime("%B %d, %Y")
 
-system_instructions = """You are clerk, a deep search expert of Deep Thinking Search AI System.Today's date is {date}.If not other language is specified, reply with Simplify Chinese(简体中文).""".format(date=get_current_date())
+# 系统提示包含当天日期，由配置按日期渲染并在每天零点刷新
+system_instructions = """You are clerk, a deep search expert of Deep Thinking Search AI System.Today's date is {date}.If not other language is specified, reply with Simplify Chinese(简体中文)."""
+
+router_system_instructions = "你是一个智能分析路由，判断用户的提问是否需要进行深度研究，还是可以直接回答,你给出的回答必须使用json格式，满足以下格式要求：{format_instructions}"
 
 clarify_with_user_instructions="""
 These are the messages that have been exchanged so far from the user asking for the report:
@@ -63,6 +66,33 @@ Limitations:
 - Don't produce more than {number_queries} queries.
 """
 
+query_plan_instructions = """Your goal is to break the research question into a small plan of web search queries.
+
+Instructions:
+- Each step is one specific web search query with a short id like "q1".
+- If a query can only be written once another step's answer is known, list that step's id in "depends_on" and describe the missing fact in the query, e.g. "latest funding round of <the company found in q1>".
+- Steps without dependencies run in parallel, so only add a dependency when it is really needed.
+- Prefer few steps, don't produce more than {max_steps} steps.
+- Query should ensure that the most current information is gathered.
+
+Format rules:
+{format_instructions}
+
+User Query:
+{query}
+"""
+
+resolve_planned_query_instructions = """Rewrite the search query template into a concrete, self-contained web search query, filling in the missing facts from the Sources found by the steps it depends on.
+
+Query template:
+{query}
+
+Sources:
+{sources}
+
+Reply with the search query only.
+"""
+
 analyze_need_web_search_instructions  = "根据用户提出的问题:\n{query}\n。如果存在上下文信息，并且你能综合上下文信息，判断有足够的信息做出回答，如果上下文信息没有相关内容，但是你判断这是一个你可以优先根据内化知识进行回答的问题，那么也不需要执行网络搜索，返回isNeedWebSearch为False。如果既无法根据内化知识回答，也不能从上下文历史消息中获取足够的信息，那么就需要使用网络搜索，如果用户明确要求使用联网或者网络搜索，或者最消息，最新消息，那么必须使用联网搜索，isNeedWebSearch为True。请使用json结构化输出，严格遵循json格式：\n{format_instructions}"
 
 # No used
@@ -79,6 +109,19 @@ Research Topic:
 {research_topic}
 """
 
+search_note_instructions = """You are condensing web search results for the research topic "{research_topic}".
+
+Instructions:
+- Extract only the facts from the Sources that help answer the search query "{search_query}".
+- Write a short note of at most {max_words} words as bullet points.
+- End every fact with the id of its source in square brackets, e.g. [2]. Only use ids that appear in the Sources.
+- Keep numbers, dates and names exactly as written in the Sources, don't make up any information.
+- If nothing in the Sources is relevant, reply with an empty message.
+
+Sources:
+{sources}
+"""
+
 reflection_instructions = """You are an expert research assistant analyzing summaries about "{research_topic}".
 
 Instructions:
@@ -119,7 +162,8 @@ Instructions:
 - You have access to all the information gathered from the previous steps.
 - You have access to the user's question.
 - Generate a high-quality answer to the user's question based on the provided summaries and the user's question.
-- Include the sources you used from the Summaries in the answer correctly, use markdown format (e.g. [apnews](https://vertexaisearch.cloud.google.com/id/1-0)). THIS IS A MUST.
+- Each source in the Summaries starts with its id, title and url, e.g. `[3] AP News (https://apnews.com/article/...)`.
+- Cite the sources you used by their id as a markdown link to their url (e.g. [[3]](https://apnews.com/article/...)). THIS IS A MUST.
 
 User Context:
 - {research_topic}
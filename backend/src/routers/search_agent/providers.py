@@ -0,0 +1,376 @@
+"""
+搜索提供方
+定义统一的搜索接口，包含 Tavily 网络搜索、本地 SQLite FTS5 文档索引，
+以及并发扇出（倒数排名融合）和按顺序级联两种组合方式。
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import ContextVar
+from typing import Callable, Hashable, Optional
+
+from ...utils.lazy import lazy
+from ...utils.metrics import get_metrics
+from ...utils.resilience import ResilientUpstream
+from ...utils.scheduler import get_search_scheduler
+from ...utils.singleflight import SingleFlight
+from .cache import normalize_query
+from .config import get_config
+from .constants import (
+    SEARCH_DEADLINE,
+    SEARCH_HEDGE_MIN_DELAY,
+    HEDGE_PERCENTILE,
+    SEARCH_FALLBACK_CACHE_SIZE,
+    SEARCH_DEPTH_CREDITS,
+    SEARCH_FANOUT_TIMEOUT,
+    SEARCH_CASCADE_MIN_RESULTS,
+    RRF_K,
+    LOCAL_SEARCH_MAX_RESULTS,
+    LOCAL_SEARCH_CHUNK_SIZE,
+)
+
+# 扇出搜索线程池
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="search-provider")
+
+_TERM_PATTERN = re.compile(r"[0-9A-Za-z_]+|[\u4e00-\u9fff]+")
+
+
+def fts_match_expression(query: str) -> str:
+    """
+    把自然语言查询转换为 FTS5 MATCH 表达式，trigram 分词要求每个词至少 3 个字符
+
+    Args:
+        query (str): 查询文本
+
+    Returns:
+        str: 各查询词以 OR 连接的表达式，无有效词时为空字符串
+    """
+    terms = []
+    for term in _TERM_PATTERN.findall(query):
+        if len(term) < 3:
+            continue
+        if term.isascii():
+            terms.append(term)
+        else:
+            # 中文按连续三字切分，任意片段命中即可召回
+            terms.extend(term[i:i + 3] for i in range(len(term) - 2))
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+
+
+class SearchProvider(ABC):
+    """搜索提供方接口，返回包含 title、url、content、score 的结果列表"""
+
+    name: str = "base"
+
+    @abstractmethod
+    def search(self, query: str, search_depth: str = "basic", **options) -> list[dict]:
+        """
+        执行搜索
+
+        Args:
+            query (str): 搜索查询
+            search_depth (str): 搜索深度，不支持的提供方可忽略
+            **options: 提供方特定的选项
+
+        Returns:
+            list[dict]: 按相关度排序的搜索结果
+        """
+
+
+class TavilySearchProvider(SearchProvider):
+    """Tavily 网络搜索，带弹性策略，失败时返回最近的缓存结果或空结果"""
+
+    name = "tavily"
+
+    def __init__(self, client):
+        self.client = client
+        self.upstream = ResilientUpstream(
+            "tavily", deadline=SEARCH_DEADLINE, hedge_percentile=HEDGE_PERCENTILE, hedge_min_delay=SEARCH_HEDGE_MIN_DELAY
+        )
+        # 最近成功的搜索结果，上游熔断或失败时作为降级结果
+        self._recent: OrderedDict = OrderedDict()
+        self._recent_lock = threading.Lock()
+
+    def search(self, query: str, search_depth: str = "basic", **options) -> list[dict]:
+        key = (normalize_query(query), search_depth, tuple(sorted(options.items())))
+
+        def fetch():
+            # 对冲请求同样消耗额度，因此按实际调用计数
+            get_metrics().incr(f"search.tavily.credits.{search_depth}", SEARCH_DEPTH_CREDITS.get(search_depth, 1))
+            results = self.client.search(query, search_depth=search_depth, **options)['results']
+            with self._recent_lock:
+                self._recent[key] = results
+                self._recent.move_to_end(key)
+                while len(self._recent) > SEARCH_FALLBACK_CACHE_SIZE:
+                    self._recent.popitem(last=False)
+            return results
+
+        def fallback():
+            with self._recent_lock:
+                return self._recent.get(key) or []
+
+        return self.upstream.call(fetch, fallback=fallback)
+
+
+class SQLiteFTSSearchProvider(SearchProvider):
+    """基于 SQLite FTS5 的本地文档索引，毫秒级返回且无外部调用成本"""
+
+    name = "local"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            # trigram 分词同时支持中英文子串匹配
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(title, url UNINDEXED, content, tokenize='trigram')"
+            )
+
+    def search(self, query: str, search_depth: str = "basic", **options) -> list[dict]:
+        expression = fts_match_expression(query)
+        if not expression:
+            return []
+        max_results = options.get("max_results", LOCAL_SEARCH_MAX_RESULTS)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, url, content, bm25(documents) AS rank FROM documents "
+                "WHERE documents MATCH ? ORDER BY rank LIMIT ?",
+                (expression, max_results),
+            ).fetchall()
+        return [{"title": title, "url": url, "content": content, "score": -rank} for title, url, content, rank in rows]
+
+    def index_documents(self, documents: list[dict]) -> int:
+        """
+        写入文档，按 url 覆盖旧内容，长文档按固定长度切块
+
+        Args:
+            documents (list[dict]): 包含 title、url、content 的文档
+
+        Returns:
+            int: 写入的块数量
+        """
+        rows = []
+        for document in documents:
+            content = document.get("content", "")
+            for start in range(0, max(len(content), 1), LOCAL_SEARCH_CHUNK_SIZE):
+                rows.append((document.get("title", ""), document["url"], content[start:start + LOCAL_SEARCH_CHUNK_SIZE]))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM documents WHERE url = ?", [(document["url"],) for document in documents]
+            )
+            self._conn.executemany("INSERT INTO documents (title, url, content) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def index_directory(self, directory: str, suffixes: tuple[str, ...] = (".md", ".txt")) -> int:
+        """
+        索引目录下的文本文件，url 使用 file:// 路径
+
+        Args:
+            directory (str): 文档目录
+            suffixes (tuple[str, ...]): 需要索引的文件后缀
+
+        Returns:
+            int: 写入的块数量
+        """
+        documents = []
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                if not file_name.endswith(suffixes):
+                    continue
+                path = os.path.abspath(os.path.join(root, file_name))
+                with open(path, encoding="utf-8", errors="ignore") as f:
+                    documents.append({"title": file_name, "url": f"file://{path}", "content": f.read()})
+        return self.index_documents(documents)
+
+
+def reciprocal_rank_fusion(result_lists: list[list[dict]], k: int = RRF_K) -> list[dict]:
+    """
+    倒数排名融合：按 url 去重，得分为各列表中 1 / (k + 排名) 之和
+
+    Args:
+        result_lists (list[list[dict]]): 各提供方按相关度排序的结果
+        k (int): 平滑常数
+
+    Returns:
+        list[dict]: 融合排序后的结果，score 为融合得分
+    """
+    fused: dict[str, dict] = {}
+    scores: dict[str, float] = {}
+    for results in result_lists:
+        for rank, item in enumerate(results, start=1):
+            url = item["url"]
+            fused.setdefault(url, item)
+            scores[url] = scores.get(url, 0.0) + 1.0 / (k + rank)
+    ordered = sorted(fused, key=lambda url: scores[url], reverse=True)
+    return [{**fused[url], "score": scores[url]} for url in ordered]
+
+
+def _timed_search(provider: SearchProvider, query: str, search_depth: str, options: dict) -> list[dict]:
+    started_at = time.time()
+    results = provider.search(query, search_depth=search_depth, **options)
+    get_metrics().observe(f"search.{provider.name}.latency", time.time() - started_at)
+    return results
+
+
+class FanOutSearchProvider(SearchProvider):
+    """并发查询多个提供方，在单提供方超时内收集结果并用倒数排名融合合并"""
+
+    name = "fanout"
+
+    def __init__(self, providers: list[SearchProvider], timeout: float = SEARCH_FANOUT_TIMEOUT):
+        self.providers = providers
+        self.timeout = timeout
+
+    def search(self, query: str, search_depth: str = "basic", **options) -> list[dict]:
+        futures = {
+            _executor.submit(_timed_search, provider, query, search_depth, options): provider
+            for provider in self.providers
+        }
+        done, not_done = wait(futures, timeout=self.timeout)
+        metrics = get_metrics()
+        for future in not_done:
+            metrics.incr(f"search.{futures[future].name}.timeouts")
+            logging.warning(f"搜索提供方 {futures[future].name} 超时: {query}")
+        result_lists = []
+        # 按提供方配置顺序融合，保证结果稳定
+        for future, provider in futures.items():
+            if future not in done:
+                continue
+            if future.exception() is not None:
+                metrics.incr(f"search.{provider.name}.errors")
+                logging.warning(f"搜索提供方 {provider.name} 失败: {future.exception()}")
+                continue
+            result_lists.append(future.result())
+        return reciprocal_rank_fusion(result_lists)
+
+
+class CascadeSearchProvider(SearchProvider):
+    """按顺序查询提供方，前一个返回足够结果时不再调用后面的（通常较慢的）提供方"""
+
+    name = "cascade"
+
+    def __init__(self, providers: list[SearchProvider], min_results: int = SEARCH_CASCADE_MIN_RESULTS):
+        self.providers = providers
+        self.min_results = min_results
+
+    def search(self, query: str, search_depth: str = "basic", **options) -> list[dict]:
+        results = []
+        metrics = get_metrics()
+        for index, provider in enumerate(self.providers):
+            results = _timed_search(provider, query, search_depth, options)
+            if len(results) >= self.min_results:
+                metrics.incr(f"search.{provider.name}.answered")
+                skipped = len(self.providers) - index - 1
+                if skipped:
+                    metrics.incr("search.cascade.skipped_calls", skipped)
+                return results
+        return results
+
+
+def create_search_provider() -> SearchProvider:
+    """根据配置创建搜索提供方"""
+    config = get_config()
+    providers = []
+    for name in config.search_providers:
+        if name == "tavily":
+            providers.append(TavilySearchProvider(config.tavily_client))
+        elif name == "local":
+            providers.append(SQLiteFTSSearchProvider(config.local_search_db))
+        else:
+            raise ValueError(f"未知的搜索提供方: {name}")
+    if len(providers) == 1:
+        return providers[0]
+    if config.search_mode == "cascade":
+        return CascadeSearchProvider(providers)
+    return FanOutSearchProvider(providers)
+
+
+# 合并不同运行之间相同的进行中搜索请求
+search_flight = SingleFlight("coalescing.searches")
+
+
+class SearchMemo:
+    """一组运行共享的搜索结果，例如同一批次的研究，相同的查询只调用一次搜索提供方"""
+
+    def __init__(self):
+        self._results: dict[Hashable, list[dict]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get_or_search(self, key: Hashable, search: Callable[[], list[dict]]) -> list[dict]:
+        """
+        获取已保存的结果，不存在时执行搜索并保存
+
+        Args:
+            key (Hashable): 搜索键
+            search (Callable): 执行搜索的函数，并发的相同搜索由 search_flight 合并
+
+        Returns:
+            list[dict]: 搜索结果
+        """
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                return self._results[key]
+        results = search()
+        with self._lock:
+            return self._results.setdefault(key, results)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
+
+
+# 当前上下文共享的搜索结果，为 None 时每次搜索都调用搜索提供方
+search_memo: ContextVar[Optional[SearchMemo]] = ContextVar("search_memo", default=None)
+
+
+@lazy
+def get_search_provider() -> SearchProvider:
+    """获取全局搜索提供方"""
+    return create_search_provider()
+
+
+def search_web(query: str, search_depth: str = "basic", **options) -> list[dict]:
+    """
+    执行搜索，相同的进行中查询共享一次调用，当前上下文设置了 search_memo 时复用其中的结果
+
+    Args:
+        query (str): 搜索查询
+        search_depth (str): 搜索深度
+        **options: 提供方特定的选项
+
+    Returns:
+        list[dict]: 搜索结果
+    """
+    key = (normalize_query(query), search_depth, tuple(sorted(options.items())))
+    memo = search_memo.get()
+    if memo is not None:
+        return memo.get_or_search(key, lambda: search_flight.do(key, _search_with_metrics, query, search_depth, options))
+    return search_flight.do(key, _search_with_metrics, query, search_depth, options)
+
+
+def _search_with_metrics(query: str, search_depth: str, options: dict) -> list[dict]:
+    started_at = time.time()
+    with get_search_scheduler().slot():
+        results = get_search_provider().search(query, search_depth=search_depth, **options)
+    metrics = get_metrics()
+    metrics.incr(f"search.depth.{search_depth}.calls")
+    metrics.observe(f"search.depth.{search_depth}.latency", time.time() - started_at)
+    return results
+
+
+if __name__ == "__main__":
+    # 建立本地索引：python -m src.routers.search_agent.providers <文档目录>
+    import sys
+
+    provider = SQLiteFTSSearchProvider(get_config().local_search_db)
+    print(f"indexed {provider.index_directory(sys.argv[1])} chunks into {provider.path}")
@@ -0,0 +1,99 @@
+"""
+预构建的模型调用和提示模板
+节点每次调用都重新构建 with_structured_output(...).with_retry(...)、PydanticOutputParser 和格式说明文本。
+这里按（模型、输出模型、标签）缓存构建好的调用，格式说明和填入格式说明的提示模板也只生成一次；
+应用启动时为所有输出模型预先构建，第一个请求不再承担构建开销。
+"""
+
+import threading
+from functools import cache
+from typing import Any, Optional
+
+from langchain.output_parsers import PydanticOutputParser
+
+from ...utils.lazy import lazy
+from ...utils.metrics import get_metrics
+from .models import AnalyzeRouter, ClarifyUser, EvaluateWebSearchResult, QueryPlan, SearchQueryList, WebSearchJudgement
+
+# 通过 with_structured_output 调用的输出模型
+STRUCTURED_SCHEMAS = (AnalyzeRouter, ClarifyUser, SearchQueryList, QueryPlan, EvaluateWebSearchResult)
+
+# 结构化输出的重试次数
+STRUCTURED_OUTPUT_ATTEMPTS = 3
+
+
+@cache
+def output_parser(schema: type) -> PydanticOutputParser:
+    """输出模型的解析器"""
+    return PydanticOutputParser(pydantic_object=schema)
+
+
+@cache
+def format_instructions(schema: type) -> str:
+    """输出模型的格式说明文本"""
+    return output_parser(schema).get_format_instructions()
+
+
+@cache
+def prompt_template(template: str, schema: type) -> str:
+    """
+    填入格式说明的提示模板，其余占位符保留，调用方再用 format 填入
+
+    Args:
+        template (str): 包含 {format_instructions} 的提示模板
+        schema (type): 输出模型
+
+    Returns:
+        str: 格式说明中的花括号已转义的提示模板
+    """
+    escaped = format_instructions(schema).replace("{", "{{").replace("}", "}}")
+    return template.replace("{format_instructions}", escaped)
+
+
+class RunnableRegistry:
+    """按（模型、输出模型、标签）缓存构建好的模型调用"""
+
+    def __init__(self):
+        # 键中的模型以 id 表示，值中保留模型本身，用于确认 id 没有被新对象复用
+        self._runnables: dict[tuple, tuple[Any, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, llm, schema: Optional[type] = None, tags: Optional[list[str]] = None):
+        """
+        获取模型调用，第一次获取时构建
+
+        Args:
+            llm (BaseChatModel): 语言模型
+            schema (type, optional): 结构化输出模型，为空时直接调用模型
+            tags (list[str], optional): 调用的标签
+
+        Returns:
+            Runnable: 模型调用
+        """
+        key = (id(llm), schema, tuple(tags or ()))
+        entry = self._runnables.get(key)
+        if entry is None or entry[0] is not llm:
+            runnable = llm
+            if schema is not None:
+                runnable = llm.with_structured_output(schema).with_retry(stop_after_attempt=STRUCTURED_OUTPUT_ATTEMPTS)
+            if tags:
+                runnable = runnable.with_config(tags=tags)
+            entry = (llm, runnable)
+            with self._lock:
+                self._runnables[key] = entry
+            get_metrics().incr("runnables.built")
+        return entry[1]
+
+    def prebuild(self, llms: list):
+        """为每个模型构建所有结构化输出调用，并生成格式说明，在应用启动时调用"""
+        for llm in llms:
+            for schema in STRUCTURED_SCHEMAS:
+                self.get(llm, schema)
+        for schema in (*STRUCTURED_SCHEMAS, WebSearchJudgement):
+            format_instructions(schema)
+
+
+@lazy
+def get_runnable_registry() -> RunnableRegistry:
+    """获取全局模型调用缓存"""
+    return RunnableRegistry()
@@ -0,0 +1,42 @@
+"""
+单次运行范围的对象注册表
+段落索引、证据渲染器等只在一次运行内有效的对象按运行ID保存，回答生成后释放。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RunRegistry(Generic[T]):
+    """按运行ID保存对象，超过容量时淘汰最久未使用的对象"""
+
+    def __init__(self, factory: Callable[[], T], max_runs: int):
+        """
+        Args:
+            factory (Callable[[], T]): 运行首次访问时创建对象的工厂函数
+            max_runs (int): 同时保留的最大运行数
+        """
+        self.factory = factory
+        self.max_runs = max_runs
+        self._items: OrderedDict[str, T] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, run_id: str) -> T:
+        """获取运行的对象，不存在时创建"""
+        with self._lock:
+            item = self._items.get(run_id)
+            if item is None:
+                item = self.factory()
+                self._items[run_id] = item
+            self._items.move_to_end(run_id)
+            while len(self._items) > self.max_runs:
+                self._items.popitem(last=False)
+            return item
+
+    def release(self, run_id: Optional[str]):
+        """释放运行的对象"""
+        with self._lock:
+            self._items.pop(run_id, None)
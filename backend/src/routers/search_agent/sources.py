@@ -0,0 +1,150 @@
+"""
+来源内容的内存控制
+搜索得到的来源在进入状态前截断内容（不驻留字符串：Python 3.12 起驻留的字符串常驻进程，每个不同的网页内容都会一直占用内存）；
+每次运行的来源内容有字节预算，超出时优先压缩重复来源和得分最低的来源，
+事件只携带前端展示所需的内容预览。
+"""
+
+import re
+import sys
+from typing import Optional
+
+from .constants import SOURCE_CONTENT_MAX_CHARS, SOURCE_EVICTED_CHARS, SOURCE_PREVIEW_CHARS, RUN_SOURCE_BUDGET_BYTES
+
+# 回答中的来源引用，例如 [[3]](https://...) 或 [3]
+CITATION_PATTERN = re.compile(r"\[(\d+)\]")
+
+
+def make_source(title: str, url: str, content: str, score: Optional[float] = None) -> dict:
+    """
+    创建状态中保存的来源
+
+    Args:
+        title (str): 标题
+        url (str): 链接
+        content (str): 内容，超过 SOURCE_CONTENT_MAX_CHARS 的部分被截断
+        score (float, optional): 搜索提供方给出的相关度，用于超出预算时决定压缩顺序
+
+    Returns:
+        dict: 包含 title、url、content 的来源，有得分时包含 score
+    """
+    source = {
+        "title": title or "",
+        "url": url or "",
+        "content": (content or "")[:SOURCE_CONTENT_MAX_CHARS],
+    }
+    if score is not None:
+        source["score"] = score
+    return source
+
+
+def source_previews(sources: list[dict]) -> list[dict]:
+    """
+    生成事件中发送的来源预览
+
+    Args:
+        sources (list[dict]): 来源
+
+    Returns:
+        list[dict]: 内容截断为 SOURCE_PREVIEW_CHARS 个字符的来源
+    """
+    return [
+        {"title": source.get("title", ""), "url": source.get("url", ""), "content": source.get("content", "")[:SOURCE_PREVIEW_CHARS]}
+        for source in sources
+    ]
+
+
+def sources_size(sources: list[dict]) -> int:
+    """估算来源内容占用的字节数"""
+    return sum(sys.getsizeof(source.get("content", "")) for source in sources)
+
+
+def merge_sources(existing: list[dict], new: list[dict]) -> list[dict]:
+    """
+    合并搜索结果的状态归约函数，只追加以保持来源编号稳定，超出 RUN_SOURCE_BUDGET_BYTES 时压缩排名最低的来源内容
+
+    Args:
+        existing (list[dict]): 已有的来源
+        new (list[dict]): 新增的来源
+
+    Returns:
+        list[dict]: 合并后的来源
+    """
+    return shrink_sources(list(existing) + list(new), RUN_SOURCE_BUDGET_BYTES)
+
+
+def shrink_sources(sources: list[dict], budget: int) -> list[dict]:
+    """
+    按排名从低到高压缩来源内容，直到不超过字节预算
+
+    排名从低到高为：重复出现的 URL、没有得分或得分较低的来源、较晚加入的来源。
+
+    Args:
+        sources (list[dict]): 来源
+        budget (int): 来源内容的字节预算
+
+    Returns:
+        list[dict]: 压缩后的来源，数量和顺序不变
+    """
+    size = sources_size(sources)
+    if size <= budget:
+        return sources
+    merged = list(sources)
+    seen: set[str] = set()
+    ranked = []
+    for index, source in enumerate(merged):
+        duplicate = source.get("url") in seen
+        seen.add(source.get("url"))
+        ranked.append((not duplicate, source.get("score") or 0.0, -index))
+    for index in sorted(range(len(merged)), key=ranked.__getitem__):
+        if size <= budget:
+            break
+        source = merged[index]
+        content = source.get("content", "")
+        # 重复来源的内容已经保存在首次出现的位置
+        limit = 0 if not ranked[index][0] else SOURCE_EVICTED_CHARS
+        if len(content) <= limit:
+            continue
+        shortened = content[:limit]
+        size -= sys.getsizeof(content) - sys.getsizeof(shortened)
+        merged[index] = {**source, "content": shortened}
+    return merged
+
+
+def numbered_sources(sources: list[dict], source_ids: Optional[list[dict]] = None) -> list[dict]:
+    """
+    按 URL 去重并编号来源，编号与证据渲染时提示中的来源编号一致
+
+    Args:
+        sources (list[dict]): 本次运行的全部搜索结果
+        source_ids (list[dict], optional): 状态中证据渲染器分配的编号（id、title、url），
+            没有分配编号的来源（例如缺少该字段的旧缓存）按首次出现的顺序接着编号
+
+    Returns:
+        list[dict]: 包含 id 的来源，按编号排列
+    """
+    first: dict[str, dict] = {}
+    for source in sources:
+        first.setdefault(source.get("url", ""), source)
+    numbered: dict[str, dict] = {}
+    for assigned in source_ids or []:
+        url = assigned.get("url", "")
+        if url not in numbered:
+            numbered[url] = {"id": assigned["id"], **first.get(url, {"title": assigned.get("title", ""), "url": url})}
+    for url, source in first.items():
+        if url not in numbered:
+            numbered[url] = {"id": len(numbered) + 1, **source}
+    return sorted(numbered.values(), key=lambda source: source["id"])
+
+
+def cited_ids(text: str) -> list[int]:
+    """
+    获取回答中引用的来源编号
+
+    Args:
+        text (str): 回答
+
+    Returns:
+        list[int]: 按首次引用顺序排列的来源编号
+    """
+    return list(dict.fromkeys(int(match) for match in CITATION_PATTERN.findall(text or "")))
@@ -0,0 +1,223 @@
+"""
+推测式回答草稿
+在最后一轮反思评估的同时，基于当前证据提前生成最终回答；
+反思确认结束搜索后，assistant 节点直接流式输出草稿，否则丢弃草稿。
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from ...utils.metrics import get_metrics
+from ...utils.scheduler import current_workload, get_llm_scheduler
+from ...utils.text import term_coverage
+from .constants import (
+    SPECULATIVE_MIN_SOURCES,
+    SPECULATIVE_MIN_TERM_COVERAGE,
+    SPECULATIVE_DRAFT_MAX_AGE,
+)
+
+_DONE = object()
+
+# 草稿生成线程池，与图执行线程分离，避免继承图的回调上下文
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="answer-draft")
+
+_drafts: dict[str, "AnswerDraft"] = {}
+_drafts_lock = threading.Lock()
+
+
+def evidence_looks_sufficient(query: str, results: list[dict]) -> bool:
+    """
+    本地证据充分性启发式判断
+
+    Args:
+        query (str): 研究主题
+        results (list[dict]): 已收集的搜索结果
+
+    Returns:
+        bool: 来源数量和查询词覆盖率均达到阈值时返回 True
+    """
+    if len({item.get("url") for item in results}) < SPECULATIVE_MIN_SOURCES:
+        return False
+    return term_coverage(query, results) >= SPECULATIVE_MIN_TERM_COVERAGE
+
+
+class AnswerDraft:
+    """后台生成中的回答草稿，生成的片段缓存在队列中等待回放"""
+
+    def __init__(self, llm, messages: list[dict], upstream=None, fallback_llm=None):
+        """
+        Args:
+            llm: 语言模型实例
+            messages (list[dict]): 回答提示消息
+            upstream (ResilientUpstream, optional): 与 assistant 节点相同的上游弹性层，为空时直接调用模型
+            fallback_llm (optional): 备用模型，主模型在输出首个片段前失败时改用备用模型
+        """
+        self.started_at = time.time()
+        self.first_token_at: Optional[float] = None
+        self._queue: queue.Queue = queue.Queue()
+        self._cancelled = threading.Event()
+        # 草稿线程不继承图的上下文，按发起请求的工作负载类别调度
+        self._future = _executor.submit(self._run, llm, messages, upstream, fallback_llm, current_workload.get())
+
+    def _run(self, llm, messages: list[dict], upstream, fallback_llm, workload: str):
+        try:
+            with get_llm_scheduler().slot(workload):
+                if upstream is None:
+                    self._generate(llm, messages)
+                    return
+                fallback = None
+                if fallback_llm is not None:
+                    fallback = lambda: self._generate(fallback_llm, messages, partial_ok=False)
+                # 草稿以流式生成，与 assistant 节点一致，不发起对冲请求，也不设置整体截止时间
+                upstream.call(self._generate, llm, messages, fallback=fallback, hedge=False, deadline=None)
+        except Exception as e:
+            self._queue.put(e)
+        finally:
+            self._queue.put(_DONE)
+
+    def _generate(self, llm, messages: list[dict], partial_ok: bool = True):
+        if not partial_ok and self.first_token_at is not None:
+            # 主模型已输出部分片段，切换备用模型会重复输出
+            raise RuntimeError("answer draft failed after partial output")
+        for chunk in llm.stream(messages):
+            if self._cancelled.is_set():
+                break
+            if self.first_token_at is None:
+                self.first_token_at = time.time()
+            self._queue.put(chunk)
+
+    def chunks(self) -> Iterator[AIMessageChunk]:
+        """依次取出草稿片段，已生成的片段立即返回，其余等待生成"""
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def cancel(self):
+        """取消草稿生成"""
+        self._cancelled.set()
+
+
+def start_draft(llm, messages: list[dict], upstream=None, fallback_llm=None) -> str:
+    """
+    启动回答草稿生成
+
+    Args:
+        llm: 语言模型实例
+        messages (list[dict]): 与 assistant 节点一致的回答提示消息
+        upstream (ResilientUpstream, optional): 上游弹性层
+        fallback_llm (optional): 备用模型
+
+    Returns:
+        str: 草稿ID
+    """
+    _purge_expired()
+    draft_id = str(uuid.uuid4())
+    with _drafts_lock:
+        _drafts[draft_id] = AnswerDraft(llm, messages, upstream, fallback_llm)
+    get_metrics().incr("speculative_answer.started")
+    return draft_id
+
+
+def take_draft(draft_id: Optional[str]) -> Optional[AnswerDraft]:
+    """取出草稿用于回放，草稿不存在时返回 None"""
+    if not draft_id:
+        return None
+    with _drafts_lock:
+        return _drafts.pop(draft_id, None)
+
+
+def discard_draft(draft_id: Optional[str]):
+    """丢弃草稿"""
+    draft = take_draft(draft_id)
+    if draft is None:
+        return
+    draft.cancel()
+    metrics = get_metrics()
+    metrics.incr("speculative_answer.discarded")
+    _update_hit_rate()
+
+
+def _purge_expired():
+    """清理超时未被取用的草稿（例如客户端中途断开）"""
+    now = time.time()
+    with _drafts_lock:
+        expired = [key for key, draft in _drafts.items() if now - draft.started_at > SPECULATIVE_DRAFT_MAX_AGE]
+        for key in expired:
+            _drafts.pop(key).cancel()
+    if expired:
+        # 过期的草稿没有被回放，计为未命中
+        get_metrics().incr("speculative_answer.expired", len(expired))
+        _update_hit_rate()
+
+
+def _update_hit_rate():
+    metrics = get_metrics()
+    hits = metrics.counter("speculative_answer.hit")
+    started = hits + sum(
+        metrics.counter(f"speculative_answer.{outcome}") for outcome in ("discarded", "expired", "failed")
+    )
+    if started:
+        metrics.set_gauge("speculative_answer.hit_rate", hits / started)
+
+
+class DraftReplayModel(BaseChatModel):
+    """
+    草稿回放模型
+    在 assistant 节点内调用，使草稿片段以正常的 messages 事件流式输出
+    """
+
+    draft: Any
+    assistant_started_at: float
+
+    @property
+    def _llm_type(self) -> str:
+        return "answer-draft-replay"
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        first = True
+        chunks = self.draft.chunks()
+        try:
+            chunk = next(chunks, None)
+        except Exception:
+            # 输出首个片段前失败，计为未命中，由 assistant 节点改为正常生成
+            get_metrics().incr("speculative_answer.failed")
+            _update_hit_rate()
+            raise
+        for chunk in chain([chunk] if chunk is not None else [], chunks):
+            if first:
+                first = False
+                self._record_hit()
+            generation = ChatGenerationChunk(message=AIMessageChunk(content=chunk.content))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content = "".join(generation.message.content for generation in self._stream(messages, stop, run_manager))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _record_hit(self):
+        """记录命中，并估算首个回答片段提前的时间"""
+        draft = self.draft
+        now = time.time()
+        ttft = (draft.first_token_at or now) - draft.started_at
+        time_saved = max(0.0, self.assistant_started_at + ttft - now)
+        metrics = get_metrics()
+        metrics.incr("speculative_answer.hit")
+        metrics.observe("speculative_answer.time_saved_seconds", time_saved)
+        _update_hit_rate()
+        logging.info(f"推测式回答命中，首个回答片段提前 {time_saved:.2f}s")
@@ -3,23 +3,36 @@
 包含工作流的创建、编译和配置
 """
 
-from langgraph.graph import StateGraph, START, END
+from typing import Optional
 
-from .models import OverallState
-from .nodes import (
-    agent_router,
-    clarify_with_user,
-    analyze_need_web_search,
-    generate_search_query,
-    need_web_search,
-    web_search,
-    evaluate_search_results,
-    assistant_node,
-)
+from ...utils.lazy import lazy
 
 
-def create_workflow():
-    """创建并编译工作流"""
+def create_workflow(checkpointer=None, interrupt_before: Optional[list[str]] = None):
+    """
+    创建并编译工作流
+    
+    Args:
+        checkpointer (optional): 状态检查点存储，需要中断后恢复运行时传入
+        interrupt_before (list[str], optional): 在这些节点执行前中断
+    """
+    # 节点模块依赖 LangChain、LangGraph 等重量级库，在编译时才导入
+    from langgraph.graph import StateGraph, START, END
+    
+    from .models import OverallState
+    from .nodes import (
+        agent_router,
+        clarify_with_user,
+        analyze_need_web_search,
+        generate_search_query,
+        need_web_search,
+        knowledge_lookup,
+        dispatch_web_search,
+        web_search,
+        execute_query_plan,
+        evaluate_search_results,
+        assistant_node,
+    )
     
     # 创建图形
     workflow = StateGraph(OverallState)
@@ -30,7 +43,9 @@ def create_workflow():
     workflow.add_node("analyze_need_web_search", analyze_need_web_search)
     workflow.add_node("generate_search_query", generate_search_query)
 
+    workflow.add_node("knowledge_lookup", knowledge_lookup)
     workflow.add_node("web_search", web_search)
+    workflow.add_node("execute_query_plan", execute_query_plan)
     workflow.add_node("evaluate_search_results", evaluate_search_results)
     workflow.add_node("assistant", assistant_node)
     
@@ -43,17 +58,29 @@ def create_workflow():
         lambda state: state['isNeedWebSearch'], 
         {True: "generate_search_query", False: "assistant"}
     )
-    workflow.add_conditional_edges("generate_search_query", need_web_search,"web_search")
+    workflow.add_conditional_edges("generate_search_query", need_web_search, ["knowledge_lookup", "assistant"])
+    workflow.add_conditional_edges(
+        "knowledge_lookup",
+        dispatch_web_search,
+        ["web_search", "execute_query_plan", "evaluate_search_results"]
+    )
 
     workflow.add_edge("web_search", "evaluate_search_results")
+    workflow.add_edge("execute_query_plan", "evaluate_search_results")
     workflow.add_conditional_edges(
         "evaluate_search_results", 
         need_web_search, 
-        ["web_search","assistant"]
+        ["knowledge_lookup","assistant"]
     )
     workflow.add_edge("assistant", END)
     
     # 编译图形
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer, interrupt_before=interrupt_before)
     
-    return app
\ No newline at end of file
+    return app
+
+
+@lazy
+def get_search_graph():
+    """获取编译后的搜索工作流"""
+    return create_workflow()
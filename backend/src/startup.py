@@ -0,0 +1,165 @@
+"""
+应用启动模块
+
+该模块负责应用启动时的初始化：模块导入时不创建任何客户端，
+每个工作进程在 lifespan 中统一初始化配置、模型和搜索客户端，编译工作流、预先构建模型调用，
+并用本地预热模型把两个工作流各运行一次，第一个请求无需等待。
+包含日期的系统提示由后台任务在每天零点刷新。
+多进程部署（gunicorn --preload）时，主进程可以预先导入重量级依赖，
+fork 出的工作进程共享已导入的模块，并在各自进程内重新创建客户端。
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .utils.metrics import get_metrics
+from .utils.warmup import WARM_UP_REPLY, create_warm_up_model, warm_up_model
+
+# 环境变量名称：为 true 时在导入应用时预加载重量级模块
+PRELOAD_MODULES = "PRELOAD_MODULES"
+
+# 环境变量名称：为 false 时跳过启动时的工作流预热
+GRAPH_WARMUP = "GRAPH_WARMUP"
+
+# 预热时结构化输出的固定结果：不需要深度研究时直接回答，需要时在澄清后结束，都不会发起搜索
+WARM_UP_OUTPUTS = {
+    "AnalyzeRouter": {"reason": "warm-up", "confidence": 1.0, "need_deep_research": False},
+    "ClarifyUser": {"need_clarification": True, "question": WARM_UP_REPLY, "verification": ""},
+}
+
+# 预加载的模块：只导入，不创建客户端、连接或线程
+HEAVY_MODULES = (
+    "langchain_core.messages",
+    "langchain_openai",
+    "langgraph.graph",
+    "tavily",
+    "numpy",
+    "src.routers.search_agent.nodes",
+    "src.routers.chat_agent.workflow",
+)
+
+
+def preload_modules():
+    """预先导入重量级模块，供多进程部署的主进程在 fork 前调用"""
+    started_at = time.perf_counter()
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    logging.info(f"预加载模块完成，耗时 {time.perf_counter() - started_at:.2f}s")
+
+
+def should_preload() -> bool:
+    """是否在导入应用时预加载模块"""
+    return os.getenv(PRELOAD_MODULES, "false").lower() == "true"
+
+
+def initialize():
+    """初始化客户端并编译工作流，在每个工作进程的 lifespan 启动阶段调用"""
+    from .routers.chat_agent.session import get_session_manager
+    from .routers.chat_agent.workflow import get_chat_graph, get_chat_llm
+    from .routers.search_agent.config import get_config
+    from .routers.search_agent.fast_router import get_fast_router
+    from .routers.search_agent.knowledge import get_knowledge_store
+    from .routers.search_agent.providers import get_search_provider
+    from .routers.search_agent.runnables import get_runnable_registry
+    from .routers.search_agent.workflow import get_search_graph
+
+    started_at = time.perf_counter()
+    llm, backup_llm, _ = get_config().init_clients()
+    get_search_provider()
+    get_knowledge_store()
+    get_fast_router()
+    get_search_graph()
+    get_runnable_registry().prebuild([model for model in (llm, backup_llm) if model is not None])
+    get_chat_llm()
+    get_chat_graph()
+    get_session_manager()
+    elapsed = time.perf_counter() - started_at
+    get_metrics().set_gauge("startup.initialize_seconds", elapsed)
+    logging.info(f"应用初始化完成，进程 {os.getpid()}，耗时 {elapsed:.2f}s")
+
+
+def should_warm_up() -> bool:
+    """是否在启动时预热工作流"""
+    return os.getenv(GRAPH_WARMUP, "true").lower() == "true"
+
+
+async def warm_up():
+    """用本地预热模型把搜索和对话工作流各运行一次，在 initialize 之后、接收请求之前调用，失败时只记录日志"""
+    from .routers.chat_agent.workflow import get_chat_graph
+    from .routers.search_agent.nodes import release_run
+    from .routers.search_agent.workflow import get_search_graph
+
+    started_at = time.perf_counter()
+    run_id = str(uuid.uuid4())
+    token = warm_up_model.set(create_warm_up_model(WARM_UP_OUTPUTS))
+    try:
+        # 与 API 相同的流式模式，同时初始化 token 流和自定义事件的回调
+        async for _ in get_search_graph().astream(
+            {"query": WARM_UP_REPLY, "messages": [], "max_search_loop": 1, "search_loop": 0, "run_id": run_id},
+            stream_mode=["messages", "custom"],
+        ):
+            pass
+        async for _ in get_chat_graph().astream(
+            {"messages": [{"role": "user", "content": WARM_UP_REPLY}]}, stream_mode=["messages", "updates", "custom"]
+        ):
+            pass
+    except Exception as e:
+        logging.warning(f"工作流预热失败: {str(e)}", exc_info=True)
+        return
+    finally:
+        warm_up_model.reset(token)
+        release_run(run_id)
+    elapsed = time.perf_counter() - started_at
+    get_metrics().set_gauge("startup.warm_up_seconds", elapsed)
+    logging.info(f"工作流预热完成，耗时 {elapsed:.2f}s")
+
+
+def seconds_until_tomorrow(now: Optional[datetime] = None) -> float:
+    """距离下一个本地零点的秒数"""
+    now = now or datetime.now()
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+async def refresh_prompts_daily():
+    """每天零点刷新包含日期的系统提示，节点调用时不再检查日期"""
+    from .routers.search_agent.config import get_config
+
+    while True:
+        # 多等待一秒，确保醒来时日期已经变化
+        await asyncio.sleep(seconds_until_tomorrow() + 1)
+        get_config().update_system_prompts()
+        get_metrics().incr("startup.prompt_refreshes")
+        logging.info("系统提示日期已刷新")
+
+
+# 系统提示刷新任务
+_prompt_refresh_task: Optional[asyncio.Task] = None
+
+
+async def start_workers():
+    """启动后台任务工作协程和系统提示刷新任务，在 lifespan 启动阶段调用"""
+    from .routers.search_agent.jobs import get_job_manager
+
+    global _prompt_refresh_task
+    await get_job_manager().start()
+    _prompt_refresh_task = asyncio.create_task(refresh_prompts_daily())
+
+
+async def stop_workers():
+    """停止后台任务工作协程和系统提示刷新任务，在 lifespan 结束阶段调用"""
+    from .routers.search_agent.jobs import get_job_manager
+
+    global _prompt_refresh_task
+    if _prompt_refresh_task is not None:
+        _prompt_refresh_task.cancel()
+        await asyncio.gather(_prompt_refresh_task, return_exceptions=True)
+        _prompt_refresh_task = None
+    if get_job_manager.initialized:
+        await get_job_manager().stop()
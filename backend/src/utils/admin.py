@@ -0,0 +1,44 @@
+"""
+管理员鉴权模块
+
+运行时状态、采样分析等诊断功能只对管理员开放：请求需要在 X-Admin-Token 头部携带与环境变量
+ADMIN_TOKEN 相同的令牌，未配置 ADMIN_TOKEN 时这些功能全部关闭。
+"""
+
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+# 环境变量名称：管理员令牌
+ADMIN_TOKEN = "ADMIN_TOKEN"
+
+ERROR_ADMIN_REQUIRED = "Admin token required"
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """
+    判断令牌是否为管理员令牌
+
+    Args:
+        token (str, optional): 请求携带的令牌
+
+    Returns:
+        bool: 已配置 ADMIN_TOKEN 且令牌一致时返回 True
+    """
+    expected = os.getenv(ADMIN_TOKEN)
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    FastAPI 依赖：非管理员请求返回 403
+
+    Raises:
+        HTTPException: 令牌缺失或不一致时抛出403错误
+    """
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail=ERROR_ADMIN_REQUIRED)
@@ -0,0 +1,191 @@
+"""
+流式响应压缩模块
+
+SSE 和 JSONL 流式响应默认不压缩，长回答和携带来源的 custom 事件是移动端用户的主要流量。
+该模块提供 ASGI 中间件，按客户端的 Accept-Encoding 协商 brotli（安装了 brotli 包时）或 gzip，
+每个事件压缩后立即刷新，客户端收到的每个数据块都能独立解压，事件延迟不变。
+客户端不接受压缩、响应已经编码，或整个响应只有一个小于阈值的数据块时不压缩。
+"""
+
+import os
+import time
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import get_metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 环境变量名称：为 true 时开启流式响应压缩
+STREAM_COMPRESSION = "STREAM_COMPRESSION"
+
+# 压缩的流式响应类型
+STREAM_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+# 只有一个数据块的响应小于该字节数时不压缩
+STREAM_COMPRESSION_MIN_BYTES = 512
+
+# 流式压缩每个事件都要刷新，使用偏向速度的压缩级别
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def supported_encodings() -> list[str]:
+    """按服务端偏好排列的可用编码"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择压缩编码
+
+    Args:
+        accept_encoding (str, optional): 请求的 Accept-Encoding 头部
+
+    Returns:
+        Optional[str]: br 或 gzip，客户端不接受任何可用编码时返回 None
+    """
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0.0)), -index, encoding)
+        for index, encoding in enumerate(supported_encodings())
+    ]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+class StreamCompressor:
+    """逐块压缩并刷新的压缩器"""
+
+    def __init__(self, encoding: str):
+        """
+        Args:
+            encoding (str): br 或 gzip
+        """
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        """压缩一个数据块并刷新，返回的数据可以立即解压出完整的数据块"""
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """压缩最后一个数据块并结束压缩流"""
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class _CompressedResponder:
+    """单个响应的压缩发送器，在第一个数据块到达后才决定是否压缩"""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self._start: Optional[Message] = None
+        self._compressor: Optional[StreamCompressor] = None
+        self._passthrough = False
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._cpu = 0.0
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        media_type = headers.get("content-type", "").split(";")[0].strip()
+        if media_type not in STREAM_MEDIA_TYPES:
+            return False
+        if headers.get("content-encoding", "none").lower() not in ("none", "identity"):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if self._passthrough or message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._start is not None:
+            start, self._start = self._start, None
+            headers = MutableHeaders(raw=start["headers"])
+            if not self._should_compress(headers, body, more_body):
+                self._passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["content-length"]
+            self._compressor = StreamCompressor(self.encoding)
+            await self._send(start)
+
+        started_at = time.process_time()
+        data = self._compressor.compress(body) if more_body else self._compressor.finish(body)
+        self._cpu += time.process_time() - started_at
+        self._bytes_in += len(body)
+        self._bytes_out += len(data)
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+        if not more_body:
+            self._record()
+
+    def _record(self):
+        metrics = get_metrics()
+        metrics.incr(f"stream_compression.{self.encoding}.streams")
+        metrics.incr(f"stream_compression.{self.encoding}.bytes_in", self._bytes_in)
+        metrics.incr(f"stream_compression.{self.encoding}.bytes_out", self._bytes_out)
+        metrics.observe(f"stream_compression.{self.encoding}.cpu_seconds", self._cpu)
+
+
+class StreamCompressionMiddleware:
+    """流式响应压缩中间件，其他响应原样发送"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = STREAM_COMPRESSION_MIN_BYTES):
+        """
+        Args:
+            app (ASGIApp): 应用
+            minimum_size (int): 只有一个数据块的响应小于该字节数时不压缩
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressedResponder(send, encoding, self.minimum_size).send)
+
+
+def stream_compression_enabled() -> bool:
+    """是否开启流式响应压缩"""
+    return os.getenv(STREAM_COMPRESSION, "false").lower() == "true"
@@ -0,0 +1,78 @@
+"""
+延迟初始化工具模块
+
+该模块提供线程安全的延迟单例：对象在第一次访问时才创建，而不是在模块导入时创建，
+从而把重量级依赖的导入和客户端初始化推迟到应用启动（lifespan）或第一次使用时。
+多进程部署时主进程预加载模块后 fork 出工作进程，子进程会丢弃从主进程继承的实例并重新创建，
+避免共享连接池、SQLite 连接和后台线程。
+"""
+
+import os
+import threading
+import weakref
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+# 所有延迟单例，用于 fork 后重置
+_instances: "weakref.WeakSet[LazySingleton]" = weakref.WeakSet()
+
+
+class LazySingleton(Generic[T]):
+    """线程安全的延迟单例，调用时返回实例，首次调用时通过工厂函数创建"""
+
+    def __init__(self, factory: Callable[[], T]):
+        """
+        Args:
+            factory (Callable[[], T]): 创建实例的工厂函数
+        """
+        self.factory = factory
+        self.__doc__ = factory.__doc__
+        self.__name__ = getattr(factory, "__name__", "lazy")
+        self._value: T = None
+        self._initialized = False
+        self._lock = threading.Lock()
+        _instances.add(self)
+
+    def __call__(self) -> T:
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self._value = self.factory()
+                    self._initialized = True
+        return self._value
+
+    @property
+    def initialized(self) -> bool:
+        """实例是否已创建"""
+        return self._initialized
+
+    def reset(self):
+        """丢弃已创建的实例，下次调用时重新创建"""
+        self._lock = threading.Lock()
+        self._value = None
+        self._initialized = False
+
+
+def lazy(factory: Callable[[], T]) -> LazySingleton[T]:
+    """
+    把无参工厂函数包装为延迟单例访问函数
+
+    Args:
+        factory (Callable[[], T]): 创建实例的工厂函数
+
+    Returns:
+        LazySingleton[T]: 调用时返回单例实例
+    """
+    return LazySingleton(factory)
+
+
+def reset_all():
+    """重置所有延迟单例"""
+    for instance in list(_instances):
+        instance.reset()
+
+
+# fork 出的子进程不复用主进程中创建的实例
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_all)
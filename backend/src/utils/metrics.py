@@ -0,0 +1,129 @@
+"""
+运行指标模块
+
+该模块提供进程内的轻量指标记录，包括计数器、瞬时值和耗时统计，
+各功能模块通过 get_metrics() 获取全局实例记录指标，由 /metrics 接口统一输出。
+"""
+
+import threading
+from collections import defaultdict, deque
+
+# 每个耗时指标保留的最近样本数量，用于计算分位数
+TIMING_WINDOW_SIZE = 1024
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    """计算已排序样本的分位数"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(q * (len(samples) - 1)))))
+    return samples[index]
+
+
+class Metrics:
+    """线程安全的进程内指标记录器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._timings: dict[str, deque] = defaultdict(lambda: deque(maxlen=TIMING_WINDOW_SIZE))
+        self._timing_totals: dict[str, list] = defaultdict(lambda: [0, 0.0])
+
+    def incr(self, name: str, value: float = 1):
+        """
+        累加计数器
+
+        Args:
+            name (str): 指标名称
+            value (float): 累加值
+        """
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        """
+        设置瞬时值
+
+        Args:
+            name (str): 指标名称
+            value (float): 当前值
+        """
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """
+        记录一次耗时或大小样本
+
+        Args:
+            name (str): 指标名称
+            value (float): 样本值
+        """
+        with self._lock:
+            self._timings[name].append(value)
+            totals = self._timing_totals[name]
+            totals[0] += 1
+            totals[1] += value
+
+    def counter(self, name: str) -> float:
+        """获取计数器当前值"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def timing_count(self, name: str) -> int:
+        """获取耗时指标的累计样本数"""
+        with self._lock:
+            totals = self._timing_totals.get(name)
+            return totals[0] if totals else 0
+
+    def percentile(self, name: str, q: float) -> float:
+        """
+        获取最近样本的分位数
+
+        Args:
+            name (str): 指标名称
+            q (float): 分位，取值 0~1
+
+        Returns:
+            float: 分位数，无样本时返回 0
+        """
+        with self._lock:
+            samples = sorted(self._timings.get(name, ()))
+        return _percentile(samples, q)
+
+    def snapshot(self) -> dict:
+        """
+        导出全部指标
+
+        Returns:
+            dict: 包含 counters、gauges、timings 的字典
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            timings = {name: sorted(samples) for name, samples in self._timings.items()}
+            totals = {name: tuple(value) for name, value in self._timing_totals.items()}
+        return {
+            "counters": counters,
+            "gauges": gauges,
+            "timings": {
+                name: {
+                    "count": totals[name][0],
+                    "avg": totals[name][1] / totals[name][0] if totals[name][0] else 0.0,
+                    "p50": _percentile(samples, 0.5),
+                    "p95": _percentile(samples, 0.95),
+                    "max": samples[-1] if samples else 0.0,
+                }
+                for name, samples in timings.items()
+            },
+        }
+
+
+# 全局指标实例
+metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """获取全局指标实例"""
+    return metrics
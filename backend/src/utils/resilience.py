@@ -0,0 +1,336 @@
+"""
+上游调用弹性模块
+
+该模块为语言模型、搜索等同步上游调用提供统一的弹性策略：
+- 单次调用截止时间（deadline）
+- 对冲请求：调用耗时超过历史延迟分位数时并发发起一次重复请求，取先返回的结果
+- 熔断器：连续的传输层失败（超时、连接错误、5xx 和 429）达到阈值后直接跳过上游并走降级逻辑，冷却后放行探测请求
+对冲次数、熔断次数和延迟分布均记录在全局指标中。
+
+调用返回后（取得结果、超过截止时间或失败）仍在运行的请求被放弃：未开始的请求直接取消，
+已开始的请求无法中断，其回调被屏蔽，不会再向工作流的流式输出写入内容。
+"""
+
+import contextvars
+import copy
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import cache
+from typing import Any, Callable, Optional
+
+from .metrics import get_metrics
+
+# 上游调用线程池
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="upstream")
+
+# 计算对冲延迟所需的最少样本数
+MIN_HEDGE_SAMPLES = 20
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，上游调用被跳过"""
+
+
+class UpstreamDeadlineError(TimeoutError):
+    """上游调用超过截止时间"""
+
+
+def is_transport_failure(error: BaseException) -> bool:
+    """
+    判断是否为传输层失败，只有这类失败计入熔断器
+
+    输出解析失败、参数校验失败等说明上游可达且有响应，不应让熔断器打开
+
+    Args:
+        error (BaseException): 上游调用抛出的异常
+
+    Returns:
+        bool: 超时、连接错误、5xx 和 429 返回 True
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    # 在此导入，避免应用启动时加载 openai
+    import openai
+
+    # requests 的连接和超时异常是 OSError 的子类，openai 把 httpx 的传输异常包装为 APIConnectionError
+    return isinstance(error, (TimeoutError, OSError, openai.APIConnectionError))
+
+
+@cache
+def _gated_handler_class(handler_class: type) -> type:
+    """回调处理器的子类，所属调用被放弃后不再转发任何回调"""
+
+    def gate(name: str):
+        def method(self, *args, **kwargs):
+            if self._abandoned.is_set():
+                return None
+            return getattr(super(gated_class, self), name)(*args, **kwargs)
+        method.__name__ = name
+        return method
+
+    def tap_output_iter(self, run_id, output):
+        if self._abandoned.is_set():
+            return output
+        return super(gated_class, self).tap_output_iter(run_id, output)
+
+    namespace = {name: gate(name) for name in dir(handler_class) if name.startswith("on_")}
+    if hasattr(handler_class, "tap_output_iter"):
+        namespace["tap_output_iter"] = tap_output_iter
+    gated_class = type(f"Gated{handler_class.__name__}", (handler_class,), namespace)
+    return gated_class
+
+
+def _gate_callbacks(abandoned: threading.Event):
+    """
+    在当前上下文中把 LangChain 回调替换为受控副本，调用被放弃后回调不再到达流式输出
+
+    副本与原处理器共享状态，且仍是原类型的实例，模型按处理器类型判断是否流式输出的逻辑不受影响
+    """
+    from langchain_core.callbacks.base import BaseCallbackManager
+    from langchain_core.runnables.config import var_child_runnable_config
+
+    config = var_child_runnable_config.get()
+    callbacks = config.get("callbacks") if config else None
+    if not callbacks:
+        return
+    gated: dict[int, Any] = {}
+
+    def wrap(handler):
+        if id(handler) not in gated:
+            replacement = copy.copy(handler)
+            replacement.__class__ = _gated_handler_class(type(handler))
+            replacement._abandoned = abandoned
+            gated[id(handler)] = replacement
+        return gated[id(handler)]
+
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.handlers = [wrap(handler) for handler in callbacks.handlers]
+        callbacks.inheritable_handlers = [wrap(handler) for handler in callbacks.inheritable_handlers]
+    else:
+        callbacks = [wrap(handler) for handler in callbacks]
+    var_child_runnable_config.set({**config, "callbacks": callbacks})
+
+
+def _run_attempt(abandoned: threading.Event, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """在复制的上下文中执行首个请求，回调受 abandoned 控制"""
+    _gate_callbacks(abandoned)
+    return fn(*args, **kwargs)
+
+
+class CircuitBreaker:
+    """熔断器：closed -> open -> half_open -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            name (str): 上游名称
+            failure_threshold (int): 连续失败多少次后打开
+            reset_timeout (float): 打开后多久放行探测请求（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """判断是否允许调用上游"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                # 冷却结束，只放行一个探测请求
+                self._set_state(self.HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        """记录一次成功调用"""
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        """记录一次失败调用"""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    get_metrics().incr(f"resilience.{self.name}.trips")
+                    logging.warning(f"上游 {self.name} 熔断器打开，连续失败 {self._failures} 次")
+                self._opened_at = time.time()
+                self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        self.state = state
+        get_metrics().set_gauge(f"resilience.{self.name}.circuit_open", 0 if state == self.CLOSED else 1)
+
+
+class ResilientUpstream:
+    """带截止时间、对冲请求和熔断器的上游调用封装"""
+
+    def __init__(
+        self,
+        name: str,
+        deadline: Optional[float],
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 1.0,
+        max_hedges: int = 1,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        Args:
+            name (str): 上游名称，用于指标前缀
+            deadline (float, optional): 默认截止时间（秒），None 表示不限制
+            hedge_percentile (float): 触发对冲的历史延迟分位
+            hedge_min_delay (float): 对冲延迟下限（秒）
+            max_hedges (int): 单次调用最多发起的对冲请求数
+            breaker (CircuitBreaker, optional): 熔断器，默认按名称创建
+        """
+        self.name = name
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.max_hedges = max_hedges
+        self.breaker = breaker or CircuitBreaker(name)
+
+    def hedge_delay(self) -> Optional[float]:
+        """根据历史成功调用的延迟分位数计算对冲延迟，样本不足时不对冲"""
+        metrics = get_metrics()
+        name = f"resilience.{self.name}.latency"
+        if metrics.timing_count(name) < MIN_HEDGE_SAMPLES:
+            return None
+        return max(self.hedge_min_delay, metrics.percentile(name, self.hedge_percentile))
+
+    def call(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        fallback: Optional[Callable[[], Any]] = None,
+        hedge: bool = True,
+        deadline: Optional[float] = -1,
+        **kwargs,
+    ) -> Any:
+        """
+        调用上游
+
+        Args:
+            fn (Callable): 上游调用函数
+            *args: 函数位置参数
+            fallback (Callable, optional): 熔断或失败时的降级函数
+            hedge (bool): 是否允许对冲请求，流式输出的调用应关闭
+            deadline (float, optional): 本次截止时间（秒），默认使用实例配置，None 表示不限制
+            **kwargs: 函数关键字参数
+
+        Returns:
+            Any: 上游或降级函数的返回值
+        """
+        metrics = get_metrics()
+        if not self.breaker.allow():
+            metrics.incr(f"resilience.{self.name}.short_circuits")
+            if fallback is not None:
+                metrics.incr(f"resilience.{self.name}.fallbacks")
+                return fallback()
+            raise CircuitOpenError(f"上游 {self.name} 已熔断")
+
+        if deadline == -1:
+            deadline = self.deadline
+        started_at = time.time()
+        deadline_at = started_at + deadline if deadline else None
+        hedge_delay = self.hedge_delay() if hedge and self.max_hedges > 0 else None
+
+        # 首个请求在当前上下文中执行，保留 LangGraph 的流式回调；对冲请求不继承上下文，避免重复输出
+        context = contextvars.copy_context()
+        abandoned = threading.Event()
+        pending: set[Future] = {_executor.submit(context.run, _run_attempt, abandoned, fn, *args, **kwargs)}
+        try:
+            result, error = self._wait(fn, args, kwargs, pending, started_at, deadline, deadline_at, hedge_delay)
+        finally:
+            # 对冲中落败或超过截止时间的请求：未开始的取消，已开始的屏蔽回调
+            abandoned.set()
+            for future in pending:
+                if not future.cancel():
+                    metrics.incr(f"resilience.{self.name}.abandoned")
+        if error is None:
+            return result
+
+        if is_transport_failure(error):
+            self.breaker.record_failure()
+        else:
+            # 上游有响应，只是结果不可用，不计入熔断；半开状态下的探测请求据此关闭熔断器
+            self.breaker.record_success()
+        metrics.incr(f"resilience.{self.name}.failures")
+        if fallback is not None:
+            logging.warning(f"上游 {self.name} 调用失败，使用降级结果: {error}")
+            metrics.incr(f"resilience.{self.name}.fallbacks")
+            return fallback()
+        raise error
+
+    def _wait(
+        self,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        pending: set[Future],
+        started_at: float,
+        deadline: Optional[float],
+        deadline_at: Optional[float],
+        hedge_delay: Optional[float],
+    ) -> tuple[Any, Optional[BaseException]]:
+        """
+        等待首个成功的请求，必要时发起对冲请求；返回时 pending 中只剩仍在运行的请求
+
+        Returns:
+            tuple[Any, BaseException | None]: 成功时为（结果，None），失败时为（None，最后一个错误）
+        """
+        metrics = get_metrics()
+        hedges_sent = 0
+        error: Optional[BaseException] = None
+
+        while pending:
+            now = time.time()
+            wake_ups = []
+            if deadline_at is not None:
+                wake_ups.append(deadline_at - now)
+            if hedge_delay is not None and hedges_sent < self.max_hedges:
+                wake_ups.append(started_at + hedge_delay * (hedges_sent + 1) - now)
+            timeout = max(0.0, min(wake_ups)) if wake_ups else None
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            pending -= done
+            for future in done:
+                if future.exception() is None:
+                    self.breaker.record_success()
+                    metrics.observe(f"resilience.{self.name}.latency", time.time() - started_at)
+                    return future.result(), None
+                error = future.exception()
+
+            now = time.time()
+            if deadline_at is not None and now >= deadline_at:
+                metrics.incr(f"resilience.{self.name}.deadline_exceeded")
+                error = UpstreamDeadlineError(f"上游 {self.name} 调用超过截止时间 {deadline}s")
+                break
+            if (
+                pending
+                and hedge_delay is not None
+                and hedges_sent < self.max_hedges
+                and now >= started_at + hedge_delay * (hedges_sent + 1)
+            ):
+                hedges_sent += 1
+                metrics.incr(f"resilience.{self.name}.hedges")
+                pending.add(_executor.submit(fn, *args, **kwargs))
+
+        return None, error
@@ -0,0 +1,19 @@
+"""
+响应类模块
+
+FastAPI 默认先用 jsonable_encoder 逐个转换对象再用标准库序列化，工作流状态包含大量搜索结果时开销明显。
+FastJSONResponse 直接用 orjson 序列化，只有 orjson 不支持的对象才交给 jsonable_encoder 转换。
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 orjson 序列化的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,305 @@
+"""
+运行时监控模块
+
+同步节点、阻塞的搜索调用和逐条日志都可能卡住服务所有 SSE 流的事件循环，该模块提供进程内的运行时监控：
+- 事件循环延迟：监控协程按固定间隔休眠，实际唤醒时间与预期的差值即为循环延迟
+- 线程池：默认线程池（同步节点和 asyncio.to_thread 使用）的排队任务数、线程数和忙碌线程数
+- 阻塞检测：看门狗线程发现事件循环超过阈值没有响应时，抓取事件循环线程当前的调用栈
+- 采样分析：按固定间隔采样所有线程的调用栈，输出 flamegraph 可用的折叠栈文本，用于分析单次运行
+监控数据记录在全局指标中，最近的阻塞记录和调用栈由运行时接口输出。
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Optional
+
+from .lazy import lazy
+from .metrics import get_metrics
+
+# 环境变量名称：是否开启事件循环监控、采样间隔（秒）和阻塞告警阈值（秒）
+LOOP_MONITOR = "LOOP_MONITOR"
+LOOP_MONITOR_INTERVAL = "LOOP_MONITOR_INTERVAL"
+LOOP_BLOCK_THRESHOLD = "LOOP_BLOCK_THRESHOLD"
+# 环境变量名称：采样分析结果的保存目录
+PROFILE_DIR = "PROFILE_DIR"
+
+DEFAULT_LOOP_MONITOR_INTERVAL = 0.1
+DEFAULT_LOOP_BLOCK_THRESHOLD = 0.2
+DEFAULT_PROFILE_DIR = "profiles"
+
+# 保留的最近阻塞记录数、调用栈最大层数
+BLOCK_REPORTS_MAX = 20
+BLOCK_STACK_LIMIT = 30
+
+# 采样分析的采样间隔（秒）和保留的分析结果文件数
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_MAX_FILES = 50
+
+
+def executor_stats(loop: asyncio.AbstractEventLoop) -> dict:
+    """
+    获取事件循环默认线程池的状态
+
+    Args:
+        loop (asyncio.AbstractEventLoop): 事件循环
+
+    Returns:
+        dict: max_workers、threads（已创建线程数）、active（忙碌线程数）和 queue_depth（排队任务数）
+    """
+    executor = getattr(loop, "_default_executor", None)
+    if executor is None:
+        # 还没有任务提交到线程池
+        return {"max_workers": 0, "threads": 0, "active": 0, "queue_depth": 0}
+    threads = len(executor._threads)
+    idle = executor._idle_semaphore._value
+    return {
+        "max_workers": executor._max_workers,
+        "threads": threads,
+        "active": max(0, threads - idle),
+        "queue_depth": executor._work_queue.qsize(),
+    }
+
+
+class LoopMonitor:
+    """事件循环监控：采样循环延迟和线程池状态，检测阻塞事件循环的回调"""
+
+    def __init__(self, interval: float, block_threshold: float):
+        """
+        Args:
+            interval (float): 采样间隔（秒）
+            block_threshold (float): 事件循环超过该时长没有响应时记录阻塞和调用栈（秒）
+        """
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.blocked: deque[dict] = deque(maxlen=BLOCK_REPORTS_MAX)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._beat = time.monotonic()
+        self._pending_block: Optional[dict] = None
+
+    async def start(self):
+        """在事件循环中启动监控协程和看门狗线程"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logging.info(f"事件循环监控已启动，采样间隔 {self.interval}s，阻塞阈值 {self.block_threshold}s")
+
+    async def stop(self):
+        """停止监控"""
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._watchdog.join()
+
+    async def _sample(self):
+        metrics = get_metrics()
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._beat = now
+            metrics.observe("runtime.loop_lag", lag)
+            metrics.set_gauge("runtime.loop_lag", lag)
+            # 看门狗记录阻塞时只知道已阻塞的时长，恢复后补全实际时长
+            if self._pending_block is not None:
+                self._pending_block["blocked_seconds"] = round(lag, 3)
+                self._pending_block = None
+            stats = executor_stats(self._loop)
+            metrics.set_gauge("runtime.executor.queue_depth", stats["queue_depth"])
+            metrics.set_gauge("runtime.executor.threads", stats["threads"])
+            metrics.set_gauge("runtime.executor.active", stats["active"])
+            metrics.set_gauge("runtime.threads", threading.active_count())
+
+    def _watch(self):
+        """看门狗线程：事件循环超过阈值没有响应时抓取事件循环线程的调用栈，每次阻塞只记录一次"""
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.block_threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame, limit=BLOCK_STACK_LIMIT) if frame is not None else []
+            report = {"at": time.time(), "blocked_seconds": round(stalled, 3), "stack": "".join(stack)}
+            self._pending_block = report
+            self.blocked.append(report)
+            get_metrics().incr("runtime.loop_blocked")
+            logging.warning(f"事件循环已阻塞 {stalled:.3f}s，调用栈:\n{report['stack']}")
+
+    def report(self) -> dict:
+        """
+        导出运行时状态
+
+        Returns:
+            dict: 循环延迟分位数、线程池状态和最近的阻塞记录
+        """
+        metrics = get_metrics()
+        return {
+            "loop_lag": {
+                "p50": metrics.percentile("runtime.loop_lag", 0.5),
+                "p95": metrics.percentile("runtime.loop_lag", 0.95),
+                "p99": metrics.percentile("runtime.loop_lag", 0.99),
+            },
+            "executor": executor_stats(self._loop) if self._loop is not None else None,
+            "threads": threading.active_count(),
+            "blocked_count": metrics.counter("runtime.loop_blocked"),
+            "blocked": list(self.blocked),
+        }
+
+
+def loop_monitor_enabled() -> bool:
+    """是否开启事件循环监控"""
+    return os.getenv(LOOP_MONITOR, "true").lower() == "true"
+
+
+@lazy
+def get_loop_monitor() -> LoopMonitor:
+    """获取事件循环监控实例"""
+    return LoopMonitor(
+        float(os.getenv(LOOP_MONITOR_INTERVAL, DEFAULT_LOOP_MONITOR_INTERVAL)),
+        float(os.getenv(LOOP_BLOCK_THRESHOLD, DEFAULT_LOOP_BLOCK_THRESHOLD)),
+    )
+
+
+def _is_idle(frame) -> bool:
+    """线程是否为空闲等待任务的线程池线程"""
+    while frame is not None and frame.f_code.co_filename.endswith("threading.py"):
+        frame = frame.f_back
+    if frame is None:
+        return False
+    code = frame.f_code
+    return (code.co_name == "get" and code.co_filename.endswith("queue.py")) or (
+        code.co_name == "_worker" and code.co_filename.endswith("thread.py")
+    )
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """按固定间隔采样所有线程调用栈的分析器，同一进程中并发的其他请求也会出现在采样中"""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        """
+        Args:
+            interval (float): 采样间隔（秒）
+        """
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+        self.duration = 0.0
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started_at
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                # 空闲的线程池线程和监控自身的线程不计入
+                if thread_id == own_id or names.get(thread_id) == "loop-watchdog" or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """折叠栈文本，每行为以分号分隔的调用栈和采样次数，可直接用于 flamegraph"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 10) -> list[dict]:
+        """
+        按自身采样次数排序的函数
+
+        Args:
+            limit (int): 返回的函数数
+
+        Returns:
+            list[dict]: 包含 function 和 samples 的列表
+        """
+        leaves: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [{"function": name, "samples": count} for name, count in leaves.most_common(limit)]
+
+
+def _profile_path(run_id: str) -> str:
+    return os.path.join(os.getenv(PROFILE_DIR, DEFAULT_PROFILE_DIR), f"{run_id}.folded")
+
+
+def save_profile(run_id: str, profiler: SamplingProfiler):
+    """
+    保存运行的采样分析结果，超过 PROFILE_MAX_FILES 时删除最早的结果
+
+    Args:
+        run_id (str): 运行ID
+        profiler (SamplingProfiler): 已停止的分析器
+    """
+    path = _profile_path(run_id)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(profiler.folded())
+    files = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".folded")),
+        key=os.path.getmtime,
+    )
+    for old in files[:-PROFILE_MAX_FILES]:
+        os.remove(old)
+
+
+def load_profile(run_id: str) -> Optional[str]:
+    """
+    读取运行的采样分析结果
+
+    Args:
+        run_id (str): 运行ID，调用方需校验为 UUID
+
+    Returns:
+        Optional[str]: 折叠栈文本，不存在时返回 None
+    """
+    path = _profile_path(run_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
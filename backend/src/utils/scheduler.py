@@ -0,0 +1,224 @@
+"""
+工作负载调度模块
+
+该模块为语言模型和搜索等共享上游提供按优先级的调用调度：
+- 工作负载类别：对话 > 低强度搜索 > 高强度搜索 > 后台任务，数值越小优先级越高
+- 每个上游有总并发上限，每个类别只能占用其中一部分，高强度搜索占满自己的份额后不会挤占对话
+- 排队中的调用按优先级放行，后到的高优先级调用抢占排队中的低优先级调用；
+  排队时间越长优先级越高，避免低优先级调用被无限期饿死
+各类别的排队时间、调用耗时和抢占次数记录在全局指标中，用于确认搜索负载下对话延迟保持稳定。
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from .lazy import lazy
+from .metrics import get_metrics
+
+# 工作负载类别及其优先级
+WORKLOAD_CHAT = "chat"
+WORKLOAD_SEARCH_LOW = "search_low"
+WORKLOAD_SEARCH_HIGH = "search_high"
+WORKLOAD_BACKGROUND = "background"
+WORKLOAD_PRIORITIES = {WORKLOAD_CHAT: 0, WORKLOAD_SEARCH_LOW: 1, WORKLOAD_SEARCH_HIGH: 2, WORKLOAD_BACKGROUND: 3}
+
+# 各类别可占用的上游并发份额
+WORKLOAD_SHARES = {WORKLOAD_CHAT: 1.0, WORKLOAD_SEARCH_LOW: 0.75, WORKLOAD_SEARCH_HIGH: 0.5, WORKLOAD_BACKGROUND: 0.25}
+
+# 环境变量名称：语言模型和搜索的总并发上限
+SCHEDULER_LLM_CONCURRENCY = "SCHEDULER_LLM_CONCURRENCY"
+SCHEDULER_SEARCH_CONCURRENCY = "SCHEDULER_SEARCH_CONCURRENCY"
+
+DEFAULT_LLM_CONCURRENCY = 16
+DEFAULT_SEARCH_CONCURRENCY = 8
+
+# 排队每经过多少秒，调用的优先级提升一级
+PRIORITY_AGING_SECONDS = 30.0
+
+# 当前上下文的工作负载类别，由 API 入口按请求设置，LangGraph 节点线程会继承
+current_workload: ContextVar[str] = ContextVar("current_workload", default=WORKLOAD_SEARCH_LOW)
+
+
+def set_workload(workload: str):
+    """设置当前上下文的工作负载类别"""
+    current_workload.set(workload)
+
+
+@contextmanager
+def workload_scope(workload: str):
+    """在代码块内使用指定的工作负载类别，适用于线程池中复用的线程"""
+    token = current_workload.set(workload)
+    try:
+        yield
+    finally:
+        current_workload.reset(token)
+
+
+def workload_for_effort(effort: str) -> str:
+    """
+    根据搜索强度获取工作负载类别
+
+    Args:
+        effort (str): 搜索强度，low、medium 或 high
+
+    Returns:
+        str: low 为低强度搜索，其余为高强度搜索
+    """
+    return WORKLOAD_SEARCH_LOW if effort == "low" else WORKLOAD_SEARCH_HIGH
+
+
+@dataclass
+class _Waiter:
+    """排队中的调用，放行时通过 grant 回调通知等待者"""
+    workload: str
+    priority: int
+    seq: int
+    grant: Callable[[], None]
+    queued_at: float = field(default_factory=time.time)
+    overtaken: bool = False
+
+    def rank(self, now: float) -> tuple[float, int]:
+        return self.priority - (now - self.queued_at) / PRIORITY_AGING_SECONDS, self.seq
+
+
+class WorkloadScheduler:
+    """单个上游的优先级调度器，同时支持线程中的同步调用和协程中的异步调用"""
+
+    def __init__(self, name: str, limit: int, shares: Optional[dict[str, float]] = None):
+        """
+        Args:
+            name (str): 上游名称，用于指标前缀
+            limit (int): 总并发上限
+            shares (dict[str, float], optional): 各类别可占用的并发份额，默认使用 WORKLOAD_SHARES
+        """
+        self.name = name
+        self.limit = limit
+        self.class_limits = {
+            workload: max(1, int(limit * share)) for workload, share in (shares or WORKLOAD_SHARES).items()
+        }
+        self._in_use = {workload: 0 for workload in self.class_limits}
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _eligible(self, workload: str) -> bool:
+        return sum(self._in_use.values()) < self.limit and self._in_use[workload] < self.class_limits[workload]
+
+    def _dispatch(self):
+        """按优先级放行可以运行的排队调用，调用方需持有锁"""
+        now = time.time()
+        metrics = get_metrics()
+        self._waiters.sort(key=lambda waiter: waiter.rank(now))
+        index = 0
+        while index < len(self._waiters):
+            waiter = self._waiters[index]
+            if not self._eligible(waiter.workload):
+                index += 1
+                continue
+            del self._waiters[index]
+            self._in_use[waiter.workload] += 1
+            # 更早排队但仍在等待的低优先级调用视为被抢占
+            for other in self._waiters:
+                if other.seq < waiter.seq and other.priority > waiter.priority and not other.overtaken:
+                    other.overtaken = True
+                    metrics.incr(f"scheduler.{self.name}.{other.workload}.preempted")
+            metrics.observe(f"scheduler.{self.name}.{waiter.workload}.queue_wait", now - waiter.queued_at)
+            waiter.grant()
+        self._update_gauges()
+
+    def _enqueue(self, workload: str, grant: Callable[[], None]) -> _Waiter:
+        if workload not in self.class_limits:
+            workload = WORKLOAD_BACKGROUND
+        waiter = _Waiter(workload, WORKLOAD_PRIORITIES[workload], next(self._seq), grant)
+        with self._lock:
+            self._waiters.append(waiter)
+            self._dispatch()
+        return waiter
+
+    def _cancel(self, waiter: _Waiter) -> bool:
+        """取消排队，调用已被放行时返回 False"""
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._update_gauges()
+                return True
+            return False
+
+    def _release(self, workload: str, started_at: float):
+        get_metrics().observe(f"scheduler.{self.name}.{workload}.latency", time.time() - started_at)
+        with self._lock:
+            self._in_use[workload] -= 1
+            self._dispatch()
+
+    def _update_gauges(self):
+        metrics = get_metrics()
+        metrics.set_gauge(f"scheduler.{self.name}.in_use", sum(self._in_use.values()))
+        metrics.set_gauge(f"scheduler.{self.name}.queued", len(self._waiters))
+
+    @contextmanager
+    def slot(self, workload: Optional[str] = None):
+        """
+        在线程中占用一个并发名额，排队直到按优先级被放行
+
+        Args:
+            workload (str, optional): 工作负载类别，默认使用当前上下文的类别
+        """
+        started_at = time.time()
+        granted = threading.Event()
+        waiter = self._enqueue(workload or current_workload.get(), granted.set)
+        granted.wait()
+        try:
+            yield
+        finally:
+            self._release(waiter.workload, started_at)
+
+    @asynccontextmanager
+    async def aslot(self, workload: Optional[str] = None):
+        """
+        在协程中占用一个并发名额，排队期间不占用线程
+
+        Args:
+            workload (str, optional): 工作负载类别，默认使用当前上下文的类别
+        """
+        started_at = time.time()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        waiter = self._enqueue(workload or current_workload.get(), grant)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            if not self._cancel(waiter):
+                self._release(waiter.workload, started_at)
+            raise
+        try:
+            yield
+        finally:
+            self._release(waiter.workload, started_at)
+
+    def run(self, fn: Callable[..., Any], *args, workload: Optional[str] = None, **kwargs) -> Any:
+        """占用一个并发名额后同步调用函数"""
+        with self.slot(workload):
+            return fn(*args, **kwargs)
+
+
+@lazy
+def get_llm_scheduler() -> WorkloadScheduler:
+    """获取语言模型调用调度器"""
+    return WorkloadScheduler("llm", int(os.getenv(SCHEDULER_LLM_CONCURRENCY, DEFAULT_LLM_CONCURRENCY)))
+
+
+@lazy
+def get_search_scheduler() -> WorkloadScheduler:
+    """获取搜索调用调度器"""
+    return WorkloadScheduler("search", int(os.getenv(SCHEDULER_SEARCH_CONCURRENCY, DEFAULT_SEARCH_CONCURRENCY)))
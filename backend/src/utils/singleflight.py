@@ -0,0 +1,63 @@
+"""
+单飞（single-flight）调用合并模块
+
+该模块用于合并并发的相同调用：同一键同时只有一个调用真正执行，
+其余调用等待并共享其结果，适用于在线程池中执行的同步上游请求。
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+from .metrics import get_metrics
+
+
+class SingleFlight:
+    """线程安全的调用合并器"""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name (str): 指标名称前缀
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        执行调用，相同键的并发调用共享同一次执行结果
+
+        Args:
+            key (Hashable): 调用键
+            fn (Callable): 实际执行的函数
+            *args: 函数位置参数
+            **kwargs: 函数关键字参数
+
+        Returns:
+            Any: 函数返回值
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+
+        metrics = get_metrics()
+        if not is_leader:
+            metrics.incr(f"{self.name}.followers")
+            return future.result()
+
+        metrics.incr(f"{self.name}.leaders")
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
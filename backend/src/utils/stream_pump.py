@@ -0,0 +1,255 @@
+"""
+流式响应泵模块
+
+工作流的事件循环和 HTTP 写出原本是同一个协程：长时间没有事件时无法发送心跳，慢客户端也会拖慢工作流本身。
+StreamPump 在独立任务中运行事件源，经由每次运行独立的有界队列交给写出协程：
+- 心跳由定时器驱动，距离上次发送超过心跳间隔就发送，与事件源是否产生事件无关
+- 队列满时按慢客户端策略处理：
+  coalesce：与队尾同一节点的 token 事件合并，无法合并时等待客户端读取
+  drop：在 coalesce 的基础上丢弃低价值事件（节点运行中状态、重复的状态消息），其余事件等待
+  disconnect：无法合并时立即断开
+  任何策略下等待超过 STREAM_SLOW_CONSUMER_TIMEOUT 秒都会断开
+队列深度、合并、丢弃和断开次数记录在全局指标中。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Generic, Optional, TypeVar
+
+from .metrics import get_metrics
+
+T = TypeVar("T")
+
+# 环境变量名称：每次运行的队列长度、慢客户端策略和最长等待时间（秒）
+STREAM_QUEUE_SIZE = "STREAM_QUEUE_SIZE"
+STREAM_SLOW_CONSUMER_POLICY = "STREAM_SLOW_CONSUMER_POLICY"
+STREAM_SLOW_CONSUMER_TIMEOUT = "STREAM_SLOW_CONSUMER_TIMEOUT"
+
+DEFAULT_STREAM_QUEUE_SIZE = 256
+DEFAULT_SLOW_CONSUMER_TIMEOUT = 30.0
+
+# 慢客户端策略
+POLICY_COALESCE = "coalesce"
+POLICY_DROP = "drop"
+POLICY_DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (POLICY_COALESCE, POLICY_DROP, POLICY_DISCONNECT)
+
+SSE_HEARTBEAT = ":keep-alive\n\n"
+ERROR_SLOW_CONSUMER = "Client is reading too slowly, stream closed"
+
+
+class SlowConsumerError(Exception):
+    """客户端读取过慢，流被断开"""
+
+
+def format_sse(event: str, data: dict) -> str:
+    """格式化 SSE 事件文本"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _parse_sse(text: str) -> tuple[str, Optional[dict]]:
+    """解析 format_sse 生成的事件文本，返回事件名称和数据"""
+    head, _, rest = text.partition("\n")
+    event = head[len("event: "):] if head.startswith("event: ") else ""
+    if not rest.startswith("data: "):
+        return event, None
+    try:
+        return event, json.loads(rest[len("data: "):])
+    except ValueError:
+        return event, None
+
+
+def merge_sse_tokens(previous: str, current: str) -> Optional[str]:
+    """
+    合并同一节点、同一条消息的两个连续 token 事件
+
+    Args:
+        previous (str): 队尾的事件
+        current (str): 新事件
+
+    Returns:
+        Optional[str]: 合并后的事件，不能合并时返回 None
+    """
+    if not (previous.startswith("event: messages\n") and current.startswith("event: messages\n")):
+        return None
+    _, first = _parse_sse(previous)
+    _, second = _parse_sse(current)
+    if first is None or second is None or first.get("node") != second.get("node"):
+        return None
+    first_message, second_message = first.get("data", {}), second.get("data", {})
+    if first_message.get("type") != "AIMessageChunk" or second_message.get("type") != "AIMessageChunk":
+        return None
+    first_data, second_data = first_message.get("data", {}), second_message.get("data", {})
+    if first_data.get("id") != second_data.get("id") or first_data.get("tool_call_chunks") or second_data.get("tool_call_chunks"):
+        return None
+    if not isinstance(first_data.get("content"), str) or not isinstance(second_data.get("content"), str):
+        return None
+    first_data["content"] += second_data["content"]
+    return format_sse("messages", first)
+
+
+def is_low_value_sse(text: str) -> bool:
+    """节点运行中状态和重复的状态消息可以在客户端过慢时丢弃，完成状态和结果不丢弃"""
+    if not text.startswith("event: custom\n"):
+        return False
+    _, payload = _parse_sse(text)
+    data = (payload or {}).get("data") or {}
+    if data.get("type") == "update_stream_messages":
+        return True
+    return data.get("type") == "node_execute" and (data.get("data") or {}).get("status") == "running"
+
+
+class _End:
+    """事件源结束标记"""
+
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+
+
+class StreamPump(Generic[T]):
+    """在独立任务中运行事件源，经由有界队列交给写出协程"""
+
+    def __init__(
+        self,
+        events: AsyncIterator[T],
+        name: str,
+        heartbeat: T,
+        heartbeat_interval: float,
+        merge: Optional[Callable[[T, T], Optional[T]]] = None,
+        is_low_value: Optional[Callable[[T], bool]] = None,
+        maxsize: Optional[int] = None,
+        policy: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            events (AsyncIterator[T]): 事件源
+            name (str): 流名称，用于指标前缀
+            heartbeat (T): 心跳事件
+            heartbeat_interval (float): 心跳间隔（秒）
+            merge (Callable, optional): 队列满时合并队尾事件和新事件，不能合并时返回 None
+            is_low_value (Callable, optional): 判断事件在 drop 策略下是否可以丢弃
+            maxsize (int, optional): 队列长度，默认读取 STREAM_QUEUE_SIZE
+            policy (str, optional): 慢客户端策略，默认读取 STREAM_SLOW_CONSUMER_POLICY
+            timeout (float, optional): 队列满时的最长等待时间，默认读取 STREAM_SLOW_CONSUMER_TIMEOUT
+        """
+        self.events = events
+        self.name = name
+        self.heartbeat = heartbeat
+        self.heartbeat_interval = heartbeat_interval
+        self.merge = merge
+        self.is_low_value = is_low_value
+        self.maxsize = maxsize or int(os.getenv(STREAM_QUEUE_SIZE, DEFAULT_STREAM_QUEUE_SIZE))
+        self.policy = policy or os.getenv(STREAM_SLOW_CONSUMER_POLICY, POLICY_COALESCE)
+        if self.policy not in SLOW_CONSUMER_POLICIES:
+            logging.warning(f"未知的慢客户端策略 {self.policy}，使用 {POLICY_COALESCE}")
+            self.policy = POLICY_COALESCE
+        self.timeout = timeout if timeout is not None else float(
+            os.getenv(STREAM_SLOW_CONSUMER_TIMEOUT, DEFAULT_SLOW_CONSUMER_TIMEOUT)
+        )
+        self.dropped = 0
+        self._items: deque = deque()
+        self._changed = asyncio.Condition()
+
+    async def _put(self, item):
+        metrics = get_metrics()
+        if len(self._items) >= self.maxsize and not isinstance(item, _End):
+            if self.merge is not None and self._items and not isinstance(self._items[-1], _End):
+                merged = self.merge(self._items[-1], item)
+                if merged is not None:
+                    self._items[-1] = merged
+                    metrics.incr(f"{self.name}.coalesced")
+                    return
+            if self.policy == POLICY_DROP and self.is_low_value is not None and self.is_low_value(item):
+                metrics.incr(f"{self.name}.dropped")
+                self.dropped += 1
+                return
+            if self.policy == POLICY_DISCONNECT:
+                raise SlowConsumerError(ERROR_SLOW_CONSUMER)
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: len(self._items) < self.maxsize), self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise SlowConsumerError(ERROR_SLOW_CONSUMER)
+        async with self._changed:
+            self._items.append(item)
+            metrics.observe(f"{self.name}.queue_depth", len(self._items))
+            self._changed.notify_all()
+
+    async def _produce(self):
+        try:
+            async with aclosing(self.events) as events:
+                async for item in events:
+                    await self._put(item)
+            await self._put(_End())
+        except asyncio.CancelledError:
+            raise
+        except SlowConsumerError as e:
+            get_metrics().incr(f"{self.name}.disconnected")
+            logging.warning(f"{self.name} 客户端读取过慢，队列长度 {len(self._items)}，断开流")
+            # 结束标记放在队首，客户端不再读取积压的事件
+            self._items.appendleft(_End(e))
+            async with self._changed:
+                self._changed.notify_all()
+        except Exception as e:
+            await self._put(_End(e))
+
+    async def stream(self) -> AsyncIterator[T]:
+        """
+        读取事件，超过心跳间隔没有发送时产生心跳事件
+
+        Yields:
+            T: 事件源的事件或心跳事件
+
+        Raises:
+            Exception: 事件源的异常，或客户端过慢时的 SlowConsumerError
+        """
+        metrics = get_metrics()
+        producer = asyncio.create_task(self._produce())
+        last_sent = time.monotonic()
+        try:
+            while True:
+                async with self._changed:
+                    remaining = self.heartbeat_interval - (time.monotonic() - last_sent)
+                    if not self._items and remaining > 0:
+                        try:
+                            await asyncio.wait_for(self._changed.wait_for(lambda: len(self._items) > 0), remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                    item = self._items.popleft() if self._items else None
+                    self._changed.notify_all()
+                if item is None:
+                    metrics.incr(f"{self.name}.heartbeats")
+                    yield self.heartbeat
+                elif isinstance(item, _End):
+                    if item.error is not None:
+                        raise item.error
+                    return
+                else:
+                    yield item
+                last_sent = time.monotonic()
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+
+def sse_pump(events: AsyncIterator[str], name: str, heartbeat_interval: float) -> StreamPump[str]:
+    """
+    创建 SSE 事件的流式响应泵，队列满时合并 token 事件，drop 策略下丢弃低价值事件
+
+    Args:
+        events (AsyncIterator[str]): SSE 事件文本
+        name (str): 流名称，用于指标前缀
+        heartbeat_interval (float): 心跳间隔（秒）
+
+    Returns:
+        StreamPump[str]: 流式响应泵
+    """
+    return StreamPump(events, name, SSE_HEARTBEAT, heartbeat_interval, merge_sse_tokens, is_low_value_sse)
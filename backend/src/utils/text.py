@@ -0,0 +1,44 @@
+"""
+文本处理工具模块
+
+该模块提供查询词提取与覆盖率计算等轻量文本函数，用于本地的相关性判断。
+"""
+
+import re
+
+_TERM_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+
+
+def query_terms(text: str) -> set[str]:
+    """
+    提取查询词：英文单词按词切分（忽略过短的词），中文按相邻两字切分
+
+    Args:
+        text (str): 查询文本
+
+    Returns:
+        set[str]: 查询词集合
+    """
+    tokens = _TERM_PATTERN.findall(text.lower())
+    terms = {token for token in tokens if len(token) > 2 and token.isascii()}
+    chars = [token for token in tokens if not token.isascii()]
+    terms.update(a + b for a, b in zip(chars, chars[1:]))
+    return terms
+
+
+def term_coverage(query: str, documents: list[dict]) -> float:
+    """
+    计算查询词在文档标题和内容中的覆盖率
+
+    Args:
+        query (str): 查询文本
+        documents (list[dict]): 包含 title、content 的文档
+
+    Returns:
+        float: 被覆盖的查询词比例，查询无有效词时返回 0
+    """
+    terms = query_terms(query)
+    if not terms:
+        return 0.0
+    corpus = " ".join(f"{item.get('title', '')} {item.get('content', '')}" for item in documents).lower()
+    return sum(1 for term in terms if term in corpus) / len(terms)
@@ -0,0 +1,60 @@
+"""
+Token 估算工具模块
+
+该模块提供不依赖具体分词器的 token 数量估算函数，用于历史窗口裁剪、提示词大小统计等场景。
+中日韩字符按 1 个 token 计，其余字符按约 4 个字符 1 个 token 计。
+"""
+
+import re
+
+# 中日韩统一表意文字及常用全角标点
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+# 每条消息的固定开销（角色、分隔符等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数量
+
+    Args:
+        text (str): 文本内容
+
+    Returns:
+        int: 估算的 token 数量
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return cjk_count + (other_count + 3) // 4
+
+
+def estimate_message_tokens(message: dict) -> int:
+    """
+    估算单条 openai 格式消息的 token 数量
+
+    Args:
+        message (dict): 包含 role 和 content 的消息
+
+    Returns:
+        int: 估算的 token 数量
+    """
+    content = message.get("content", "")
+    if not isinstance(content, str):
+        content = str(content)
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_messages_tokens(messages: list[dict]) -> int:
+    """
+    估算消息列表的 token 总数
+
+    Args:
+        messages (list[dict]): 消息列表
+
+    Returns:
+        int: 估算的 token 总数
+    """
+    return sum(estimate_message_tokens(message) for message in messages)
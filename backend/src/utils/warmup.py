@@ -0,0 +1,55 @@
+"""
+工作流预热模块
+
+工作流第一次运行时要初始化流式回调、状态通道和序列化等内部结构，这部分开销原本由第一个请求承担。
+应用启动时用本地的预热模型把两个编译后的工作流各完整运行一次：
+预热期间 warm_up_model 上下文变量指向预热模型，调用语言模型的位置改用它，不发起网络请求，
+也不经过调度器和弹性层，不影响排队和对冲延迟统计。
+"""
+
+from contextvars import ContextVar
+from typing import Any, Optional
+
+# 预热期间使用的本地模型，正常运行时为 None
+warm_up_model: ContextVar[Optional[Any]] = ContextVar("warm_up_model", default=None)
+
+WARM_UP_REPLY = "ok"
+
+
+def create_warm_up_model(structured_outputs: Optional[dict[str, dict]] = None):
+    """
+    创建预热模型，首次使用时才导入 LangChain
+
+    Args:
+        structured_outputs (dict, optional): 结构化输出模型名称到字段值的映射，with_structured_output 返回对应的实例
+
+    Returns:
+        BaseChatModel: 回复固定文本、支持流式输出和结构化输出的本地模型
+    """
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+    from langchain_core.runnables import RunnableLambda
+
+    outputs = structured_outputs or {}
+
+    class WarmUpChatModel(BaseChatModel):
+        """回复固定文本的本地模型"""
+
+        @property
+        def _llm_type(self) -> str:
+            return "warm-up"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=WARM_UP_REPLY))])
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=WARM_UP_REPLY))
+            if run_manager:
+                run_manager.on_llm_new_token(WARM_UP_REPLY, chunk=chunk)
+            yield chunk
+
+        def with_structured_output(self, schema, **kwargs):
+            return RunnableLambda(lambda _: schema.model_validate(outputs[schema.__name__]))
+
+    return WarmUpChatModel()
@@ -0,0 +1,146 @@
+"""
+WebSocket 运行复用模块
+
+一个持久的 WebSocket 连接上可以同时运行多个工作流，事件与 SSE 接口相同（custom、messages、updates、error、end），
+以 msgpack 二进制帧发送，每一帧对应一个事件。
+
+客户端发送的帧（msgpack 映射）：
+- {"type": "start", "id": 运行ID, "input": 输入数据}：开始一次运行，运行ID由客户端生成，在连接内唯一
+- {"type": "cancel", "id": 运行ID}：取消运行
+- {"type": "ping"}：服务端回复 {"type": "pong"}
+
+服务端发送的帧：{"id": 运行ID, "event": 事件名称, "data": 事件数据}，每次运行以 end 事件结束，
+被取消的运行的 end 事件数据为 {"cancelled": true}；无法对应到运行的错误以 {"type": "error", "error": 原因} 发送。
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Optional
+
+import ormsgpack
+from fastapi import WebSocket, WebSocketDisconnect
+
+from .metrics import get_metrics
+
+# 每个连接同时运行的最大数量、发送队列长度
+WS_MAX_RUNS = 8
+WS_SEND_QUEUE_SIZE = 256
+
+ERROR_WS_BAD_FRAME = "Frames must be msgpack maps with a type"
+ERROR_WS_DUPLICATE_RUN = "Run id is already in use on this connection"
+ERROR_WS_TOO_MANY_RUNS = "Too many concurrent runs on this connection"
+
+# 运行函数：接收客户端的输入数据，产生 (事件名称, 事件数据)
+RunEvents = Callable[[dict], AsyncIterator[tuple[str, Any]]]
+
+
+def pack(frame: dict) -> bytes:
+    """序列化一帧"""
+    return ormsgpack.packb(frame, option=ormsgpack.OPT_NON_STR_KEYS)
+
+
+class RunMultiplexer:
+    """单个 WebSocket 连接上的运行复用"""
+
+    def __init__(self, websocket: WebSocket, run_events: RunEvents, name: str):
+        """
+        Args:
+            websocket (WebSocket): 已建立的连接
+            run_events (RunEvents): 运行函数
+            name (str): 智能体名称，用于指标前缀
+        """
+        self.websocket = websocket
+        self.run_events = run_events
+        self.name = name
+        self._runs: dict[str, asyncio.Task] = {}
+        self._outbox: asyncio.Queue[bytes] = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self._closed = False
+
+    async def serve(self):
+        """接受连接并处理客户端帧，连接断开时取消所有运行"""
+        metrics = get_metrics()
+        await self.websocket.accept()
+        metrics.incr(f"ws.{self.name}.connections")
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                frame = await self._receive()
+                if frame is None:
+                    await self._send({"type": "error", "error": ERROR_WS_BAD_FRAME})
+                elif frame["type"] == "start":
+                    await self._start(str(frame.get("id", "")), frame.get("input") or {})
+                elif frame["type"] == "cancel":
+                    task = self._runs.get(str(frame.get("id", "")))
+                    if task is not None:
+                        task.cancel()
+                elif frame["type"] == "ping":
+                    await self._send({"type": "pong"})
+        except WebSocketDisconnect:
+            logging.info(f"WebSocket 连接断开，取消 {len(self._runs)} 个运行")
+        finally:
+            self._close()
+            await asyncio.gather(*self._runs.values(), return_exceptions=True)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+
+    async def _receive(self) -> Optional[dict]:
+        """接收一帧，格式错误时返回 None"""
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        try:
+            frame = ormsgpack.unpackb(message.get("bytes") or b"")
+        except ormsgpack.MsgpackDecodeError:
+            return None
+        if not isinstance(frame, dict) or frame.get("type") not in ("start", "cancel", "ping"):
+            return None
+        return frame
+
+    def _close(self):
+        """连接关闭后不再发送，并取消所有运行"""
+        self._closed = True
+        for task in list(self._runs.values()):
+            task.cancel()
+
+    async def _send(self, frame: dict):
+        if not self._closed:
+            await self._outbox.put(pack(frame))
+
+    async def _write(self):
+        """唯一的发送协程，各运行的帧经由发送队列按顺序写入连接"""
+        metrics = get_metrics()
+        while True:
+            data = await self._outbox.get()
+            try:
+                await self.websocket.send_bytes(data)
+            except Exception as e:
+                logging.info(f"WebSocket 发送失败，连接已关闭: {str(e)}")
+                self._close()
+                return
+            metrics.incr(f"ws.{self.name}.bytes_sent", len(data))
+
+    async def _start(self, run_id: str, input_data: dict):
+        if not run_id or run_id in self._runs:
+            await self._send({"type": "error", "id": run_id, "error": ERROR_WS_DUPLICATE_RUN})
+            return
+        if len(self._runs) >= WS_MAX_RUNS:
+            await self._send({"type": "error", "id": run_id, "error": ERROR_WS_TOO_MANY_RUNS})
+            return
+        self._runs[run_id] = asyncio.create_task(self._run(run_id, input_data))
+
+    async def _run(self, run_id: str, input_data: dict):
+        metrics = get_metrics()
+        metrics.incr(f"ws.{self.name}.runs")
+        end = {}
+        try:
+            async for event, data in self.run_events(input_data):
+                await self._send({"id": run_id, "event": event, "data": data})
+        except asyncio.CancelledError:
+            metrics.incr(f"ws.{self.name}.cancelled")
+            end = {"cancelled": True}
+        except Exception as e:
+            logging.error(f"WebSocket 运行错误: {run_id}, 错误: {str(e)}", exc_info=True)
+            await self._send({"id": run_id, "event": "error", "data": {"error": str(e)}})
+        finally:
+            self._runs.pop(run_id, None)
+        await self._send({"id": run_id, "event": "end", "data": end})
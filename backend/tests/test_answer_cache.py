@@ -0,0 +1,84 @@
+"""回答缓存的键、过期、淘汰和失效"""
+
+import time
+
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.routers.search_agent.cache import AnswerCache, make_cache_key, normalize_query
+from src.utils.admin import ADMIN_TOKEN
+
+TTL = {"low": 60, "high": 60}
+
+
+def test_key_normalizes_query():
+    assert normalize_query("  Asyncio   PERFORMANCE ") == "asyncio performance"
+    assert make_cache_key("Asyncio  performance", "low", []) == make_cache_key("asyncio performance", "low", [])
+
+
+def test_key_depends_on_effort_and_history():
+    base = make_cache_key("q", "low", [])
+    assert make_cache_key("q", "high", []) != base
+    assert make_cache_key("q", "low", [{"role": "user", "content": "earlier"}]) != base
+    # 消息中字段顺序不影响哈希
+    assert make_cache_key("q", "low", [{"role": "user", "content": "a"}]) == make_cache_key(
+        "q", "low", [{"content": "a", "role": "user"}]
+    )
+
+
+def test_state_and_events_are_kept_separately():
+    cache = AnswerCache(TTL, max_entries=10)
+    key = make_cache_key("q", "low", [])
+    cache.put(key, state={"response": "answer"})
+    cache.put(key, events=["event: end\n\n"])
+    assert cache.get_state(key) == {"response": "answer"}
+    assert cache.get_events(key) == ["event: end\n\n"]
+
+
+def test_effort_without_ttl_is_not_cached():
+    cache = AnswerCache({"low": 0}, max_entries=10)
+    key = make_cache_key("q", "low", [])
+    cache.put(key, state={})
+    assert cache.get_state(key) is None
+
+
+def test_expired_entry_is_dropped(monkeypatch):
+    cache = AnswerCache(TTL, max_entries=10)
+    key = make_cache_key("q", "low", [])
+    cache.put(key, state={})
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get_state(key) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(TTL, max_entries=2)
+    keys = [make_cache_key(f"q{index}", "low", []) for index in range(3)]
+    cache.put(keys[0], state={})
+    cache.put(keys[1], state={})
+    cache.get_state(keys[0])
+    cache.put(keys[2], state={})
+    assert cache.get_state(keys[1]) is None
+    assert cache.get_state(keys[0]) == {}
+
+
+def test_invalidate_by_query_and_effort():
+    cache = AnswerCache(TTL, max_entries=10)
+    for query in ("alpha", "beta"):
+        for effort in ("low", "high"):
+            cache.put(make_cache_key(query, effort, []), state={})
+    assert cache.invalidate(" ALPHA ", "low") == 1
+    assert cache.invalidate("alpha") == 1
+    assert cache.invalidate(effort="high") == 1
+    assert cache.invalidate() == 1
+    assert cache.get_state(make_cache_key("beta", "low", [])) is None
+
+
+def test_invalidate_endpoint_requires_admin(monkeypatch):
+    monkeypatch.setenv(ADMIN_TOKEN, "secret")
+    client = TestClient(app)
+    assert client.delete("/llm/deep/search/cache").status_code == 403
+    assert client.delete("/llm/deep/search/cache", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.delete("/llm/deep/search/cache", params={"query": "q"}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json() == {"invalidated": 0}
@@ -0,0 +1,101 @@
+"""批量研究的结果输出和提前结束时的任务取消"""
+
+import asyncio
+
+from src.routers.search_agent.batch import BatchRun, planned_search_queries
+
+
+def test_planned_queries_skip_dependent_plan_steps():
+    plan = [{"id": "a", "query": "first", "depends_on": []}, {"id": "b", "query": "second", "depends_on": ["a"]}]
+    assert planned_search_queries({"query_plan": plan}) == ["first"]
+    assert planned_search_queries({"web_search_query_wait_list": ["x", "y"]}) == ["x", "y"]
+
+
+class Items:
+    """替换条目的各阶段：fast 中的条目立即完成，其余条目一直等待直到被取消"""
+
+    def __init__(self, fast: set[int], fail: frozenset = frozenset()):
+        self.fast = fast
+        self.fail = fail
+        self.cancelled: list[int] = []
+
+    async def _wait_or_finish(self, index: int, value):
+        if index in self.fail:
+            raise RuntimeError(f"item {index} failed")
+        if index in self.fast:
+            return value
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+
+    async def plan(self, index: int):
+        return await self._wait_or_finish(index, ([f"query {index}"], None))
+
+    async def answer(self, index: int):
+        return await self._wait_or_finish(index, {"response": f"answer {index}"})
+
+
+def batch(items: Items, plan_all: bool = False) -> tuple[BatchRun, list[str]]:
+    run = BatchRun(["q0", "q1", "q2"], max_search_loop=1, effort="low", concurrency=3, refresh=True)
+    deleted = []
+    run.checkpointer.delete_thread = deleted.append
+
+    async def plan(index):
+        return [f"query {index}"], None
+
+    async def prefetch(query, semaphore):
+        return None
+
+    run._plan = plan if plan_all else items.plan
+    run._answer = items.answer
+    run._prefetch = prefetch
+    return run, deleted
+
+
+async def first_line_then_close(run: BatchRun) -> dict:
+    lines = run.run()
+    line = await lines.__anext__()
+    await lines.aclose()
+    return line
+
+
+def test_closing_during_planning_cancels_pending_items():
+    items = Items(fast={0})
+    run, deleted = batch(items)
+    line = asyncio.run(first_line_then_close(run))
+    assert line == {"event": "planned", "index": 0, "search_queries": ["query 0"]}
+    assert sorted(items.cancelled) == [1, 2]
+    assert sorted(deleted) == [f"{run._batch_id}-1", f"{run._batch_id}-2"]
+
+
+def test_closing_during_answers_cancels_pending_items():
+    items = Items(fast={1})
+
+    async def run_until_result(run: BatchRun) -> dict:
+        lines = run.run()
+        async for line in lines:
+            if line["event"] == "result":
+                await lines.aclose()
+                return line
+
+    run, _ = batch(items, plan_all=True)
+    line = asyncio.run(run_until_result(run))
+    assert (line["index"], line["status"]) == (1, "succeeded")
+    assert sorted(items.cancelled) == [0, 2]
+
+
+def test_failed_item_does_not_stop_the_batch():
+    items = Items(fast={0, 1, 2}, fail=frozenset({1}))
+    run, deleted = batch(items, plan_all=True)
+
+    async def collect():
+        return [line async for line in run.run()]
+
+    lines = asyncio.run(collect())
+    results = {line["index"]: line["status"] for line in lines if line["event"] == "result"}
+    assert results == {0: "succeeded", 1: "failed", 2: "succeeded"}
+    assert lines[-1]["event"] == "summary"
+    assert (lines[-1]["succeeded"], lines[-1]["failed"]) == (2, 1)
+    assert deleted == [f"{run._batch_id}-1"]
@@ -0,0 +1,114 @@
+"""单飞调用合并和相同运行的请求合并"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.routers.search_agent.coalescing import RunCoalescer
+from src.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test.singleflight")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(flight.do, "key", fetch, 21)
+        started.wait(5)
+        followers = [executor.submit(flight.do, "key", fetch, 21) for _ in range(3)]
+        # 留出时间让跟随者进入等待状态后再放行
+        time.sleep(0.05)
+        release.set()
+        assert [leader.result(), *(future.result() for future in followers)] == [42] * 4
+    assert calls == [21]
+
+
+def test_error_is_shared_and_key_released():
+    flight = SingleFlight("test.singleflight")
+
+    def fail():
+        raise ValueError("upstream failed")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    # 失败后不保留调用，下一次调用重新执行
+    assert flight.do("key", lambda: "ok") == "ok"
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight("test.singleflight")
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+
+
+async def events(values: list[str], gate: asyncio.Event, calls: list):
+    """先产生第一个事件，其余事件在 gate 打开后产生"""
+    calls.append(1)
+    for index, value in enumerate(values):
+        if index:
+            await gate.wait()
+        yield value
+
+
+async def collect(iterator) -> list[str]:
+    return [event async for event in iterator]
+
+
+def test_followers_share_run_and_replay_earlier_events():
+    async def run():
+        coalescer = RunCoalescer("test.coalescing")
+        gate = asyncio.Event()
+        calls = []
+        first = coalescer.subscribe("key", lambda: events(["a", "b", "c"], gate, calls))
+        first_task = asyncio.create_task(collect(first))
+        await asyncio.sleep(0.01)
+        # 第一个事件已产生后加入，先回放已产生的事件
+        second = coalescer.subscribe("key", lambda: events(["x"], gate, calls))
+        gate.set()
+        results = await asyncio.gather(first_task, collect(second))
+        await asyncio.sleep(0)
+        return results, calls, coalescer._runs
+
+    (first, second), calls, runs = asyncio.run(run())
+    assert first == second == ["a", "b", "c"]
+    assert calls == [1]
+    assert runs == {}
+
+
+def test_finished_run_is_not_reused():
+    async def run():
+        coalescer = RunCoalescer("test.coalescing")
+        gate = asyncio.Event()
+        gate.set()
+        calls = []
+        first = await collect(coalescer.subscribe("key", lambda: events(["a"], gate, calls)))
+        second = await collect(coalescer.subscribe("key", lambda: events(["b"], gate, calls)))
+        return first, second, calls
+
+    assert asyncio.run(run()) == (["a"], ["b"], [1, 1])
+
+
+def test_source_error_reaches_every_subscriber():
+    async def failing():
+        yield "a"
+        raise RuntimeError("graph failed")
+
+    async def run():
+        coalescer = RunCoalescer("test.coalescing")
+        first = coalescer.subscribe("key", failing)
+        second = coalescer.subscribe("key", failing)
+        return await asyncio.gather(collect(first), collect(second), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
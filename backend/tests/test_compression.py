@@ -0,0 +1,94 @@
+"""流式压缩的编码协商、逐块压缩和中间件"""
+
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.utils import compression
+from src.utils.compression import StreamCompressionMiddleware, StreamCompressor, negotiate_encoding
+
+EVENTS = [f"event: messages\ndata: {{\"token\": \"{index} {'x' * 200}\"}}\n\n".encode() for index in range(5)]
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZIP, deflate", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+    ("gzip;q=bad", None),
+])
+def test_negotiate_gzip_only(gzip_only, header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_prefers_brotli_when_available():
+    pytest.importorskip("brotli")
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("br;q=0.5, gzip") == "gzip"
+
+
+def test_gzip_chunks_decompress_as_they_arrive():
+    compressor = StreamCompressor("gzip")
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for event in EVENTS:
+        # 每个事件刷新后可以立即解压出完整内容
+        assert decompressor.decompress(compressor.compress(event)) == event
+    assert decompressor.decompress(compressor.finish(b"tail")) == b"tail"
+    assert decompressor.eof
+
+
+def test_brotli_round_trip():
+    brotli = pytest.importorskip("brotli")
+    compressor = StreamCompressor("br")
+    decompressor = brotli.Decompressor()
+    for event in EVENTS:
+        assert decompressor.process(compressor.compress(event)) == event
+    assert decompressor.process(compressor.finish()) == b""
+
+
+def client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for event in EVENTS:
+                yield event
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/small")
+    async def small():
+        # 整个响应只有一个数据块，小于阈值
+        return Response(b"data: {}\n\n", media_type="text/event-stream")
+
+    @app.get("/json")
+    async def json_response():
+        return JSONResponse({"value": "x" * 2000})
+
+    app.add_middleware(StreamCompressionMiddleware)
+    return TestClient(app)
+
+
+def test_middleware_compresses_event_streams(gzip_only):
+    response = client().get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b"".join(EVENTS)
+
+
+def test_middleware_leaves_other_responses(gzip_only):
+    test_client = client()
+    assert "content-encoding" not in test_client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in test_client.get("/json", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in test_client.get("/stream", headers={"Accept-Encoding": "identity"}).headers
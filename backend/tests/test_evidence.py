@@ -0,0 +1,92 @@
+"""证据渲染的来源编号，以及投影和来源分页使用的编号"""
+
+from src.routers.search_agent.evidence import EvidenceRenderer
+from src.routers.search_agent.models import ProjectionEnum
+from src.routers.search_agent.projection import project_state, source_page
+from src.routers.search_agent.sources import cited_ids, numbered_sources
+
+
+def source(url: str) -> dict:
+    return {"title": f"title {url}", "url": url, "content": f"content of {url}"}
+
+
+def test_same_url_shares_one_id():
+    renderer = EvidenceRenderer()
+    assert renderer.assign([source("a"), source("b"), source("a")]) == [1, 2, 1]
+    assert renderer.assign([source("c"), source("b")]) == [3, 2]
+
+
+def test_sync_reports_each_new_source_once():
+    renderer = EvidenceRenderer()
+    results = [source("a"), source("b")]
+    assert [s["id"] for s in renderer.sync(results)] == [1, 2]
+    assert renderer.sync(results) == []
+    assert renderer.sync([*results, source("a"), source("c")]) == [{"id": 3, "title": "title c", "url": "c"}]
+
+
+def test_render_numbers_entries():
+    renderer = EvidenceRenderer()
+    renderer.sync([source("a"), source("b")])
+    block = renderer.render()
+    assert block.startswith("[1] title a (a)\ncontent of a")
+    assert "[2] title b (b)" in block
+
+
+def branch_finish_order_state() -> dict:
+    """搜索分支按相反顺序完成：先为 b 分配编号，状态中的结果仍按分支顺序排列"""
+    renderer = EvidenceRenderer()
+    renderer.assign([source("b")])
+    renderer.assign([source("a")])
+    results = [source("a"), source("b")]
+    return {
+        "run_id": "run",
+        "query": "q",
+        "response": "see [1]",
+        "web_search_results_list": results,
+        "source_ids": renderer.sync(results),
+    }
+
+
+def test_numbered_sources_follow_renderer_ids():
+    state = branch_finish_order_state()
+    numbered = numbered_sources(state["web_search_results_list"], state["source_ids"])
+    assert [(s["id"], s["url"]) for s in numbered] == [(1, "b"), (2, "a")]
+    assert numbered[0]["content"] == "content of b"
+
+
+def test_numbered_sources_without_ids_use_first_appearance():
+    numbered = numbered_sources([source("a"), source("b"), source("a")])
+    assert [(s["id"], s["url"]) for s in numbered] == [(1, "a"), (2, "b")]
+    # 缺少编号的来源接在已分配的编号之后
+    numbered = numbered_sources([source("a"), source("c")], [{"id": 1, "title": "", "url": "a"}])
+    assert [(s["id"], s["url"]) for s in numbered] == [(1, "a"), (2, "c")]
+
+
+def test_citations_projection_and_pages_use_renderer_ids():
+    state = branch_finish_order_state()
+    projected = project_state(state, ProjectionEnum.CITATIONS)
+    assert projected["citations"] == [{"id": 1, "title": "title b", "url": "b"}]
+    assert projected["sources_total"] == 2
+    page = source_page(state, offset=1, limit=5)
+    assert [(s["id"], s["url"]) for s in page["items"]] == [(2, "a")]
+
+
+def test_cited_ids_in_first_citation_order():
+    assert cited_ids("see [[3]](https://x) and [1], again [3]") == [3, 1]
+    assert cited_ids("") == []
+
+
+def test_notes_replace_covered_sources():
+    renderer = EvidenceRenderer()
+    renderer.sync([source("a"), source("b"), source("c")])
+    block = renderer.render(notes=[
+        {"query": "q1", "note": "a says [1]", "source_ids": [1]},
+        {"query": "q2", "note": "  ", "source_ids": [2]},
+    ])
+    assert 'Notes on "q1":\na says [1]' in block
+    assert "content of a" not in block
+    # 笔记为空的来源和没有笔记的来源按原文渲染
+    assert "[2] title b (b)\ncontent of b" in block
+    assert "[3] title c (c)\ncontent of c" in block
+    assert 'Notes on "q2"' not in block
+    assert block.endswith("Source index:\n[1] title a (a)")
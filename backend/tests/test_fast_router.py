@@ -0,0 +1,59 @@
+"""快速路由的规则表和置信度阈值"""
+
+import json
+
+import pytest
+
+from src.routers.search_agent.fast_router import _EXAMPLES_PATH, FastRouter, NaiveBayesClassifier
+
+HISTORY = [{"role": "user", "content": "what is asyncio"}, {"role": "assistant", "content": "an event loop library"}]
+
+
+@pytest.fixture(scope="module")
+def router() -> FastRouter:
+    with open(_EXAMPLES_PATH, encoding="utf-8") as f:
+        return FastRouter(NaiveBayesClassifier(json.load(f)))
+
+
+@pytest.mark.parametrize("query", ["hello", "Thank you!", "good morning", "你好", "谢谢 好的"])
+def test_small_talk(router, query):
+    decision = router._classify(query, [])
+    assert (decision.need_deep_research, decision.source) == (False, "rule")
+    assert router.is_confident(decision)
+
+
+@pytest.mark.parametrize("query", ["go on", "Go on.", "more details please", "shorter please", "continue", "继续", "翻译成英文"])
+def test_follow_up_with_history(router, query):
+    decision = router._classify(query, HISTORY)
+    assert (decision.need_deep_research, decision.source) == (False, "rule")
+    assert router.is_confident(decision)
+
+
+def test_follow_up_rule_needs_history(router):
+    assert router._classify("go on", []).reason != router._classify("go on", HISTORY).reason
+
+
+@pytest.mark.parametrize("query", [
+    "search for the latest GPU prices",
+    "latest news on nvidia",
+    "what's the latest on the fed rate",
+    "look up the asyncio changelog",
+    "帮我搜索一下最新的AI新闻",
+    "最新的新闻是什么",
+])
+def test_research_requests(router, query):
+    decision = router._classify(query, [])
+    assert (decision.need_deep_research, decision.source) == (True, "rule")
+    assert router.is_confident(decision)
+
+
+@pytest.mark.parametrize("query", ["write a poem about the news", "写一首关于新闻的诗", "summarize the latest chapter"])
+def test_research_keywords_fall_through_to_llm(router, query):
+    decision = router._classify(query, [])
+    assert decision.source == "rule"
+    assert not router.is_confident(decision)
+
+
+@pytest.mark.parametrize("query", ["newsletter ideas", "tips for a researcher"])
+def test_keyword_substrings_do_not_match_rules(router, query):
+    assert router._classify(query, []).source == "model"
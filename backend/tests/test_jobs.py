@@ -0,0 +1,122 @@
+"""后台任务存储的领取、中断恢复、过期清理以及工作池运行"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from src.routers.search_agent.jobs import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobManager,
+    JobQueueFullError,
+    JobStore,
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+def set_columns(store: JobStore, job_id: str, **columns):
+    assignments = ", ".join(f"{name} = ?" for name in columns)
+    with store._conn:
+        store._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+
+
+def test_claim_takes_oldest_queued_job(db):
+    store = JobStore(db)
+    first = store.create("first", "low", [])
+    second = store.create("second", "low", [{"role": "user", "content": "hi"}])
+
+    claimed = store.claim()
+    assert claimed.id == first.id
+    assert claimed.status == JOB_RUNNING and claimed.started_at is not None
+    assert store.claim().messages == second.messages
+    assert store.claim() is None
+    assert store.count(JOB_RUNNING) == 2
+
+
+def test_claim_is_exclusive_across_stores(db):
+    # 多个工作进程各自打开同一个数据库
+    stores = [JobStore(db), JobStore(db)]
+    created = {stores[0].create(f"q{i}", "low", []).id for i in range(4)}
+
+    claimed = []
+    while (job := stores[len(claimed) % 2].claim()) is not None:
+        claimed.append(job.id)
+    assert sorted(claimed) == sorted(created)
+
+
+def test_recover_fails_jobs_of_exited_workers(db):
+    store = JobStore(db)
+    jobs = [store.create(f"q{i}", "low", []) for i in range(4)]
+    for job in jobs[:3]:
+        store.claim()
+    # 上一个使用相同 PID 的进程、已退出的进程、仍在运行的其他进程
+    set_columns(store, jobs[0].id, worker_pid=os.getpid())
+    set_columns(store, jobs[1].id, worker_pid=2**22 + 1)
+    set_columns(store, jobs[2].id, worker_pid=os.getppid())
+
+    assert store.recover() == 2
+    assert [store.get(job.id).status for job in jobs] == [JOB_FAILED, JOB_FAILED, JOB_RUNNING, JOB_QUEUED]
+    assert store.get(jobs[0].id).error == "interrupted"
+
+
+def test_purge_removes_old_finished_jobs_and_events(db):
+    store = JobStore(db)
+    old, recent, queued = (store.create(q, "low", []) for q in ("old", "recent", "queued"))
+    for job in (old, recent):
+        store.append_event(job.id, 0, "data: 1\n\n")
+        store.finish(job.id, JOB_SUCCEEDED, result={"answer": job.query})
+    set_columns(store, old.id, finished_at=time.time() - 3600)
+
+    assert store.purge(600) == 1
+    assert store.get(old.id) is None and store.events(old.id) == []
+    assert store.result(recent.id) == {"answer": "recent"}
+    assert store.events(recent.id) == ["data: 1\n\n"]
+    assert store.get(queued.id).status == JOB_QUEUED
+
+
+async def runner(job, result):
+    for i in range(3):
+        yield f"data: {i}\n\n"
+    if job.query == "broken":
+        raise RuntimeError("upstream error")
+    result["answer"] = job.query
+
+
+def test_manager_runs_jobs_and_streams_events(db):
+    async def main():
+        manager = JobManager(JobStore(db), runner, workers=2, max_queued=10)
+        await manager.start()
+        try:
+            ok = await manager.submit("ok", "low", [])
+            broken = await manager.submit("broken", "low", [])
+            events = [event async for event in manager.stream(ok.id)]
+            resumed = [event async for event in manager.stream(broken.id, after=2)]
+        finally:
+            await manager.stop()
+        return manager.store, ok, broken, events, resumed
+
+    store, ok, broken, events, resumed = asyncio.run(asyncio.wait_for(main(), 10))
+    assert events == [f"data: {i}\n\n" for i in range(3)]
+    assert resumed == ["data: 2\n\n"]
+    assert store.get(ok.id).status == JOB_SUCCEEDED
+    assert store.result(ok.id) == {"answer": "ok"}
+    assert (store.get(broken.id).status, store.get(broken.id).error) == (JOB_FAILED, "upstream error")
+
+
+def test_submit_rejects_when_queue_is_full(db):
+    async def main():
+        # 未启动工作协程，提交的任务一直排队
+        manager = JobManager(JobStore(db), runner, workers=1, max_queued=1)
+        await manager.submit("first", "low", [])
+        with pytest.raises(JobQueueFullError):
+            await manager.submit("second", "low", [])
+
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""来源知识库的写入、新鲜度和查询判断"""
+
+import time
+
+import pytest
+
+from src.routers.search_agent.constants import KNOWLEDGE_MAX_RESULTS, KNOWLEDGE_MIN_RESULTS
+from src.routers.search_agent.knowledge import KnowledgeStore
+
+
+def source(index: int, topic: str = "asyncio performance tuning") -> dict:
+    return {"title": f"{topic} {index}", "url": f"https://example.com/{index}", "content": f"notes about {topic} number {index}"}
+
+
+@pytest.fixture
+def store() -> KnowledgeStore:
+    store = KnowledgeStore(":memory:", max_age=3600)
+    store.add_sources([source(index) for index in range(KNOWLEDGE_MAX_RESULTS + 2)])
+    store.add_sources([source(100, "thread pool sizing")])
+    return store
+
+
+def test_search_returns_matching_sources(store):
+    results = store.search("thread pool")
+    assert [result["url"] for result in results] == ["https://example.com/100"]
+    assert len(store.search("asyncio performance")) == KNOWLEDGE_MAX_RESULTS
+
+
+def test_same_url_is_updated_not_duplicated(store):
+    store.add_sources([{**source(100, "thread pool sizing"), "content": "replaced content about gevent"}])
+    assert [result["url"] for result in store.search("gevent")] == ["https://example.com/100"]
+    results = store.search("thread pool sizing")
+    assert [result["content"] for result in results] == ["replaced content about gevent"]
+
+
+def test_stale_sources_are_ignored(store, monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 3601)
+    assert store.search("asyncio performance") == []
+
+
+def test_lookup_answers_covered_query(store):
+    sources = store.lookup("asyncio performance")
+    assert sources is not None
+    assert len(sources) == KNOWLEDGE_MAX_RESULTS
+
+
+def test_lookup_ignores_sources_the_run_already_has(store):
+    known = {f"https://example.com/{index}" for index in range(KNOWLEDGE_MAX_RESULTS + 2 - KNOWLEDGE_MIN_RESULTS + 1)}
+    assert store.lookup("asyncio performance", exclude_urls=known) is None
+    partial = {"https://example.com/0"}
+    sources = store.lookup("asyncio performance", exclude_urls=partial)
+    assert sources is not None
+    assert not partial & {source["url"] for source in sources}
+
+
+def test_lookup_misses_uncovered_query(store):
+    assert store.lookup("rust borrow checker") is None
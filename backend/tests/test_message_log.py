@@ -0,0 +1,73 @@
+"""只追加的消息历史"""
+
+import copy
+import pickle
+
+import ormsgpack
+import orjson
+import pytest
+
+from src.routers.search_agent.message_log import MessageLog, append_messages, as_message_log
+from src.utils.tokens import estimate_messages_tokens
+
+HISTORY = [{"role": "user", "content": "what is asyncio"}, {"role": "assistant", "content": "an event loop library"}]
+
+
+def test_reducer_appends_without_changing_previous_version():
+    first = append_messages([], HISTORY)
+    second = append_messages(first, [{"role": "user", "content": "and uvloop?"}])
+    assert list(first) == HISTORY
+    assert list(second) == [*HISTORY, {"role": "user", "content": "and uvloop?"}]
+    assert isinstance(second, MessageLog)
+    assert append_messages(second, None) == second
+
+
+def test_versions_share_message_objects():
+    first = as_message_log(HISTORY)
+    second = first.extended([{"role": "user", "content": "next"}])
+    assert second[0] is first[0]
+
+
+def test_text_and_tokens_match_plain_list():
+    log = as_message_log(HISTORY).extended([{"role": "user", "content": "继续"}])
+    assert log.text() == str(list(log))
+    assert log.tokens() == estimate_messages_tokens(list(log))
+
+
+def test_forked_versions_keep_correct_encodings():
+    base = as_message_log(HISTORY)
+    left = base.extended([{"role": "user", "content": "left branch"}])
+    right = base.extended([{"role": "user", "content": "a much longer right branch message"}])
+    assert left.tokens() == estimate_messages_tokens(list(left))
+    assert right.tokens() == estimate_messages_tokens(list(right))
+    assert left.text() == str(list(left))
+
+
+@pytest.mark.parametrize("method, args", [
+    ("append", ({},)), ("extend", ([],)), ("insert", (0, {})), ("pop", ()), ("remove", ({},)),
+    ("clear", ()), ("sort", ()), ("reverse", ()), ("__setitem__", (0, {})), ("__delitem__", (0,)),
+])
+def test_in_place_mutation_is_rejected(method, args):
+    log = as_message_log(HISTORY)
+    with pytest.raises(TypeError):
+        getattr(log, method)(*args)
+    assert list(log) == HISTORY
+
+
+def test_augmented_assignment_is_rejected():
+    log = as_message_log(HISTORY)
+    with pytest.raises(TypeError):
+        log += [{}]
+
+
+def test_copy_and_pickle_keep_type():
+    log = as_message_log(HISTORY)
+    for restored in (copy.copy(log), copy.deepcopy(log), pickle.loads(pickle.dumps(log))):
+        assert isinstance(restored, MessageLog)
+        assert list(restored) == HISTORY
+
+
+def test_serializes_as_plain_list():
+    log = as_message_log(HISTORY)
+    assert orjson.loads(orjson.dumps(log)) == HISTORY
+    assert ormsgpack.unpackb(ormsgpack.packb(log)) == HISTORY
@@ -0,0 +1,74 @@
+"""查询计划的规范化和按依赖调度"""
+
+import threading
+
+from src.routers.search_agent.planner import QueryPlanScheduler, normalize_plan
+from src.utils.metrics import get_metrics
+
+
+def step(step_id: str, query: str, depends_on: list[str] = ()) -> dict:
+    return {"id": step_id, "query": query, "depends_on": list(depends_on)}
+
+
+def test_normalize_drops_empty_and_duplicate_steps():
+    plan = normalize_plan([step("a", "first"), step("b", ""), step("a", "again"), step("c", "third")], max_steps=5)
+    assert [s["id"] for s in plan] == ["a", "c"]
+
+
+def test_normalize_truncates_to_max_steps():
+    plan = normalize_plan([step(str(index), f"q{index}") for index in range(6)], max_steps=3)
+    assert [s["id"] for s in plan] == ["0", "1", "2"]
+
+
+def test_normalize_keeps_only_backward_dependencies():
+    plan = normalize_plan([
+        step("a", "first", ["b", "a"]),
+        step("b", "second", ["a", "a", "missing"]),
+        step("c", "third", ["a", "b", "c"]),
+    ], max_steps=5)
+    assert [s["depends_on"] for s in plan] == [[], ["a"], ["a", "b"]]
+
+
+def test_dependents_receive_results_of_their_dependencies():
+    seen_inputs = {}
+
+    def run_step(current: dict, inputs: dict) -> list[dict]:
+        seen_inputs[current["id"]] = inputs
+        return [{"url": current["id"]}]
+
+    plan = normalize_plan([step("a", "first"), step("b", "second"), step("c", "third", ["a", "b"])], max_steps=5)
+    results = QueryPlanScheduler(plan, run_step).run()
+    assert results == {"a": [{"url": "a"}], "b": [{"url": "b"}], "c": [{"url": "c"}]}
+    assert seen_inputs["a"] == {}
+    assert seen_inputs["c"] == {"a": [{"url": "a"}], "b": [{"url": "b"}]}
+
+
+def test_independent_steps_run_concurrently():
+    # 两个独立步骤互相等待，只有并发执行才能同时通过屏障
+    barrier = threading.Barrier(2, timeout=5)
+
+    def run_step(current: dict, inputs: dict) -> list[dict]:
+        barrier.wait()
+        return []
+
+    results = QueryPlanScheduler([step("a", "first"), step("b", "second")], run_step).run()
+    assert results == {"a": [], "b": []}
+
+
+def test_failed_step_yields_empty_results_and_dependents_still_run():
+    def run_step(current: dict, inputs: dict) -> list[dict]:
+        if current["id"] == "a":
+            raise RuntimeError("search failed")
+        return [{"inputs": inputs}]
+
+    plan = normalize_plan([step("a", "first"), step("b", "second", ["a"])], max_steps=5)
+    results = QueryPlanScheduler(plan, run_step).run()
+    assert results == {"a": [], "b": [{"inputs": {"a": []}}]}
+
+
+def test_cycle_from_unnormalized_plan_still_runs_every_step():
+    cycles = get_metrics().counter("query_plan.cycles")
+    plan = [step("a", "first", ["b"]), step("b", "second", ["a"]), step("c", "third")]
+    results = QueryPlanScheduler(plan, lambda current, inputs: [current["id"]]).run()
+    assert results == {"a": ["a"], "b": ["b"], "c": ["c"]}
+    assert get_metrics().counter("query_plan.cycles") == cycles + 1
@@ -0,0 +1,97 @@
+"""倒数排名融合、本地 FTS 索引和组合搜索提供方"""
+
+import pytest
+
+from src.routers.search_agent.constants import LOCAL_SEARCH_CHUNK_SIZE, RRF_K
+from src.routers.search_agent.providers import (
+    CascadeSearchProvider,
+    FanOutSearchProvider,
+    SearchProvider,
+    SQLiteFTSSearchProvider,
+    fts_match_expression,
+    reciprocal_rank_fusion,
+)
+
+
+def item(url: str) -> dict:
+    return {"title": url, "url": url, "content": f"content of {url}"}
+
+
+class StaticProvider(SearchProvider):
+    def __init__(self, name: str, results: list[dict] | Exception):
+        self.name = name
+        self.results = results
+        self.calls = 0
+
+    def search(self, query: str, search_depth: str = "basic", **options) -> list[dict]:
+        self.calls += 1
+        if isinstance(self.results, Exception):
+            raise self.results
+        return self.results
+
+
+def test_rrf_sums_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([[item("a"), item("b")], [item("b"), item("c")]])
+    assert [result["url"] for result in fused] == ["b", "a", "c"]
+    assert fused[0]["score"] == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 1))
+    assert fused[1]["score"] == pytest.approx(1 / (RRF_K + 1))
+
+
+def test_rrf_keeps_first_copy_of_duplicate_url():
+    first = {**item("a"), "content": "from first list"}
+    fused = reciprocal_rank_fusion([[first], [{**item("a"), "content": "from second list"}]])
+    assert len(fused) == 1
+    assert fused[0]["content"] == "from first list"
+
+
+def test_rrf_of_nothing():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_match_expression():
+    assert fts_match_expression("an asyncio loop") == '"asyncio" OR "loop"'
+    assert fts_match_expression("事件循环") == '"事件循" OR "件循环"'
+    assert fts_match_expression("a b") == ""
+
+
+@pytest.fixture
+def local() -> SQLiteFTSSearchProvider:
+    provider = SQLiteFTSSearchProvider(":memory:")
+    provider.index_documents([
+        {"title": "asyncio guide", "url": "file:///asyncio.md", "content": "asyncio event loop tuning and uvloop"},
+        {"title": "threads", "url": "file:///threads.md", "content": "thread pools and the GIL"},
+        {"title": "事件循环", "url": "file:///loop.md", "content": "事件循环的调度方式"},
+    ])
+    return provider
+
+
+def test_fts_search_ranks_matching_documents(local):
+    results = local.search("asyncio uvloop")
+    assert [result["url"] for result in results] == ["file:///asyncio.md"]
+    assert results[0]["score"] > 0
+    assert local.search("事件循环")[0]["url"] == "file:///loop.md"
+    assert local.search("a b") == []
+
+
+def test_fts_reindex_replaces_document_and_chunks_long_content(local):
+    assert local.index_documents([{"title": "threads", "url": "file:///threads.md", "content": "x" * (LOCAL_SEARCH_CHUNK_SIZE + 1)}]) == 2
+    assert local.search("pools") == []
+
+
+def test_fanout_skips_failed_provider():
+    fanout = FanOutSearchProvider([
+        StaticProvider("first", [item("a"), item("b")]),
+        StaticProvider("broken", RuntimeError("down")),
+        StaticProvider("second", [item("b")]),
+    ])
+    assert [result["url"] for result in fanout.search("q")] == ["b", "a"]
+
+
+def test_cascade_stops_at_first_sufficient_provider():
+    fast = StaticProvider("fast", [item("a"), item("b"), item("c")])
+    slow = StaticProvider("slow", [item("d")])
+    assert CascadeSearchProvider([fast, slow], min_results=3).search("q") == fast.results
+    assert slow.calls == 0
+    short = StaticProvider("short", [item("a")])
+    assert CascadeSearchProvider([short, slow], min_results=3).search("q") == slow.results
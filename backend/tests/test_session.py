@@ -0,0 +1,81 @@
+"""对话会话的历史窗口、折叠边界和按轮保存"""
+
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.routers.chat_agent.session import ChatSession, HistoryPolicy, InMemorySessionStore, SessionManager
+from src.utils.tokens import MESSAGE_OVERHEAD_TOKENS, estimate_message_tokens
+
+
+def message(index: int, tokens: int = 100) -> dict:
+    """估算为 tokens 个 token 的消息"""
+    content = f"{index:04d}" + "x" * (4 * (tokens - MESSAGE_OVERHEAD_TOKENS) - 4)
+    return {"role": "user" if index % 2 == 0 else "assistant", "content": content}
+
+
+def test_message_helper_tokens():
+    assert estimate_message_tokens(message(0)) == 100
+
+
+def test_window_start_keeps_messages_within_budget():
+    policy = HistoryPolicy(window_tokens=250, summary_trigger_tokens=1000)
+    messages = [message(index) for index in range(5)]
+    assert policy.window_start(messages) == 3
+    assert policy.window_start([]) == 0
+
+
+def test_window_always_contains_last_message():
+    policy = HistoryPolicy(window_tokens=50, summary_trigger_tokens=100)
+    messages = [message(0), message(1, tokens=500)]
+    assert policy.window_start(messages) == 1
+
+
+def test_trigger_is_at_least_window():
+    assert HistoryPolicy(window_tokens=500, summary_trigger_tokens=100).summary_trigger_tokens == 500
+
+
+def test_no_fold_until_trigger():
+    policy = HistoryPolicy(window_tokens=250, summary_trigger_tokens=500)
+    assert policy.foldable_count(ChatSession("s", messages=[message(index) for index in range(5)])) == 0
+    # 超过触发阈值后折叠窗口之前的全部消息
+    assert policy.foldable_count(ChatSession("s", messages=[message(index) for index in range(6)])) == 4
+
+
+def test_prompt_keeps_unfolded_messages_outside_window():
+    policy = HistoryPolicy(window_tokens=250, summary_trigger_tokens=500)
+    messages = [message(index) for index in range(5)]
+    # 窗口之前的消息尚未折叠，不能从提示中消失
+    assert policy.build_prompt(ChatSession("s", messages=messages)) == messages
+
+
+def test_prompt_prepends_summary():
+    policy = HistoryPolicy(window_tokens=250, summary_trigger_tokens=500)
+    prompt = policy.build_prompt(ChatSession("s", summary="earlier facts", messages=[message(0)]))
+    assert prompt[0]["role"] == "system"
+    assert "earlier facts" in prompt[0]["content"]
+    assert prompt[1:] == [message(0)]
+
+
+def test_build_turn_does_not_store_user_turn():
+    manager = SessionManager(InMemorySessionStore(), HistoryPolicy(250, 500))
+    turn = [{"role": "user", "content": "hello"}]
+    assert manager.build_turn("s", turn) == turn
+    assert manager.store.get("s").messages == []
+
+
+def test_reply_saves_turn_and_folds_in_background():
+    manager = SessionManager(InMemorySessionStore(), HistoryPolicy(250, 500))
+    llm = FakeListChatModel(responses=["summary"])
+
+    async def run():
+        for index in range(0, 6, 2):
+            manager.add_reply("s", [message(index)], message(index + 1)["content"], llm)
+            await asyncio.gather(*manager._tasks)
+
+    asyncio.run(run())
+    session = manager.store.get("s")
+    # 6 条消息共 600 token，超过触发阈值，窗口之前的 4 条折叠进摘要
+    assert session.summary == "summary"
+    assert [m["content"][:4] for m in session.messages] == ["0004", "0005"]
+    assert [m["role"] for m in session.messages] == ["user", "assistant"]
@@ -0,0 +1,53 @@
+"""来源截断、合并和超出预算时的压缩"""
+
+from src.routers.search_agent.constants import SOURCE_CONTENT_MAX_CHARS, SOURCE_EVICTED_CHARS, SOURCE_PREVIEW_CHARS
+from src.routers.search_agent.sources import make_source, merge_sources, shrink_sources, source_previews, sources_size
+
+
+def source(url: str, score=None, chars: int = 1000) -> dict:
+    return make_source(url, url, "x" * chars, score)
+
+
+def test_make_source_truncates_content():
+    item = make_source(None, "u", "x" * (SOURCE_CONTENT_MAX_CHARS + 10), 0.5)
+    assert item == {"title": "", "url": "u", "content": "x" * SOURCE_CONTENT_MAX_CHARS, "score": 0.5}
+    assert "score" not in make_source("t", "u", "c")
+
+
+def test_previews_are_short():
+    assert source_previews([source("u")])[0]["content"] == "x" * SOURCE_PREVIEW_CHARS
+
+
+def test_merge_appends_in_order():
+    existing = [source("a")]
+    merged = merge_sources(existing, [source("b"), source("a")])
+    assert [item["url"] for item in merged] == ["a", "b", "a"]
+    assert existing == [source("a")]
+
+
+def test_shrink_within_budget_returns_sources_unchanged():
+    sources = [source("a"), source("b")]
+    assert shrink_sources(sources, sources_size(sources)) is sources
+
+
+def test_shrink_drops_duplicate_content_first():
+    sources = [source("a", 0.9), source("b", 0.1), source("a", 0.9)]
+    shrunk = shrink_sources(sources, sources_size(sources) - 900)
+    assert [len(item["content"]) for item in shrunk] == [1000, 1000, 0]
+
+
+def test_shrink_then_evicts_lowest_score():
+    sources = [source("a", 0.9), source("b", 0.1), source("c"), source("a", 0.9)]
+    shrunk = shrink_sources(sources, sources_size(sources) - 1900)
+    # 重复来源清空后，没有得分的 c 排名最低，其次是得分最低的 b
+    assert [len(item["content"]) for item in shrunk] == [1000, SOURCE_EVICTED_CHARS, SOURCE_EVICTED_CHARS, 0]
+    assert [item["url"] for item in shrunk] == ["a", "b", "c", "a"]
+    assert sources_size(shrunk) <= sources_size(sources) - 1900
+    # 输入不被修改
+    assert all(len(item["content"]) == 1000 for item in sources)
+
+
+def test_shrink_prefers_later_sources_on_equal_score():
+    sources = [source("a", 0.5), source("b", 0.5)]
+    shrunk = shrink_sources(sources, sources_size(sources) - 100)
+    assert [len(item["content"]) for item in shrunk] == [1000, SOURCE_EVICTED_CHARS]
@@ -0,0 +1,87 @@
+"""推测式回答草稿的命中、未命中和失败回退"""
+
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from src.routers.search_agent import nodes, speculation
+from src.routers.search_agent.speculation import DraftReplayModel, discard_draft, start_draft, take_draft
+from src.utils.metrics import get_metrics
+from src.utils.resilience import ResilientUpstream
+
+MESSAGES = [{"role": "user", "content": "question"}]
+
+
+class FailingChatModel(GenericFakeChatModel):
+    """输出首个片段前失败的模型"""
+
+    def _stream(self, *args, **kwargs):
+        raise ConnectionError("upstream down")
+        yield
+
+
+def model(content: str) -> GenericFakeChatModel:
+    return GenericFakeChatModel(messages=iter([AIMessage(content=content)]))
+
+
+def counter(name: str) -> float:
+    return get_metrics().counter(f"speculative_answer.{name}")
+
+
+def replay(draft) -> str:
+    return DraftReplayModel(draft=draft, assistant_started_at=time.time()).invoke(MESSAGES).content
+
+
+def test_hit_replays_draft():
+    hits = counter("hit")
+    draft = take_draft(start_draft(model("drafted answer"), MESSAGES))
+    assert replay(draft) == "drafted answer"
+    assert counter("hit") == hits + 1
+
+
+def test_discarded_draft_is_a_miss():
+    discarded = counter("discarded")
+    draft_id = start_draft(model("unused"), MESSAGES)
+    discard_draft(draft_id)
+    assert take_draft(draft_id) is None
+    assert counter("discarded") == discarded + 1
+    assert get_metrics().snapshot()["gauges"]["speculative_answer.hit_rate"] < 1
+
+
+def test_expired_draft_is_a_miss(monkeypatch):
+    expired = counter("expired")
+    draft_id = start_draft(model("unused"), MESSAGES)
+    monkeypatch.setattr(speculation, "SPECULATIVE_DRAFT_MAX_AGE", -1)
+    start_draft(model("next"), MESSAGES)
+    assert take_draft(draft_id) is None
+    assert counter("expired") >= expired + 1
+
+
+def test_draft_falls_back_to_backup_model():
+    upstream = ResilientUpstream("draft-test", deadline=None)
+    draft = take_draft(start_draft(FailingChatModel(messages=iter([])), MESSAGES, upstream, model("backup answer")))
+    assert replay(draft) == "backup answer"
+
+
+def test_failed_draft_is_counted_and_raised():
+    failed = counter("failed")
+    draft = take_draft(start_draft(FailingChatModel(messages=iter([])), MESSAGES))
+    with pytest.raises(ConnectionError):
+        replay(draft)
+    assert counter("failed") == failed + 1
+
+
+def test_assistant_node_regenerates_when_draft_fails(monkeypatch):
+    for name in ("send_node_update", "send_messages_update", "release_run"):
+        monkeypatch.setattr(nodes, name, lambda *args, **kwargs: None)
+    monkeypatch.setattr(nodes, "build_answer_messages", lambda state: MESSAGES)
+    calls = []
+    monkeypatch.setattr(nodes, "invoke_llm", lambda messages, **kwargs: calls.append(kwargs) or AIMessage(content="regenerated"))
+    draft_id = start_draft(FailingChatModel(messages=iter([])), MESSAGES)
+
+    update = nodes.assistant_node({"query": "question", "messages": [], "speculative_draft_id": draft_id})
+
+    assert update["response"] == "regenerated"
+    assert calls == [{"hedge": False, "deadline": None}]